@@ -0,0 +1,272 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.result_summary import summarize_rows
+from utils.sql_dialect import quote_identifier
+
+class ProfileStore:
+    """Column profiles per table, optionally persisted to a small SQLite file so a restart
+    doesn't re-profile the database. Entries are keyed by database and table and carry a
+    signature of the table's columns, so an altered table is profiled again."""
+
+    def __init__(self, db_key: str, path: Optional[str] = None):
+        self.db_key = db_key
+        self.path = path
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, Dict[str, Any]] = {}
+        if path:
+            conn = sqlite3.connect(path)
+            try:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS column_profiles (
+                        db_key TEXT, table_name TEXT, signature TEXT, profiled_at REAL, profile TEXT,
+                        PRIMARY KEY (db_key, table_name))
+                """)
+                rows = conn.execute(
+                    "SELECT table_name, signature, profiled_at, profile FROM column_profiles WHERE db_key = ?",
+                    (db_key,)
+                ).fetchall()
+                conn.commit()
+            finally:
+                conn.close()
+            for table, signature, profiled_at, profile in rows:
+                self._profiles[table] = {"signature": signature, "profiled_at": profiled_at,
+                                         "columns": json.loads(profile)}
+
+    def get(self, table: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._profiles.get(table)
+
+    def put(self, table: str, signature: str, columns: Dict[str, Dict[str, Any]]):
+        entry = {"signature": signature, "profiled_at": time.time(), "columns": columns}
+        with self._lock:
+            self._profiles[table] = entry
+            if not self.path:
+                return
+            conn = sqlite3.connect(self.path)
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO column_profiles VALUES (?, ?, ?, ?, ?)",
+                    (self.db_key, table, signature, entry["profiled_at"], json.dumps(columns, default=str))
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """{table: {column: profile}} for everything profiled so far."""
+        with self._lock:
+            return {table: entry["columns"] for table, entry in self._profiles.items()}
+
+def _plain(value: Any) -> Any:
+    """JSON- and prompt-friendly value (dates, decimals, LOBs as text)."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+def table_signature(columns: List[Tuple[str, str]]) -> str:
+    return hashlib.blake2b(repr(columns).encode("utf-8"), digest_size=8).hexdigest()
+
+class ColumnProfiler:
+    """Background job that profiles every column of the cached schema model.
+
+    Per column: distinct count, null fraction, min/max and the most frequent values. Values
+    come from a bounded row sample (SAMPLE on Oracle, TABLESAMPLE on SQL Server, a LIMIT scan
+    on SQLite); optimizer statistics replace the sampled distinct/null figures where the
+    catalog has them (user_tab_col_statistics on Oracle) and size the sample (num_rows,
+    sys.dm_db_stats_properties, sqlite_stat1). Reads go to a replica when one is configured.
+    """
+
+    def __init__(self, adapter, store: ProfileStore, sample_rows: int = 10000, top_k: int = 10,
+                 max_age: float = 86400.0):
+        self.adapter = adapter
+        self.store = store
+        self.sample_rows = sample_rows
+        self.top_k = top_k
+        self.max_age = max_age
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="column-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        """Profile every table that is missing, stale or altered since its last profile."""
+        tables = self.adapter.get_schema_tables()
+        endpoint = self.adapter.router.candidates(read=True)[0]
+        conn = None
+        try:
+            for table, columns in tables.items():
+                if self._stop.is_set():
+                    break
+                signature = table_signature(columns)
+                cached = self.store.get(table)
+                if (cached and cached["signature"] == signature
+                        and time.time() - cached["profiled_at"] < self.max_age):
+                    continue
+                try:
+                    if conn is None:
+                        conn = self.adapter.get_connection(endpoint.config, True)
+                    self.store.put(table, signature, self.profile_table(conn.cursor(), table, columns))
+                except Exception as e:
+                    print(f"Column profiling of {table} failed: {e}")
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        pass
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def profile_table(self, cursor, table: str, columns: List[Tuple[str, str]]) -> Dict[str, Dict[str, Any]]:
+        names = [name for name, _ in columns]
+        row_count, col_stats = self._catalog_stats(cursor, table)
+        cursor.execute(self._sample_query(table, names, row_count))
+        rows = cursor.fetchall()
+        if not rows and row_count:
+            # Page sampling can come back empty on small or skewed tables; take the first rows
+            cursor.execute(self._sample_query(table, names, None))
+            rows = cursor.fetchall()
+        summary = summarize_rows(names, rows, top_k=self.top_k, sample_size=0)
+        profiles = {}
+        for col in summary["columns"]:
+            sampled = col["count"] or 0
+            profile = {
+                "distinct": col["distinct"],
+                "null_frac": round(col["nulls"] / sampled, 4) if sampled else None,
+                "min": _plain(col["min"]),
+                "max": _plain(col["max"]),
+                "top_values": [_plain(t["value"]) for t in col["top_values"]],
+                "rows_sampled": sampled,
+                "source": "sample",
+            }
+            stats = col_stats.get(col["name"])
+            if stats:
+                num_distinct, num_nulls = stats
+                profile["distinct"] = num_distinct
+                if row_count:
+                    profile["null_frac"] = round(num_nulls / row_count, 4)
+                profile["source"] = "stats"
+            profiles[col["name"]] = profile
+        return profiles
+
+    def _quote(self, name: str) -> str:
+        return quote_identifier(name, self.adapter.db_type)
+
+    def _sample_query(self, table: str, names: List[str], row_count: Optional[int]) -> str:
+        db_type = self.adapter.db_type
+        cols = ", ".join(self._quote(name) for name in names)
+        source = self._quote(table)
+        n = self.sample_rows
+        pct = None
+        if row_count and row_count > n:
+            # Oversample a little: block sampling returns a noisy number of rows
+            pct = min(99.0, max(0.000001, 150.0 * n / row_count))
+        if db_type == "oracle":
+            sample = f" SAMPLE ({pct:.6f})" if pct else ""
+            return f"SELECT {cols} FROM {source}{sample} FETCH FIRST {n} ROWS ONLY"
+        if db_type == "mssql":
+            sample = f" TABLESAMPLE ({pct:.6f} PERCENT)" if pct else ""
+            return f"SELECT TOP ({n}) {cols} FROM {source}{sample}"
+        if db_type == "duckdb":
+            sample = f" USING SAMPLE {pct:.6f} PERCENT (system)" if pct else ""
+            return f"SELECT {cols} FROM {source}{sample} LIMIT {n}"
+        return f"SELECT {cols} FROM {source} LIMIT {n}"
+
+    def _catalog_stats(self, cursor, table: str) -> Tuple[Optional[int], Dict[str, Tuple[int, int]]]:
+        """(row count, {column: (num_distinct, num_nulls)}) from optimizer statistics, if any."""
+        owner, _, name = table.rpartition(".")
+        db_type = self.adapter.db_type
+        try:
+            if db_type == "oracle":
+                if owner:
+                    cursor.execute("SELECT num_rows FROM all_tables WHERE owner = :o AND table_name = :t",
+                                   {"o": owner, "t": name})
+                else:
+                    cursor.execute("SELECT num_rows FROM user_tables WHERE table_name = :t", {"t": name})
+                row = cursor.fetchone()
+                row_count = row[0] if row else None
+                view = "all_tab_col_statistics" if owner else "user_tab_col_statistics"
+                owner_filter = " AND owner = :o" if owner else ""
+                binds = {"t": name, **({"o": owner} if owner else {})}
+                cursor.execute(f"""
+                    SELECT column_name, num_distinct, num_nulls
+                    FROM {view}
+                    WHERE table_name = :t{owner_filter} AND num_distinct IS NOT NULL
+                """, binds)
+                return row_count, {c: (d, n or 0) for c, d, n in cursor.fetchall()}
+            if db_type == "mssql":
+                cursor.execute("""
+                    SELECT MAX(sp.rows)
+                    FROM sys.stats s
+                    CROSS APPLY sys.dm_db_stats_properties(s.object_id, s.stats_id) sp
+                    WHERE s.object_id = OBJECT_ID(?)
+                """, table)
+                row = cursor.fetchone()
+                return (row[0] if row else None), {}
+            if db_type == "duckdb":
+                catalog_filter = " AND database_name = ?" if owner else ""
+                cursor.execute(f"SELECT estimated_size FROM duckdb_tables() WHERE table_name = ?{catalog_filter} "
+                               "LIMIT 1", [name] + ([owner] if owner else []))
+                row = cursor.fetchone()
+                return (row[0] if row else None), {}
+            prefix = f"{self._quote(owner)}." if owner else ""
+            cursor.execute(f"SELECT stat FROM {prefix}sqlite_stat1 WHERE tbl = ? LIMIT 1", (name,))
+            row = cursor.fetchone()
+            match = re.match(r"\d+", row[0]) if row and row[0] else None
+            return (int(match.group()) if match else None), {}
+        except Exception:
+            # No statistics (never analyzed, no sqlite_stat1, missing privileges): sample only
+            try:
+                cursor.connection.rollback()
+            except Exception:
+                pass
+            return None, {}
+
+def format_profile_hints(profiles: Dict[str, Dict[str, Dict[str, Any]]], natural_query: str,
+                         budget: int, max_distinct: int = 100) -> str:
+    """Prompt lines with sample values, most relevant columns first, at most `budget` chars.
+
+    Low-cardinality columns (where the LLM has to guess exact literals) get their frequent
+    values, other columns their range. Columns of tables named in the question come first.
+    """
+    if not profiles or budget <= 0:
+        return ""
+    words = set(re.findall(r"\w+", (natural_query or "").lower()))
+    candidates = []
+    for table, columns in profiles.items():
+        table_mentioned = table.split(".")[-1].lower() in words or table.split(".")[-1].lower().rstrip("s") in words
+        for column, p in columns.items():
+            distinct = p.get("distinct")
+            top = p.get("top_values") or []
+            # Exact spellings matter for text; numbers and dates are better described by their range
+            enumerable = (isinstance(distinct, int) and 0 < distinct <= max_distinct
+                          and top and all(isinstance(v, str) for v in top))
+            if enumerable:
+                shown = ", ".join(repr(v) for v in top)
+                line = f"  - {table}.{column}: {shown} ({distinct} distinct)"
+            elif p.get("min") is not None and p.get("max") is not None:
+                line = f"  - {table}.{column}: {p['min']!r} .. {p['max']!r}"
+            else:
+                continue
+            rank = (column.lower() not in words, not table_mentioned, not enumerable, distinct if enumerable else 0)
+            candidates.append((rank, line))
+    candidates.sort(key=lambda c: c[0])
+    lines, used = [], 0
+    for _, line in candidates:
+        if used + len(line) + 1 > budget:
+            continue
+        lines.append(line)
+        used += len(line) + 1
+    return "\n".join(lines)
@@ -45,4 +45,25 @@ ORACLE_ENV_VARS = {
 }
 
 # Default settings
-DEFAULT_MAX_RETRIES = 3 
\ No newline at end of file
+DEFAULT_MAX_RETRIES = 3
+
+# Rule-based repair passes tried per LLM-generated query before falling back to DebugSQL
+DEFAULT_MAX_LOCAL_REPAIR_PASSES = 3
+
+# Agent tool results: rows returned to the agent and max characters per cell
+AGENT_MAX_ROWS = 20
+AGENT_MAX_CELL_CHARS = 200
+
+# Few-shot examples: verified question/SQL pairs kept and added to the GenerateSQL prompt
+EXAMPLE_STORE_CAPACITY = 1000
+FEW_SHOT_K = 3
+
+# NL->SQL cache: canonical SQL of answered questions, reused (transpiled) on every backend
+SQL_CACHE_CAPACITY = 5000
+
+# Append-only log of runs, SQL attempts and timings; None keeps it off unless --run-log / TXT2SQL_RUN_LOG names a file
+RUN_LOG_PATH = None
+
+# Sampled previews (--preview): rows sampled from the table and seconds to wait for the estimate
+PREVIEW_SAMPLE_ROWS = 100000
+PREVIEW_LATENCY_TARGET = 2.0
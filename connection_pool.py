@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+class PooledConnection:
+    """A DB-API connection kept open between queries, plus an optional per-SQL cursor cache.
+
+    pyodbc only reuses a prepared statement when the same SQL is executed again on the same
+    cursor, so for MSSQL cursors are cached per statement text. Oracle and SQLite cache parsed
+    statements on the connection itself (stmtcachesize / cached_statements).
+    """
+
+    def __init__(self, conn, cursor_cache_size: int = 0):
+        self.conn = conn
+        self.cursor_cache_size = cursor_cache_size
+        self._cursors: "OrderedDict[str, object]" = OrderedDict()
+
+    def cursor(self, sql: str = None):
+        if not self.cursor_cache_size or sql is None:
+            return self.conn.cursor()
+        cursor = self._cursors.pop(sql, None) or self.conn.cursor()
+        self._cursors[sql] = cursor
+        if len(self._cursors) > self.cursor_cache_size:
+            _, evicted = self._cursors.popitem(last=False)
+            try:
+                evicted.close()
+            except Exception:
+                pass
+        return cursor
+
+    def close(self):
+        for cursor in self._cursors.values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self._cursors.clear()
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+class ConnectionPool:
+    """Thread-safe pool of idle connections.
+
+    Idle connections are reused LIFO so the warmest statement cache serves the next query.
+    At most max_idle connections are kept; extra ones are closed on release. With `validate`,
+    an idle connection it rejects (e.g. an outdated in-memory snapshot) is closed instead of reused.
+    """
+
+    def __init__(self, connect: Callable[[], object], max_idle: int = 4, cursor_cache_size: int = 0,
+                 validate: Optional[Callable[[object], bool]] = None):
+        self._connect = connect
+        self.max_idle = max_idle
+        self.cursor_cache_size = cursor_cache_size
+        self.validate = validate
+        self._idle: List[PooledConnection] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> PooledConnection:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                pooled = self._idle.pop()
+            if self.validate is None or self.validate(pooled.conn):
+                return pooled
+            self.discard(pooled)
+        return PooledConnection(self._connect(), self.cursor_cache_size)
+
+    def release(self, pooled: PooledConnection):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(pooled)
+                return
+        pooled.close()
+
+    def discard(self, pooled: PooledConnection):
+        pooled.close()
+
+    @contextmanager
+    def connection(self, pooled: PooledConnection = None,
+                   discard_on: Optional[Callable[[Exception], bool]] = None):
+        """Borrow a connection (or take over one from acquire()); on error it is rolled back
+        and only returned to the pool if still usable. Errors for which `discard_on` is true
+        (e.g. a dropped session) always close it, so a retry gets a fresh connection."""
+        if pooled is None:
+            pooled = self.acquire()
+        try:
+            yield pooled
+        except Exception as e:
+            if discard_on is not None and discard_on(e):
+                self.discard(pooled)
+                raise
+            try:
+                pooled.conn.rollback()
+            except Exception:
+                self.discard(pooled)
+            else:
+                self.release(pooled)
+            raise
+        else:
+            self.release(pooled)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            pooled.close()
@@ -1,6 +1,26 @@
+import decimal
+import hashlib
+import os
+import random
 import sqlite3
+import threading
 import time
+from urllib.parse import quote
 from typing import List, Tuple, Optional, Dict, Any
+from utils.query_stats import QueryStats
+from utils.sql_params import parameterize, PARAMSTYLES
+from utils.sql_tokens import classify_statement
+from connection_pool import ConnectionPool
+from db_router import Endpoint, EndpointRouter
+from schema_cache import SchemaCache
+from sqlite_snapshot import SQLiteSnapshot
+from column_profiler import ColumnProfiler, ProfileStore
+from value_indexer import ValueIndexer
+from utils.value_index import ValueIndex
+from utils.cassette import current_tape
+from utils.single_flight import SingleFlight
+from utils.db_errors import classify_error, is_transient
+from utils.fetch_types import NUMBER_MODES, number_conversion, odbc_datetimeoffset, odbc_decimal, row_limit_hint
 
 try:
     import oracledb
@@ -14,149 +34,843 @@ try:
 except ImportError:
     MSSQL_AVAILABLE = False
 
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+# File extensions DuckDB opens natively; any other attached file is read as SQLite
+_DUCKDB_EXTENSIONS = (".duckdb", ".ddb")
+
+class DuckDBSession:
+    """A DuckDB connection set up for the adapter (default catalog, search path).
+
+    DuckDB's own cursor() opens a new connection without that setup, so cursors here run on
+    the session's connection instead; everything else is delegated to it.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self) -> "_DuckDBCursor":
+        return _DuckDBCursor(self)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+class _DuckDBCursor:
+    def __init__(self, session: DuckDBSession):
+        self.connection = session
+
+    def execute(self, sql: str, params=None) -> "_DuckDBCursor":
+        self.connection._conn.execute(sql, params)
+        return self
+
+    def close(self):
+        pass  # The session outlives its cursors
+
+    def __getattr__(self, name):
+        return getattr(self.connection._conn, name)
+
 class DatabaseAdapter:
-    """Database adapter that supports SQLite, Oracle, and MS SQL Server."""
+    """Database adapter that supports SQLite, Oracle, MS SQL Server and DuckDB."""
     
     def __init__(self, db_config: Dict[str, Any]):
         self.db_config = db_config
         self.db_type = db_config["type"].lower()
+        # Per-query-shape count / latency / error rate, keyed by SQL fingerprint
+        self.query_stats = QueryStats()
+        # Identical reads running at the same time share one execution
+        self.read_flight = SingleFlight()
         
         if self.db_type == "oracle" and not ORACLE_AVAILABLE:
             raise ImportError("Oracle support not available. Install oracledb: pip install oracledb")
         if self.db_type == "mssql" and not MSSQL_AVAILABLE:
             raise ImportError("MS SQL Server support not available. Install pyodbc: pip install pyodbc")
-        if self.db_type not in ["sqlite", "oracle", "mssql"]:
+        if self.db_type == "duckdb" and not DUCKDB_AVAILABLE:
+            raise ImportError("DuckDB support not available. Install duckdb: pip install duckdb")
+        if self.db_type not in ["sqlite", "oracle", "mssql", "duckdb"]:
             raise ValueError(f"Unsupported database type: {self.db_type}")
+
+        # SQLite only: "file", "immutable" or "memory", see _sqlite_connect. The last two are read-only.
+        self.sqlite_mode = db_config.get("sqlite_mode", "file") if self.db_type == "sqlite" else None
+        if self.sqlite_mode not in (None, "file", "immutable", "memory"):
+            raise ValueError(f"Unsupported sqlite_mode: {self.sqlite_mode}")
+        self._snapshots: Dict[str, SQLiteSnapshot] = {}
+        self._snapshot_lock = threading.Lock()
+        # DuckDB: one in-process database per path; pooled connections are cursors on it
+        self._duckdb_roots: Dict[str, Any] = {}
+        self._duckdb_lock = threading.Lock()
+
+        # Read-only sessions: generated queries can't modify data and can run on read replicas
+        self.read_only = db_config.get("read_only", False) or self.sqlite_mode in ("immutable", "memory")
+        # Bind predicate literals so repeated query shapes reuse one parsed statement
+        self.parameterize = db_config.get("parameterize", True)
+        self.statement_cache_size = db_config.get("statement_cache_size", 64)
+        # Oracle/MSSQL fetch: CLOB/NCLOB/BLOB as str/bytes inline instead of LOB locators (a round
+        # trip per value), numbers per number_mode (see utils.fetch_types), and Oracle
+        # arraysize/prefetchrows sized per query from its row limit or the rows it returned before
+        self.fetch_lobs = db_config.get("fetch_lobs", True)
+        self.number_mode = db_config.get("number_mode", "auto")
+        if self.number_mode not in NUMBER_MODES:
+            raise ValueError(f"Unsupported number_mode: {self.number_mode}")
+        self.fetch_arraysize = db_config.get("fetch_arraysize", 1000)
+        self.max_fetch_arraysize = db_config.get("max_fetch_arraysize", 10000)
+        # Transient driver errors (lock timeouts, deadlocks, dropped sessions) are retried here
+        # with jittered exponential backoff instead of being handed to the LLM debug loop
+        self.transient_retries = db_config.get("transient_retries", 3)
+        self.retry_base_delay = db_config.get("retry_base_delay", 0.1)
+        self.retry_max_delay = db_config.get("retry_max_delay", 2.0)
+        self.transient_retry_count = 0
+        # Table row counts for sampled previews, from catalog statistics; kept row_estimate_ttl seconds
+        self.row_estimate_ttl = db_config.get("row_estimate_ttl", 300)
+        self._row_estimates: Dict[str, Tuple[float, Optional[int]]] = {}
+
+        # One endpoint per physical database: reads are spread over replicas, writes go to the primary.
+        # Each replica entry only overrides the connection keys that differ (path, dsn, server, ...).
+        primary = self._make_endpoint("primary", db_config, is_primary=True, read_only=self.read_only)
+        replicas = [
+            self._make_endpoint(f"replica{i}", {**db_config, **replica}, is_primary=False, read_only=True)
+            for i, replica in enumerate(db_config.get("replicas") or [], 1)
+        ]
+        self.router = EndpointRouter(primary, replicas, policy=db_config.get("routing", "ewma"))
+
+        # Introspected once and shared by every flow run. DDL and schema_ttl (seconds) only mark
+        # it stale: the next get_schema() re-reads just the tables whose DDL version changed.
+        # "schemas" scopes it to Oracle owners / SQL Server schemas / attached SQLite databases;
+        # each one is loaded the first time a request asks for it.
+        self.schema_ttl = db_config.get("schema_ttl")
+        self.schemas = tuple(db_config.get("schemas") or (None,))
+        self._schemas: Dict[Optional[str], SchemaCache] = {}
+        self._schema_views: Dict[tuple, tuple] = {}
+        self._schema_lock = threading.Lock()
+
+        # Optional background column profiling (sample values, cardinality) for the prompt
+        self.profiler: Optional[ColumnProfiler] = None
+        if db_config.get("profile_columns"):
+            store = ProfileStore(self.db_key(), db_config.get("profile_cache"))
+            self.profiler = ColumnProfiler(self, store, sample_rows=db_config.get("profile_sample_rows", 10000))
+            self.profiler.start()
+
+        # Optional on-disk index of column values, used to link literals in questions
+        self.value_indexer: Optional[ValueIndexer] = None
+        if db_config.get("value_index"):
+            self.value_indexer = ValueIndexer(self, db_config["value_index"],
+                                              max_distinct=db_config.get("value_index_max_distinct", 5000),
+                                              max_age=db_config.get("value_index_max_age", 86400.0))
+            self.value_indexer.start()
+
+    def _make_endpoint(self, name: str, config: Dict[str, Any], is_primary: bool, read_only: bool) -> Endpoint:
+        pool = ConnectionPool(
+            lambda: self.get_connection(config, read_only),
+            max_idle=config.get("pool_size", 4),
+            cursor_cache_size=self.statement_cache_size if self.db_type == "mssql" else 0,
+            validate=self._connection_current if self.sqlite_mode == "memory" else None
+        )
+        return Endpoint(name, config, pool, is_primary, read_only)
     
-    def get_connection(self):
+    def get_connection(self, config: Optional[Dict[str, Any]] = None, read_only: Optional[bool] = None):
+        """Open a new connection to the primary, or to the endpoint described by config."""
+        config = config or self.db_config
+        read_only = self.read_only if read_only is None else read_only
         if self.db_type == "sqlite":
-            return sqlite3.connect(self.db_config["path"])
+            return self._sqlite_connect(config, read_only)
+        elif self.db_type == "duckdb":
+            return self._duckdb_connect(config)
         elif self.db_type == "oracle":
-            return oracledb.connect(
-                user=self.db_config["user"],
-                password=self.db_config["password"],
-                dsn=self.db_config["dsn"]
+            conn = oracledb.connect(
+                user=config["user"],
+                password=config["password"],
+                dsn=config["dsn"],
+                stmtcachesize=self.statement_cache_size
             )
+            conn.outputtypehandler = self._oracle_output_type_handler
+            return conn
         elif self.db_type == "mssql":
             # Use ODBC Driver 17 for SQL Server by default
-            driver = self.db_config.get("driver", "ODBC Driver 17 for SQL Server")
-            server = self.db_config["server"]
-            port = self.db_config.get("port", 1433)
-            database = self.db_config["database"]
-            user = self.db_config["user"]
-            password = self.db_config["password"]
+            driver = config.get("driver", "ODBC Driver 17 for SQL Server")
+            server = config["server"]
+            port = config.get("port", 1433)
+            database = config["database"]
+            user = config["user"]
+            password = config["password"]
             conn_str = (
                 f"DRIVER={{{driver}}};SERVER={server},{port};DATABASE={database};UID={user};PWD={password}"
             )
-            return pyodbc.connect(conn_str)
+            if read_only:
+                # Lets an availability group listener route the session to a readable secondary
+                conn_str += ";ApplicationIntent=ReadOnly"
+            if config.get("packet_size"):
+                # Larger TDS packets: fewer network round trips for wide result sets
+                conn_str += f";Packet Size={int(config['packet_size'])}"
+            conn = pyodbc.connect(conn_str)
+            if self.number_mode != "exact":  # pyodbc's own conversion is to Decimal
+                conn.add_output_converter(pyodbc.SQL_DECIMAL, odbc_decimal(self.number_mode))
+                conn.add_output_converter(pyodbc.SQL_NUMERIC, odbc_decimal(self.number_mode))
+            conn.add_output_converter(-155, odbc_datetimeoffset)  # SQL_SS_TIMESTAMPOFFSET
+            return conn
+
+    def _oracle_output_type_handler(self, cursor, name, default_type, size, precision, scale):
+        """Fetch LOBs inline and numbers per number_mode; None keeps oracledb's default."""
+        if self.fetch_lobs:
+            if default_type is oracledb.DB_TYPE_CLOB:
+                return cursor.var(oracledb.DB_TYPE_LONG, arraysize=cursor.arraysize)
+            if default_type is oracledb.DB_TYPE_NCLOB:
+                return cursor.var(oracledb.DB_TYPE_LONG_NVARCHAR, arraysize=cursor.arraysize)
+            if default_type is oracledb.DB_TYPE_BLOB:
+                return cursor.var(oracledb.DB_TYPE_LONG_RAW, arraysize=cursor.arraysize)
+        if default_type is oracledb.DB_TYPE_NUMBER:
+            kind = number_conversion(precision, scale, self.number_mode)
+            if kind is not None:
+                python_type = {"int": int, "float": float, "decimal": decimal.Decimal}[kind]
+                return cursor.var(python_type, arraysize=cursor.arraysize)
+        return None
+
+    def _tune_fetch(self, cursor, sql_to_run: str):
+        """Size an Oracle cursor's fetch batches for the rows the query is expected to return;
+        prefetching one row more than that lets execute() bring back the whole result.
+
+        Only a bound stated in the SQL may shrink the batches. Row counts seen before for the
+        query's shape (whose literals may differ) can only grow them."""
+        limit = row_limit_hint(sql_to_run)
+        if limit is not None:
+            size = max(1, min(limit, self.max_fetch_arraysize))
+        else:
+            expected = self.query_stats.expected_rows(sql_to_run)
+            size = self.fetch_arraysize
+            if expected is not None:
+                size = max(self.fetch_arraysize, min(expected, self.max_fetch_arraysize))
+        cursor.arraysize = size
+        cursor.prefetchrows = size + 1
     
-    def get_schema(self) -> str:
+    def _sqlite_connect(self, config: Dict[str, Any], read_only: bool):
+        """Open a SQLite connection in the configured sqlite_mode:
+        "file" (tuned: mmap, large page cache, in-memory temp tables, WAL if sqlite_wal), "immutable"
+        (read-only, no locking or change detection; for files nothing writes to) or "memory"
+        (a private in-memory copy per connection, reloaded when the file changes)."""
+        if self.sqlite_mode == "memory":
+            return self._sqlite_snapshot(config).connect(self.statement_cache_size)
+        # Pooled connections may be used from any thread, one at a time
+        if self.sqlite_mode == "immutable":
+            open_uri = lambda path: f"file:{quote(os.path.abspath(path))}?immutable=1"
+        elif read_only:
+            open_uri = lambda path: f"file:{quote(os.path.abspath(path))}?mode=ro"
+        else:
+            open_uri = None
+        if open_uri:
+            conn = sqlite3.connect(open_uri(config["path"]), uri=True, check_same_thread=False,
+                                   cached_statements=self.statement_cache_size)
+        else:
+            conn = sqlite3.connect(config["path"], check_same_thread=False,
+                                   cached_statements=self.statement_cache_size)
+            if config.get("sqlite_wal", False) and not read_only:
+                # Readers don't block the writer or each other; NORMAL is durable in WAL mode.
+                # Opt-in: journal_mode is stored in the file and changes it for every other user
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA mmap_size = {int(config.get('sqlite_mmap_size', 256 * 1024 * 1024))}")
+        conn.execute(f"PRAGMA cache_size = -{int(config.get('sqlite_cache_kb', 64 * 1024))}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        # Extra databases, queried as alias.table
+        for alias, path in (config.get("attach") or {}).items():
+            target = open_uri(path) if open_uri else path
+            conn.execute(f"ATTACH DATABASE ? AS {self._quote_ident(alias)}", (target,))
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _sqlite_snapshot(self, config: Dict[str, Any]) -> SQLiteSnapshot:
+        """The in-memory snapshot of the endpoint's file, created on first use."""
+        with self._snapshot_lock:
+            snapshot = self._snapshots.get(config["path"])
+            if snapshot is None:
+                snapshot = SQLiteSnapshot(config["path"], config.get("attach"),
+                                          check_interval=config.get("snapshot_check_interval", 1.0),
+                                          on_reload=self.invalidate_schema)
+                self._snapshots[config["path"]] = snapshot
+            return snapshot
+
+    @staticmethod
+    def _duckdb_catalog(path: str) -> str:
+        """Catalog name a database file is attached under: its file name without extension."""
+        return os.path.splitext(os.path.basename(path))[0]
+
+    @staticmethod
+    def _duckdb_source(path: str) -> str:
+        """Table function reading a Parquet/CSV/JSON file, glob or (Parquet) directory."""
+        literal = "'" + path.replace("'", "''") + "'"
+        lowered = path.lower()
+        if os.path.isdir(path):
+            literal = "'" + os.path.join(path, "**", "*.parquet").replace("'", "''") + "'"
+            return f"read_parquet({literal}, union_by_name = true)"
+        if lowered.endswith((".csv", ".tsv", ".csv.gz", ".tsv.gz")):
+            return f"read_csv_auto({literal})"
+        if lowered.endswith((".json", ".ndjson", ".jsonl", ".json.gz", ".ndjson.gz", ".jsonl.gz")):
+            return f"read_json_auto({literal})"
+        return f"read_parquet({literal}, union_by_name = true)"
+
+    def _duckdb_root(self, config: Dict[str, Any]):
+        """The endpoint's in-memory DuckDB database, set up on first use.
+
+        "path" (a SQLite or DuckDB file) is attached and becomes the default catalog, "attach"
+        maps extra aliases to files queried as alias.table, and "files" maps view names to
+        Parquet/CSV/JSON files, globs or Parquet directories, scanned in place. Views live in
+        the in-memory catalog, which stays writable even when the attached files are not.
+        """
+        path = config.get("path")
+        with self._duckdb_lock:
+            root = self._duckdb_roots.get(path)
+            if root is not None:
+                return root
+            settings = {}
+            if config.get("threads"):
+                settings["threads"] = int(config["threads"])
+            if config.get("memory_limit"):
+                settings["memory_limit"] = str(config["memory_limit"])
+            root = duckdb.connect(":memory:", config=settings)
+            files = {self._duckdb_catalog(path): path} if path else {}
+            files.update(config.get("attach") or {})
+            if any(not p.lower().endswith(_DUCKDB_EXTENSIONS) for p in files.values()):
+                self._load_duckdb_sqlite(root)
+            for alias, file_path in files.items():
+                options = [] if file_path.lower().endswith(_DUCKDB_EXTENSIONS) else ["TYPE sqlite"]
+                if self.read_only:
+                    options.append("READ_ONLY")
+                suffix = f" ({', '.join(options)})" if options else ""
+                target = "'" + file_path.replace("'", "''") + "'"
+                root.execute(f"ATTACH {target} AS {self._quote_ident(alias)}{suffix}")
+            for view, source in (config.get("files") or {}).items():
+                root.execute(f"CREATE OR REPLACE VIEW memory.main.{self._quote_ident(view)} AS "
+                             f"SELECT * FROM {self._duckdb_source(source)}")
+            self._duckdb_roots[path] = root
+            return root
+
+    @staticmethod
+    def _load_duckdb_sqlite(root):
+        """Load DuckDB's sqlite extension, which reads SQLite files; DuckDB downloads it on first use."""
+        try:
+            root.execute("LOAD sqlite")
+            return
+        except duckdb.Error:
+            pass  # Not installed yet
+        try:
+            root.execute("INSTALL sqlite")
+            root.execute("LOAD sqlite")
+        except duckdb.Error as e:
+            raise ImportError("Reading SQLite files with DuckDB needs its sqlite extension, which could not be "
+                              f"installed ({e}). Run INSTALL sqlite once while online, or use a DuckDB file.") from e
+
+    def _duckdb_connect(self, config: Dict[str, Any]) -> DuckDBSession:
+        # A duplicate of the root is a separate connection to the same database, usable from any thread
+        conn = self._duckdb_root(config).cursor()
+        if config.get("path"):
+            catalog = self._duckdb_catalog(config["path"])
+            conn.execute(f"USE {self._quote_ident(catalog)}")
+            # Unqualified names: the database file's tables, then the views over data files
+            search_path = f"{self._quote_ident(catalog)}.main,memory.main".replace("'", "''")
+            conn.execute(f"SET search_path = '{search_path}'")
+        return DuckDBSession(conn)
+
+    @staticmethod
+    def _connection_current(conn) -> bool:
+        """False for a connection over an outdated in-memory snapshot."""
+        snapshot = getattr(conn, "snapshot", None)
+        return snapshot is None or snapshot.is_current(conn)
+
+    def get_schema(self, refresh: bool = False, schemas: Optional[List[str]] = None) -> str:
+        """Schema text for the given schemas (default: db_config["schemas"], else the
+        connection's own). Tables outside the default schema are qualified as schema.table."""
+        return self._schema_view(refresh, schemas)[0]
+
+    def get_schema_tables(self, refresh: bool = False,
+                          schemas: Optional[List[str]] = None) -> Dict[str, List[Tuple[str, str]]]:
+        """The cached schema model: {table: [(column, type), ...]}."""
+        return self._schema_view(refresh, schemas)[1]
+
+    @property
+    def schema_version(self) -> int:
+        """Changes whenever a loaded schema does."""
+        with self._schema_lock:
+            return sum(cache.version for cache in self._schemas.values())
+
+    def invalidate_schema(self):
+        """Mark every loaded schema stale, e.g. after running DDL."""
+        with self._schema_lock:
+            for cache in self._schemas.values():
+                cache.stale = True
+        self._row_estimates.clear()
+
+    def _schema_view(self, refresh: bool, schemas: Optional[List[str]]) -> tuple:
+        scope = tuple(schemas) if schemas else self.schemas
+        caches = [self._schema_cache(schema, refresh) for schema in scope]
+        if len(caches) == 1:
+            return caches[0].text, caches[0].tables
+        # Merged text/model for a multi-schema scope, rebuilt only when one of them changed
+        key = tuple(cache.version for cache in caches)
+        with self._schema_lock:
+            view = self._schema_views.get(scope)
+            if view is None or view[0] != key:
+                tables = {}
+                for cache in caches:
+                    tables.update(cache.tables)
+                view = self._schema_views[scope] = (
+                    key, "\n\n".join(cache.text for cache in caches if cache.text), tables)
+        return view[1], view[2]
+
+    def _schema_cache(self, schema: Optional[str], refresh: bool) -> SchemaCache:
+        with self._schema_lock:
+            cache = self._schemas.get(schema)
+            if cache is None:
+                cache = self._schemas[schema] = SchemaCache(schema)
+        # Per-schema lock: loading one schema doesn't block readers of another
+        with cache.lock:
+            expired = self.schema_ttl is not None and time.time() - cache.loaded_at > self.schema_ttl
+            if refresh or expired or cache.stale or not cache.loaded:
+                self._refresh_schema(cache)
+                cache.stale = False
+                cache.loaded_at = time.time()
+        return cache
+
+    def _refresh_schema(self, cache: SchemaCache):
+        """List per-table DDL versions and re-read columns only for new or changed tables."""
         if self.db_type == "sqlite":
-            return self._get_sqlite_schema()
+            list_versions, read_columns = self._sqlite_table_versions, self._sqlite_table_columns
         elif self.db_type == "oracle":
-            return self._get_oracle_schema()
-        elif self.db_type == "mssql":
-            return self._get_mssql_schema()
-    
-    def _get_sqlite_schema(self) -> str:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = cursor.fetchall()
-        schema = []
-        for table_name_tuple in tables:
-            table_name = table_name_tuple[0]
-            schema.append(f"Table: {table_name}")
-            cursor.execute(f"PRAGMA table_info({table_name});")
-            columns = cursor.fetchall()
-            for col in columns:
-                schema.append(f"  - {col[1]} ({col[2]})")
-            schema.append("")
-        conn.close()
-        return "\n".join(schema).strip()
-    
-    def _get_oracle_schema(self) -> str:
+            list_versions, read_columns = self._oracle_table_versions, self._oracle_table_columns
+        elif self.db_type == "duckdb":
+            list_versions, read_columns = self._duckdb_table_versions, self._duckdb_table_columns
+        else:
+            list_versions, read_columns = self._mssql_table_versions, self._mssql_table_columns
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT table_name 
-            FROM user_tables 
-            ORDER BY table_name
-        """)
-        tables = cursor.fetchall()
-        schema = []
-        for table_tuple in tables:
-            table_name = table_tuple[0]
-            schema.append(f"Table: {table_name}")
+        try:
+            cursor = conn.cursor()
+            versions = list_versions(cursor, cache.schema)
+            changed, _ = cache.diff(versions)
+            if not cache.loaded or len(changed) == len(versions):
+                columns = read_columns(cursor, cache.schema, None)  # Everything: one catalog scan
+            else:
+                columns = read_columns(cursor, cache.schema, changed) if changed else {}
+            cache.apply(versions, columns)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _quote_ident(name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+
+    @staticmethod
+    def _chunks(names: List[str], size: int):
+        for i in range(0, len(names), size):
+            yield names[i:i + size]
+
+    def _sqlite_table_versions(self, cursor, schema: Optional[str]) -> Dict[str, str]:
+        # ALTER TABLE rewrites the stored CREATE statement, so its hash changes with the table
+        prefix = f"{self._quote_ident(schema)}." if schema else ""
+        cursor.execute(f"SELECT name, sql FROM {prefix}sqlite_master WHERE type='table';")
+        return {
+            name: hashlib.blake2b((sql or "").encode("utf-8"), digest_size=8).hexdigest()
+            for name, sql in cursor.fetchall()
+        }
+
+    def _sqlite_table_columns(self, cursor, schema: Optional[str], names: Optional[List[str]]):
+        prefix = f"{self._quote_ident(schema)}." if schema else ""
+        if names is None:
+            cursor.execute(f"SELECT name FROM {prefix}sqlite_master WHERE type='table';")
+            names = [row[0] for row in cursor.fetchall()]
+        columns = {}
+        for table_name in names:
+            cursor.execute(f"PRAGMA {prefix}table_info({self._quote_ident(table_name)});")
+            columns[table_name] = [(col[1], col[2], "") for col in cursor.fetchall()]
+        return columns
+
+    def _oracle_table_versions(self, cursor, schema: Optional[str]) -> Dict[str, Any]:
+        if schema is None:
             cursor.execute("""
-                SELECT column_name, data_type, data_length, nullable
-                FROM user_tab_columns 
-                WHERE table_name = :table_name
-                ORDER BY column_id
-            """, {"table_name": table_name})
-            columns = cursor.fetchall()
-            for col in columns:
-                col_name, data_type, data_length, nullable = col
-                nullable_str = "NULL" if nullable == "Y" else "NOT NULL"
-                if data_length and data_type in ['VARCHAR2', 'CHAR', 'NVARCHAR2', 'NCHAR']:
-                    type_str = f"{data_type}({data_length})"
-                else:
-                    type_str = data_type
-                schema.append(f"  - {col_name} ({type_str}) {nullable_str}")
-            schema.append("")
-        conn.close()
-        return "\n".join(schema).strip()
-    
-    def _get_mssql_schema(self) -> str:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
+                SELECT t.table_name, o.last_ddl_time
+                FROM user_tables t
+                JOIN user_objects o ON o.object_name = t.table_name AND o.object_type = 'TABLE'
+                ORDER BY t.table_name
+            """)
+        else:
+            cursor.execute("""
+                SELECT t.table_name, o.last_ddl_time
+                FROM all_tables t
+                JOIN all_objects o
+                  ON o.owner = t.owner AND o.object_name = t.table_name AND o.object_type = 'TABLE'
+                WHERE t.owner = :owner
+                ORDER BY t.table_name
+            """, {"owner": schema})
+        return dict(cursor.fetchall())
+
+    def _oracle_table_columns(self, cursor, schema: Optional[str], names: Optional[List[str]]):
+        if schema is None:
+            query = """
+                SELECT table_name, column_name, data_type, data_length, nullable
+                FROM user_tab_columns
+                WHERE 1 = 1
+            """
+            binds = {}
+        else:
+            query = """
+                SELECT table_name, column_name, data_type, data_length, nullable
+                FROM all_tab_columns
+                WHERE owner = :owner
+            """
+            binds = {"owner": schema}
+        if names is None:
+            cursor.execute(query + " ORDER BY table_name, column_id", binds)
+            rows = cursor.fetchall()
+        else:
+            rows = []
+            # Oracle allows at most 1000 expressions in an IN list
+            for chunk in self._chunks(names, 1000):
+                chunk_binds = {f"t{i}": name for i, name in enumerate(chunk)}
+                in_list = ", ".join(f":{key}" for key in chunk_binds)
+                cursor.execute(query + f" AND table_name IN ({in_list}) ORDER BY table_name, column_id",
+                               {**binds, **chunk_binds})
+                rows.extend(cursor.fetchall())
+        columns = {}
+        for table_name, col_name, data_type, data_length, nullable in rows:
+            nullable_str = "NULL" if nullable == "Y" else "NOT NULL"
+            if data_length and data_type in ['VARCHAR2', 'CHAR', 'NVARCHAR2', 'NCHAR']:
+                type_str = f"{data_type}({data_length})"
+            else:
+                type_str = data_type
+            columns.setdefault(table_name, []).append((col_name, type_str, nullable_str))
+        return columns
+
+    def _mssql_table_versions(self, cursor, schema: Optional[str]) -> Dict[str, Any]:
+        # Tables and views, as INFORMATION_SCHEMA.COLUMNS lists both
+        query = """
+            SELECT o.name, o.modify_date
+            FROM sys.objects o
+            JOIN sys.schemas s ON s.schema_id = o.schema_id
+            WHERE o.type IN ('U', 'V') AND o.is_ms_shipped = 0
+        """
+        if schema is None:
+            cursor.execute(query + " ORDER BY o.name")
+        else:
+            cursor.execute(query + " AND s.name = ? ORDER BY o.name", schema)
+        return {name: modify_date for name, modify_date in cursor.fetchall()}
+
+    def _mssql_table_columns(self, cursor, schema: Optional[str], names: Optional[List[str]]):
+        query = """
             SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE
             FROM INFORMATION_SCHEMA.COLUMNS
-            ORDER BY TABLE_NAME, ORDINAL_POSITION
-        """)
-        rows = cursor.fetchall()
-        schema = []
-        last_table = None
+            WHERE 1 = 1
+        """
+        params = []
+        if schema is not None:
+            query += " AND TABLE_SCHEMA = ?"
+            params.append(schema)
+        order = " ORDER BY TABLE_NAME, ORDINAL_POSITION"
+        if names is None:
+            cursor.execute(query + order, params)
+            rows = cursor.fetchall()
+        else:
+            rows = []
+            # SQL Server allows at most 2100 parameters per request
+            for chunk in self._chunks(names, 2000):
+                marks = ", ".join("?" * len(chunk))
+                cursor.execute(query + f" AND TABLE_NAME IN ({marks})" + order, params + list(chunk))
+                rows.extend(cursor.fetchall())
+        columns = {}
         for table_name, column_name, data_type in rows:
-            if table_name != last_table:
-                schema.append(f"Table: {table_name}")
-                last_table = table_name
-            schema.append(f"  - {column_name} ({data_type})")
-        conn.close()
-        return "\n".join(schema).strip()
+            columns.setdefault(table_name, []).append((column_name, data_type, ""))
+        return columns
     
+    def _duckdb_catalogs(self, schema: Optional[str]) -> List[str]:
+        """Catalogs a schema scope covers; the default one holds the database file and the views."""
+        if schema is not None:
+            return [schema]
+        path = self.db_config.get("path")
+        return [self._duckdb_catalog(path), "memory"] if path else ["memory"]
+
+    def _duckdb_table_versions(self, cursor, schema: Optional[str]) -> Dict[str, str]:
+        # Attached SQLite tables have no stored DDL; the column list changes with the table
+        catalogs = self._duckdb_catalogs(schema)
+        cursor.execute(f"""
+            SELECT table_name, string_agg(column_name || ' ' || data_type, ', ' ORDER BY column_index)
+            FROM duckdb_columns()
+            WHERE database_name IN ({", ".join("?" * len(catalogs))}) AND schema_name = 'main'
+            GROUP BY table_name
+        """, catalogs)
+        return {
+            name: hashlib.blake2b((signature or "").encode("utf-8"), digest_size=8).hexdigest()
+            for name, signature in cursor.fetchall()
+        }
+
+    def _duckdb_table_columns(self, cursor, schema: Optional[str], names: Optional[List[str]]):
+        catalogs = self._duckdb_catalogs(schema)
+        query = f"""
+            SELECT table_name, column_name, data_type, is_nullable
+            FROM duckdb_columns()
+            WHERE database_name IN ({", ".join("?" * len(catalogs))}) AND schema_name = 'main'
+        """
+        params = list(catalogs)
+        if names is not None:
+            query += f" AND table_name IN ({', '.join('?' * len(names))})"
+            params.extend(names)
+        cursor.execute(query + " ORDER BY table_name, column_index", params)
+        columns = {}
+        for table_name, column_name, data_type, is_nullable in cursor.fetchall():
+            columns.setdefault(table_name, []).append((column_name, data_type, "" if is_nullable else "NOT NULL"))
+        return columns
+
+    def prepare_query(self, sql_query: str) -> Tuple[str, List[Any]]:
+        """Extract predicate literals into bind variables (:1 on Oracle, ? elsewhere)."""
+        if not self.parameterize:
+            return sql_query, []
+        # sqlite3 can't bind Decimal; REAL columns compare as float anyway. Oracle string
+        # literals stay inline: a bind would turn CHAR comparisons from blank-padded to non-padded
+        return parameterize(sql_query, PARAMSTYLES[self.db_type], exact_decimals=self.db_type != "sqlite",
+                            bind_strings=self.db_type != "oracle")
+
     def execute_query(self, sql_query: str) -> Tuple[bool, Any, List[str]]:
+        tape = current_tape()
+        if tape is not None:
+            return tape.query(sql_query, self._execute_query)
+        return self._execute_query(sql_query)
+
+    def _execute_query(self, sql_query: str) -> Tuple[bool, Any, List[str]]:
+        start_time = time.time()
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            start_time = time.time()
-            cursor.execute(sql_query)
-            is_select = sql_query.strip().upper().startswith(("SELECT", "WITH"))
-            if is_select:
-                results = cursor.fetchall()
-                column_names = [desc[0] for desc in cursor.description] if cursor.description else []
+            statement_kind = classify_statement(sql_query)
+            if self.read_only and statement_kind != "read":
+                raise PermissionError(f"Refusing to run a {statement_kind} statement on a read-only connection")
+            sql_to_run, params = self.prepare_query(sql_query)
+            if statement_kind == "read":
+                # Keyed on the exact statement and binds: a fingerprint alone folds literals
+                # that weren't bound (select list, row limits) and would merge different queries
+                key = (" ".join(sql_to_run.split()), tuple(params))
+                results, column_names = self.read_flight.do(
+                    key, lambda: self._execute_retrying(sql_to_run, params, statement_kind)
+                )
             else:
-                conn.commit()
-                results = f"Query OK. Rows affected: {cursor.rowcount}"
-                column_names = []
-            conn.close()
+                results, column_names = self._execute_retrying(sql_to_run, params, statement_kind)
+            if statement_kind in ("ddl", "other"):
+                self.invalidate_schema()
             duration = time.time() - start_time
+            self.query_stats.record(sql_query, duration, True,
+                                    rows=len(results) if isinstance(results, list) else None)
             print(f"SQL executed in {duration:.3f} seconds.")
             return (True, results, column_names)
         except Exception as e:
+            self.query_stats.record(sql_query, time.time() - start_time, False)
             print(f"Database Error during execution: {e}")
-            if 'conn' in locals() and conn:
-                try:
-                    conn.close()
-                except Exception:
-                    pass
             return (False, str(e), [])
+
+    def _execute_retrying(self, sql_to_run: str, params: List[Any], statement_kind: str):
+        """_execute_routed, retried on transient errors. Reads retry on any of them; writes
+        only on contention (deadlock, lock timeout), where the database rolled the statement
+        back. After a lost connection a write may already have been applied."""
+        attempt = 0
+        while True:
+            try:
+                return self._execute_routed(sql_to_run, params, statement_kind)
+            except Exception as e:
+                kind = classify_error(e, self.db_type)
+                retryable = kind == "contention" or (kind == "connection" and statement_kind == "read")
+                if not retryable or attempt >= self.transient_retries:
+                    raise
+                # Full jitter: concurrent retries of a contended query don't collide again
+                delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+                attempt += 1
+                self.transient_retry_count += 1
+                print(f"Transient database error ({kind}): {e}. "
+                      f"Retrying in {delay:.2f}s ({attempt}/{self.transient_retries})...")
+                time.sleep(delay)
+
+    def _execute_routed(self, sql_to_run: str, params: List[Any], statement_kind: str):
+        """Run on the best endpoint, failing over to the next one if it can't be reached."""
+        last_error = None
+        for endpoint in self.router.candidates(read=statement_kind == "read"):
+            self.router.begin(endpoint)
+            started = time.time()
+            try:
+                pooled = endpoint.pool.acquire()
+            except Exception as e:
+                # Connection failure: take the endpoint out of rotation and try the next one
+                self.router.end(endpoint, None)
+                print(f"Endpoint {endpoint.name} unavailable: {e}")
+                last_error = e
+                continue
+            try:
+                # A session that failed transiently is closed rather than pooled again
+                with endpoint.pool.connection(pooled, discard_on=lambda e: is_transient(e, self.db_type)):
+                    result = self._run_on(pooled, endpoint, sql_to_run, params, statement_kind)
+            except Exception as e:
+                if classify_error(e, self.db_type) == "connection":
+                    # The session died (server restart, network): the endpoint is down, not the query.
+                    # Only reads have another candidate; a write is left to the caller.
+                    self.router.end(endpoint, None)
+                    print(f"Endpoint {endpoint.name} lost its connection: {e}")
+                    last_error = e
+                    continue
+                # A failing query is not a failing endpoint; only latency is recorded
+                self.router.end(endpoint, time.time() - started)
+                raise
+            self.router.end(endpoint, time.time() - started)
+            return result
+        raise last_error
+
+    def explain(self, sql_query: str) -> Optional[str]:
+        """Have the database compile `sql_query` without running it; returns the error message,
+        or None when it is accepted. Catches unknown tables/columns and type errors cheaply."""
+        tape = current_tape()
+        if tape is not None:
+            return tape.check("explain", sql_query, self._explain)
+        return self._explain(sql_query)
+
+    def _explain(self, sql_query: str) -> Optional[str]:
+        if self.db_type == "oracle" and classify_statement(sql_query) != "read":
+            # cursor.parse() runs DDL on the spot (with an implicit commit): compile queries only
+            return "only queries are compiled without running them on Oracle"
+        endpoint = self.router.candidates(read=True)[0]
+        try:
+            with endpoint.pool.connection() as pooled:
+                cursor = pooled.conn.cursor()
+                try:
+                    if self.db_type == "oracle":
+                        cursor.parse(sql_query)  # Parses and resolves names, no execution
+                    elif self.db_type == "mssql":
+                        cursor.execute("EXEC sp_describe_first_result_set @tsql = ?", sql_query)
+                        cursor.fetchall()
+                    elif self.db_type == "duckdb":
+                        cursor.execute(f"EXPLAIN {sql_query}")
+                        cursor.fetchall()
+                    else:
+                        cursor.execute(f"EXPLAIN QUERY PLAN {sql_query}")
+                        cursor.fetchall()
+                finally:
+                    cursor.close()
+                    self._end_read(pooled.conn)
+        except Exception as e:
+            return str(e)
+        return None
+
+    def estimate_rows(self, table: str) -> Optional[int]:
+        """Approximate row count of a (possibly owner-qualified) table, or None if unknown:
+        num_rows on Oracle (as of the last statistics gathering), partition row counts on SQL
+        Server, estimated_size on DuckDB and max(rowid) on SQLite, which is also the upper
+        bound of the rowid ranges a SQLite sample reads. Never scans the table."""
+        cached = self._row_estimates.get(table)
+        if cached is not None and time.time() - cached[0] < self.row_estimate_ttl:
+            return cached[1]
+        owner, _, name = table.rpartition(".")
+        endpoint = self.router.candidates(read=True)[0]
+        try:
+            with endpoint.pool.connection() as pooled:
+                cursor = pooled.conn.cursor()
+                try:
+                    if self.db_type == "oracle":
+                        if owner:
+                            cursor.execute("SELECT num_rows FROM all_tables WHERE owner = :o AND table_name = :t",
+                                           {"o": owner.upper(), "t": name.upper()})
+                        else:
+                            cursor.execute("SELECT num_rows FROM user_tables WHERE table_name = :t",
+                                           {"t": name.upper()})
+                    elif self.db_type == "mssql":
+                        cursor.execute("SELECT SUM(rows) FROM sys.partitions "
+                                       "WHERE object_id = OBJECT_ID(?) AND index_id IN (0, 1)", table)
+                    elif self.db_type == "duckdb":
+                        catalog_filter = " AND database_name = ?" if owner else ""
+                        cursor.execute(f"SELECT estimated_size FROM duckdb_tables() WHERE table_name = ?"
+                                       f"{catalog_filter} LIMIT 1", [name] + ([owner] if owner else []))
+                    else:
+                        cursor.execute(f"SELECT max(rowid) FROM {'.'.join(map(self._quote_ident, table.split('.')))}")
+                    row = cursor.fetchone()
+                finally:
+                    cursor.close()
+                    self._end_read(pooled.conn)
+            rows = int(row[0]) if row and row[0] is not None else None
+        except Exception:
+            rows = None  # Views, WITHOUT ROWID tables, missing privileges
+        self._row_estimates[table] = (time.time(), rows)
+        return rows
+
+    def _run_on(self, pooled, endpoint: Endpoint, sql_to_run: str, params: List[Any], statement_kind: str):
+        cursor = pooled.cursor(sql_to_run)
+        if endpoint.read_only and self.db_type == "oracle":
+            # Must be the first statement of the transaction; the rollback below ends it
+            cursor.execute("SET TRANSACTION READ ONLY")
+        if self.db_type == "oracle" and statement_kind == "read":
+            self._tune_fetch(cursor, sql_to_run)
+        if params:
+            cursor.execute(sql_to_run, params)
+        else:
+            cursor.execute(sql_to_run)
+        status = [desc[0] for desc in cursor.description or ()]
+        if statement_kind != "read" and self.db_type == "duckdb" and status in (["Count"], ["Success"]):
+            # DuckDB describes a write's outcome as a result: its affected rows ("Count", no row
+            # for plain DDL) or "Success" (DROP, ...)
+            row = cursor.fetchone()
+            results = f"Query OK. Rows affected: {row[0] if status == ['Count'] and row else 0}"
+            column_names = []
+        elif cursor.description:
+            results = cursor.fetchall()
+            column_names = [desc[0] for desc in cursor.description]
+        else:
+            results = f"Query OK. Rows affected: {cursor.rowcount}"
+            column_names = []
+        if statement_kind == "read":
+            self._end_read(pooled.conn)
+        else:
+            pooled.conn.commit()
+        return results, column_names
+
+    def _end_read(self, conn):
+        """End a read's transaction. DuckDB autocommits and rejects a rollback outside one."""
+        if self.db_type != "duckdb":
+            conn.rollback()
+
+    def column_profiles(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """{table: {column: profile}} gathered so far by the background profiler."""
+        return self.profiler.store.snapshot() if self.profiler else {}
+
+    def value_index(self) -> Optional[ValueIndex]:
+        if self.value_indexer is None:
+            return None
+        self.value_indexer.refresh_if_stale()
+        return self.value_indexer.index
+
+    def db_key(self) -> str:
+        """Identifies the database in caches kept outside it."""
+        config = self.db_config
+        if self.db_type == "sqlite":
+            return f"sqlite:{os.path.abspath(config['path'])}"
+        elif self.db_type == "oracle":
+            return f"oracle:{config['user']}@{config['dsn']}"
+        elif self.db_type == "duckdb":
+            sources = [config.get("path") or ":memory:", *(config.get("attach") or {}).values(),
+                       *(config.get("files") or {}).values()]
+            return "duckdb:" + ",".join(s if s == ":memory:" else os.path.abspath(s) for s in sources)
+        return f"mssql:{config['server']}:{config.get('port', 1433)}/{config['database']}"
+
+    def close(self):
+        """Stop background work and close all pooled connections."""
+        if self.profiler:
+            self.profiler.stop()
+        self.router.close()
+        with self._duckdb_lock:
+            roots, self._duckdb_roots = list(self._duckdb_roots.values()), {}
+        for root in roots:
+            root.close()
     
     def get_db_info(self) -> str:
+        suffix = " (read-only)" if self.read_only else ""
+        if self.router.replicas:
+            suffix += f" + {len(self.router.replicas)} read replica(s), {self.router.policy} routing"
         if self.db_type == "sqlite":
-            return f"SQLite: {self.db_config['path']}"
+            mode = f" [{self.sqlite_mode}]" if self.sqlite_mode != "file" else ""
+            return f"SQLite: {self.db_config['path']}{mode}{suffix}"
         elif self.db_type == "oracle":
-            return f"Oracle: {self.db_config['user']}@{self.db_config['dsn']}"
+            return f"Oracle: {self.db_config['user']}@{self.db_config['dsn']}{suffix}"
+        elif self.db_type == "duckdb":
+            sources = [self.db_config.get("path") or ":memory:"]
+            sources += list((self.db_config.get("attach") or {}).values())
+            sources += list((self.db_config.get("files") or {}).values())
+            return f"DuckDB: {', '.join(sources)}{suffix}"
         elif self.db_type == "mssql":
-            return f"MSSQL: {self.db_config['user']}@{self.db_config['server']}:{self.db_config.get('port', 1433)}/{self.db_config['database']}" 
\ No newline at end of file
+            return f"MSSQL: {self.db_config['user']}@{self.db_config['server']}:{self.db_config.get('port', 1433)}/{self.db_config['database']}{suffix}"
\ No newline at end of file
@@ -0,0 +1,109 @@
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from connection_pool import ConnectionPool
+
+ROUTING_POLICIES = ("ewma", "least_outstanding", "round_robin")
+
+class Endpoint:
+    """One physical database (the primary or a read replica) with its own connection pool
+    and the health / latency bookkeeping the router needs."""
+
+    def __init__(self, name: str, config: Dict[str, Any], pool: ConnectionPool, is_primary: bool,
+                 read_only: bool = False):
+        self.name = name
+        self.config = config
+        self.pool = pool
+        self.is_primary = is_primary
+        self.read_only = read_only
+        self.outstanding = 0
+        self.ewma_latency = 0.0  # seconds; 0 until the first sample so new endpoints get tried
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.down_until
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "primary": self.is_primary,
+            "outstanding": self.outstanding,
+            "ewma_latency": self.ewma_latency,
+            "healthy": self.healthy(time.time()),
+        }
+
+class EndpointRouter:
+    """Routes reads across replicas and writes to the primary.
+
+    Policies:
+      - "ewma": lowest EWMA latency weighted by in-flight requests (default)
+      - "least_outstanding": fewest in-flight requests, EWMA latency breaks ties
+      - "round_robin": rotate through healthy endpoints
+    Endpoints that fail to connect are taken out of rotation for `cooldown` seconds,
+    doubling on consecutive failures up to `max_cooldown`.
+    """
+
+    def __init__(self, primary: Endpoint, replicas: List[Endpoint], policy: str = "ewma",
+                 alpha: float = 0.3, cooldown: float = 5.0, max_cooldown: float = 120.0):
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"Unsupported routing policy: {policy}")
+        self.primary = primary
+        self.replicas = replicas
+        self.policy = policy
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._rr = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def endpoints(self) -> List[Endpoint]:
+        return [self.primary] + self.replicas
+
+    def _score(self, endpoint: Endpoint):
+        if self.policy == "least_outstanding":
+            return (endpoint.outstanding, endpoint.ewma_latency)
+        return (endpoint.ewma_latency * (endpoint.outstanding + 1), endpoint.outstanding)
+
+    def candidates(self, read: bool) -> List[Endpoint]:
+        """Endpoints to try, best first. Reads prefer healthy replicas, then the primary,
+        then unhealthy replicas as a last resort; writes only ever go to the primary."""
+        if not read or not self.replicas:
+            return [self.primary]
+        now = time.time()
+        with self._lock:
+            healthy = [e for e in self.replicas if e.healthy(now)]
+            down = [e for e in self.replicas if not e.healthy(now)]
+            if self.policy == "round_robin" and healthy:
+                start = next(self._rr) % len(healthy)
+                healthy = healthy[start:] + healthy[:start]
+            else:
+                healthy.sort(key=self._score)
+        return healthy + [self.primary] + sorted(down, key=lambda e: e.down_until)
+
+    def begin(self, endpoint: Endpoint):
+        with self._lock:
+            endpoint.outstanding += 1
+
+    def end(self, endpoint: Endpoint, duration: Optional[float]):
+        """Finish a request; duration is None if the endpoint could not serve it."""
+        with self._lock:
+            endpoint.outstanding -= 1
+            if duration is None:
+                endpoint.consecutive_failures += 1
+                backoff = self.cooldown * 2 ** (endpoint.consecutive_failures - 1)
+                endpoint.down_until = time.time() + min(backoff, self.max_cooldown)
+                return
+            endpoint.consecutive_failures = 0
+            endpoint.down_until = 0.0
+            if endpoint.ewma_latency == 0.0:
+                endpoint.ewma_latency = duration
+            else:
+                endpoint.ewma_latency += self.alpha * (duration - endpoint.ewma_latency)
+
+    def close(self):
+        for endpoint in self.endpoints:
+            endpoint.pool.close()
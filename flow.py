@@ -1,24 +1,39 @@
 from pocketflow import Flow, Node
-from nodes import GetSchema, GenerateSQL, ExecuteSQL, DebugSQL
+from nodes import GetSchema, RouteQuestion, LinkValues, GenerateSQL, ExecuteSQL, SummarizeResult, StoreExample, RepairSQL, DebugSQL
 
 def create_text_to_sql_flow():
     """Creates the text-to-SQL workflow with a debug loop."""
     get_schema_node = GetSchema()
+    route_question_node = RouteQuestion()
+    link_values_node = LinkValues()
     generate_sql_node = GenerateSQL()
     execute_sql_node = ExecuteSQL()
+    summarize_result_node = SummarizeResult()
+    store_example_node = StoreExample()
+    repair_sql_node = RepairSQL()
     debug_sql_node = DebugSQL()
 
     # Define the main flow sequence using the default transition operator
-    get_schema_node >> generate_sql_node >> execute_sql_node
+    get_schema_node >> route_question_node >> link_values_node >> generate_sql_node >> execute_sql_node
+    # Catalog questions answered from the schema model ("answered") end the flow without SQL
+
+    # Rows are summarized so downstream consumers get a bounded-size view of any result
+    execute_sql_node - "success" >> summarize_result_node
+    # A query that returned rows becomes a few-shot example for similar questions
+    summarize_result_node >> store_example_node
 
     # --- Define the debug loop connections ---
-    # If ExecuteSQL returns "error_retry", go to DebugSQL
-    execute_sql_node - "error_retry" >> debug_sql_node
+    # If ExecuteSQL returns "error_retry", try a cheap local repair first
+    execute_sql_node - "error_retry" >> repair_sql_node
+
+    # A local repair goes straight back to ExecuteSQL, otherwise fall back to the LLM
+    repair_sql_node - "repaired" >> execute_sql_node
+    repair_sql_node - "llm_debug" >> debug_sql_node
 
     # If DebugSQL completes, go back to ExecuteSQL
     debug_sql_node >> execute_sql_node
 
-    # Note: "success" and "max_retries_reached" from ExecuteSQL will end the flow naturally
+    # Note: non-row results and "max_retries_reached" from ExecuteSQL will end the flow naturally
     # No explicit connections needed for these as they terminate the workflow
 
     # Create the flow
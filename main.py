@@ -1,11 +1,18 @@
 import sys
 import os
+import time
+import contextlib
 import warnings
 import argparse
 from flow import create_text_to_sql_flow
 from populate_db import populate_database, DB_FILE
 from db_adapter import DatabaseAdapter
-from config import ORACLE_CONFIG, ORACLE_ENV_VARS, DEFAULT_MAX_RETRIES
+from config import (ORACLE_CONFIG, ORACLE_ENV_VARS, DEFAULT_MAX_RETRIES, DEFAULT_MAX_LOCAL_REPAIR_PASSES,
+                    EXAMPLE_STORE_CAPACITY, FEW_SHOT_K, SQL_CACHE_CAPACITY, RUN_LOG_PATH, PREVIEW_SAMPLE_ROWS, PREVIEW_LATENCY_TARGET)
+from utils.example_store import ExampleStore
+from utils.sql_cache import SQLCache
+from utils.run_log import RunLog, log_run
+from utils.cassette import Cassette
 
 # Suppress the specific PocketFlow warning about flow endings
 warnings.filterwarnings("ignore", message="Flow ends:*", category=UserWarning)
@@ -20,12 +27,31 @@ def parse_arguments():
     parser = argparse.ArgumentParser(description='Text-to-SQL converter supporting SQLite, Oracle, and MS SQL Server')
     
     # Database type selection
-    parser.add_argument('--db-type', choices=['sqlite', 'oracle', 'mssql'], default='sqlite',
+    parser.add_argument('--db-type', choices=['sqlite', 'oracle', 'mssql', 'duckdb'], default='sqlite',
                         help='Database type (default: sqlite)')
     
     # SQLite options
     parser.add_argument('--sqlite-path', default=DB_FILE,
                         help='Path to SQLite database file (default: ecommerce.db)')
+    parser.add_argument('--sqlite-replica', action='append', default=[], metavar='PATH',
+                        help='Read-only copy of the SQLite database to serve reads (repeatable)')
+    parser.add_argument('--sqlite-attach', action='append', default=[], metavar='ALIAS=PATH',
+                        help='Attach another SQLite database as ALIAS (repeatable); expose it with --schema ALIAS')
+    parser.add_argument('--sqlite-mode', choices=['file', 'immutable', 'memory'], default='file',
+                        help='file: mmap tuned connections (default); immutable: read-only, no locking, '
+                             'for files nothing writes to; memory: read-only in-memory copy, reloaded on change')
+    parser.add_argument('--sqlite-wal', action='store_true',
+                        help='Switch the SQLite file to WAL journaling (persists in the file; --sqlite-mode file only)')
+
+    # DuckDB options
+    parser.add_argument('--duckdb-path', default=None,
+                        help='SQLite or DuckDB file DuckDB attaches as its default catalog (default: --sqlite-path)')
+    parser.add_argument('--duckdb-attach', action='append', default=[], metavar='ALIAS=PATH',
+                        help='Attach another SQLite or DuckDB file as ALIAS (repeatable)')
+    parser.add_argument('--duckdb-file', action='append', default=[], metavar='VIEW=PATH',
+                        help='Expose a Parquet/CSV/JSON file, glob or Parquet directory as view VIEW (repeatable)')
+    parser.add_argument('--duckdb-threads', type=int, default=None,
+                        help='DuckDB worker threads (default: all cores)')
     
     # Oracle options - get defaults from config/env
     oracle_env_config = get_oracle_config_from_env()
@@ -35,6 +61,8 @@ def parse_arguments():
                         help='Oracle password (or set ORACLE_PASSWORD env var)')
     parser.add_argument('--oracle-dsn', default=oracle_env_config.get('dsn'),
                         help='Oracle DSN like host:port/service_name (or set ORACLE_DSN env var)')
+    parser.add_argument('--oracle-replica-dsn', action='append', default=[], metavar='DSN',
+                        help='DSN of a read replica (e.g. Active Data Guard standby) to serve reads (repeatable)')
     
     # MS SQL Server options
     parser.add_argument('--mssql-server', help='MS SQL Server hostname or IP')
@@ -43,10 +71,53 @@ def parse_arguments():
     parser.add_argument('--mssql-password', help='MS SQL Server password')
     parser.add_argument('--mssql-port', type=int, default=1433, help='MS SQL Server port (default: 1433)')
     parser.add_argument('--mssql-driver', default='ODBC Driver 17 for SQL Server', help='ODBC driver (default: ODBC Driver 17 for SQL Server)')
+    parser.add_argument('--mssql-replica-server', action='append', default=[], metavar='HOST',
+                        help='Readable secondary to serve reads (repeatable)')
+    
+    # Schema scoping
+    parser.add_argument('--schema', action='append', default=[], dest='schemas', metavar='NAME',
+                        help='Oracle owner, MSSQL schema or attached SQLite database to expose (repeatable; '
+                             'default: the connection\'s own schema). "main" is the SQLite main database')
+    
+    # Replica routing
+    parser.add_argument('--routing', choices=['ewma', 'least_outstanding', 'round_robin'], default='ewma',
+                        help='How reads are balanced across replicas (default: ewma)')
     
     # Other options
     parser.add_argument('--max-retries', type=int, default=DEFAULT_MAX_RETRIES,
                         help=f'Maximum debug retry attempts (default: {DEFAULT_MAX_RETRIES})')
+    parser.add_argument('--local-repair-passes', type=int, default=DEFAULT_MAX_LOCAL_REPAIR_PASSES,
+                        help=f'Rule-based repair passes before asking the LLM to debug (default: {DEFAULT_MAX_LOCAL_REPAIR_PASSES}, 0 disables)')
+    
+    parser.add_argument('--read-only', action='store_true',
+                        help='Run generated queries in a read-only session (SQLite mode=ro, Oracle READ ONLY transactions, MSSQL ApplicationIntent=ReadOnly)')
+    
+    parser.add_argument('--profile-columns', action='store_true',
+                        help='Profile column values in the background and add sample values to the prompt')
+    parser.add_argument('--profile-cache', default='column_profiles.db', metavar='PATH',
+                        help='SQLite file that keeps column profiles between runs (default: column_profiles.db)')
+    parser.add_argument('--value-index', metavar='PATH',
+                        help='Build/refresh an on-disk index of column values and link values named in the question')
+    parser.add_argument('--example-store', metavar='PATH',
+                        help='SQLite file of verified question/SQL pairs used as few-shot examples (grows with successful runs)')
+    parser.add_argument('--sql-cache', metavar='PATH',
+                        help='SQLite file caching the canonical SQL of answered questions; a question asked again '
+                             'on any backend with the same schema is transpiled instead of sent to the LLM')
+    parser.add_argument('--run-log', default=RUN_LOG_PATH, metavar='PATH',
+                        help='SQLite file that records every run and its SQL attempts (off by default)')
+    parser.add_argument('--record', default=None, metavar='PATH',
+                        help='Append this run (prompts, completions, query results) to a cassette for replay.py')
+    parser.add_argument('--preview', action='store_true',
+                        help='Answer single-table queries on huge tables from a sample first (scaled, with error bounds), '
+                             'then replace it with the exact result')
+    parser.add_argument('--preview-sample-rows', type=int, default=PREVIEW_SAMPLE_ROWS, metavar='N',
+                        help=f'Rows sampled for a preview (default: {PREVIEW_SAMPLE_ROWS})')
+    parser.add_argument('--preview-latency', type=float, default=PREVIEW_LATENCY_TARGET, metavar='SECONDS',
+                        help=f'Run the exact query instead if the preview takes longer (default: {PREVIEW_LATENCY_TARGET})')
+    parser.add_argument('--preview-only', action='store_true',
+                        help='With --preview, keep the approximate result and skip the exact query')
+    parser.add_argument('--run-log-report', action='store_true',
+                        help='Print latency percentiles and failure hotspots from the run log and exit')
     
     # Query (can be multiple words)
     parser.add_argument('query', nargs='*', 
@@ -56,7 +127,26 @@ def parse_arguments():
 
 def create_db_config(args):
     if args.db_type == 'sqlite':
-        return {"type": "sqlite", "path": args.sqlite_path}
+        return {
+            "type": "sqlite",
+            "path": args.sqlite_path,
+            "replicas": [{"path": path} for path in args.sqlite_replica],
+            "attach": dict(item.split("=", 1) for item in args.sqlite_attach),
+            "sqlite_mode": args.sqlite_mode,
+            "sqlite_wal": args.sqlite_wal,
+            "schemas": args.schemas,
+            "routing": args.routing
+        }
+    elif args.db_type == 'duckdb':
+        return {
+            "type": "duckdb",
+            "path": args.duckdb_path or args.sqlite_path,
+            "attach": dict(item.split("=", 1) for item in args.duckdb_attach),
+            "files": dict(item.split("=", 1) for item in args.duckdb_file),
+            "threads": args.duckdb_threads,
+            "schemas": args.schemas,
+            "routing": args.routing
+        }
     elif args.db_type == 'oracle':
         if not all([args.oracle_user, args.oracle_password, args.oracle_dsn]):
             print("\nError: Oracle database requires connection details.")
@@ -71,7 +161,10 @@ def create_db_config(args):
             "type": "oracle",
             "user": args.oracle_user,
             "password": args.oracle_password,
-            "dsn": args.oracle_dsn
+            "dsn": args.oracle_dsn,
+            "replicas": [{"dsn": dsn} for dsn in args.oracle_replica_dsn],
+            "schemas": args.schemas,
+            "routing": args.routing
         }
     elif args.db_type == 'mssql':
         if not all([args.mssql_server, args.mssql_database, args.mssql_user, args.mssql_password]):
@@ -88,18 +181,23 @@ def create_db_config(args):
             "user": args.mssql_user,
             "password": args.mssql_password,
             "port": args.mssql_port,
-            "driver": args.mssql_driver
+            "driver": args.mssql_driver,
+            "replicas": [{"server": server} for server in args.mssql_replica_server],
+            "schemas": args.schemas,
+            "routing": args.routing
         }
 
-def run_text_to_sql(natural_query, db_config, max_debug_retries=3):
+def run_text_to_sql(natural_query, db_config, max_debug_retries=3, max_local_repair_passes=DEFAULT_MAX_LOCAL_REPAIR_PASSES,
+                    canonical_sql=None, example_store=None, sql_cache=None, run_log=None, cassette=None, preview=None):
     try:
         db_adapter = DatabaseAdapter(db_config)
     except Exception as e:
         print(f"Error creating database adapter: {e}")
         sys.exit(1)
 
-    # For SQLite, check if database exists and populate if needed
-    if db_config["type"] == "sqlite":
+    # For SQLite (or a SQLite file read through DuckDB), check if database exists and populate if needed
+    if db_config["type"] == "sqlite" or (db_config["type"] == "duckdb" and db_config.get("path")
+                                         and not db_config["path"].lower().endswith((".duckdb", ".ddb"))):
         db_path = db_config["path"]
         if not os.path.exists(db_path) or os.path.getsize(db_path) == 0:
             print(f"Database at {db_path} missing or empty. Populating...")
@@ -109,10 +207,20 @@ def run_text_to_sql(natural_query, db_config, max_debug_retries=3):
         "db_adapter": db_adapter,
         "natural_query": natural_query,
         "max_debug_attempts": max_debug_retries,
+        "max_local_repair_passes": max_local_repair_passes,
         "debug_attempts": 0,
+        "canonical_sql": canonical_sql, # Reuse a query generated for another backend
+        "example_store": example_store,
+        "sql_cache": sql_cache,
+        "few_shot_k": FEW_SHOT_K,
+        "run_log": run_log,
+        "run_id": RunLog.new_run_id(),
         "final_result": None,
         "final_error": None
     }
+    if preview:
+        # preview_mode, preview_sample_rows, preview_latency_target, preview_exact
+        shared.update(preview)
 
     print(f"\n=== Starting Text-to-SQL Workflow ===")
     print(f"Query: '{natural_query}'")
@@ -121,7 +229,16 @@ def run_text_to_sql(natural_query, db_config, max_debug_retries=3):
     print("=" * 45)
 
     flow = create_text_to_sql_flow()
-    flow.run(shared) # Let errors inside the loop be handled by the flow logic
+    started_at = time.time()
+    # With a cassette, prompts, completions and query results are recorded for replay.py
+    recording = cassette.recording(shared) if cassette is not None else contextlib.nullcontext()
+    try:
+        with recording:
+            flow.run(shared) # Let errors inside the loop be handled by the flow logic
+    except Exception as e:
+        log_run(shared, started_at, error=str(e))
+        raise
+    log_run(shared, started_at)
 
     # Check final state based on shared data
     if shared.get("final_error"):
@@ -130,6 +247,17 @@ def run_text_to_sql(natural_query, db_config, max_debug_retries=3):
     elif shared.get("final_result") is not None:
             print("\n=== Workflow Completed Successfully ===")
             # Result already printed by ExecuteSQL node
+            exact = (shared.get("preview") or {}).get("exact")
+            if exact is not None:
+                print("Preview shown; waiting for the exact result...")
+                success, result, columns = exact.result()
+                if success:
+                    print(f"Exact result ({len(result) if isinstance(result, list) else 0} rows) replaced the preview:")
+                    if columns: print(" | ".join(columns))
+                    for row in (result if isinstance(result, list) else [])[:shared.get("result_print_limit", 50)]:
+                        print(" | ".join(map(str, row)))
+                else:
+                    print(f"Exact query failed, keeping the preview: {result}")
     else:
             # Should not happen if flow logic is correct and covers all end states
             print("\n=== Workflow Completed (Unknown State) ===")
@@ -137,6 +265,22 @@ def run_text_to_sql(natural_query, db_config, max_debug_retries=3):
     print("=" * 36)
     return shared
 
+def print_run_log_report(run_log):
+    if run_log is None:
+        print("No run log configured.")
+        return
+    runs = run_log.latency_percentiles()
+    executions = run_log.latency_percentiles(kind="executed")
+    print(f"Runs: {runs['count']} {run_log.outcomes()}")
+    print(f"Run latency (s): p50={runs['p50']} p95={runs['p95']} p99={runs['p99']}")
+    print(f"SQL latency (s): p50={executions['p50']} p95={executions['p95']} p99={executions['p99']}")
+    for tier, stats in run_log.tier_outcomes().items():
+        print(f"Model tier {tier}: {stats['executions']} executions, {stats['success_rate']:.0%} succeeded")
+    print("Failure hotspots:")
+    for spot in run_log.failure_hotspots():
+        print(f"  {spot['failures']}/{spot['executions']} failed: {spot['sql']}")
+        print(f"    last error: {spot['last_error']}")
+
 if __name__ == "__main__":
     args = parse_arguments()
     
@@ -149,6 +293,23 @@ if __name__ == "__main__":
     
     # Create database configuration
     db_config = create_db_config(args)
+    db_config["read_only"] = args.read_only
+    db_config["profile_columns"] = args.profile_columns
+    db_config["profile_cache"] = args.profile_cache
+    db_config["value_index"] = args.value_index
+    
+    run_log = RunLog(args.run_log) if args.run_log else None
+    if args.run_log_report:
+        print_run_log_report(run_log)
+        sys.exit(0)
+    example_store = ExampleStore(EXAMPLE_STORE_CAPACITY, args.example_store) if args.example_store else None
+    sql_cache = SQLCache(SQL_CACHE_CAPACITY, args.sql_cache) if args.sql_cache else None
     
     # Run the workflow
-    run_text_to_sql(query, db_config, args.max_retries) 
\ No newline at end of file
+    run_text_to_sql(query, db_config, args.max_retries, args.local_repair_passes, example_store=example_store, sql_cache=sql_cache,
+                    run_log=run_log, cassette=Cassette(args.record) if args.record else None,
+                    preview={"preview_mode": True, "preview_sample_rows": args.preview_sample_rows,
+                             "preview_latency_target": args.preview_latency,
+                             "preview_exact": not args.preview_only} if args.preview else None)
+    if run_log:
+        run_log.close() 
\ No newline at end of file
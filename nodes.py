@@ -2,43 +2,205 @@ import sqlite3
 import time
 import yaml # Import yaml here as nodes use it
 from pocketflow import Node
-from utils.call_llm import call_llm
+from utils.model_cascade import generate_with_cascade, cascade_stats
+from utils.sql_repair import repair_sql
+from utils.sql_dialect import dialect_name, to_canonical, from_canonical, parse_error
+from utils.result_summary import summarize_rows
+from column_profiler import format_profile_hints
+from utils.example_store import format_examples
+from utils.run_log import log_event
+from utils.single_flight import SingleFlight
+from utils.metadata_router import route_metadata_question
+from utils.cassette import current_tape
+from utils.db_errors import is_transient
+from utils.sql_cache import normalize_question, schema_fingerprint
+from sample_preview import run_preview, run_exact
 from db_adapter import DatabaseAdapter
 
+def parse_sql_response(llm_response):
+    """SQL from the LLM response: the YAML block asked for, else a code block, else SELECT lines."""
+    # Try to extract SQL from YAML format first
+    try:
+        yaml_str = llm_response.split("```yaml")[1].split("```")[0].strip()
+        structured_result = yaml.safe_load(yaml_str)
+        sql_query = structured_result["sql"].strip().rstrip(';')
+        return sql_query
+    except (IndexError, KeyError, yaml.YAMLError):
+        # Fallback: try to extract SQL from code blocks
+        try:
+            if "```sql" in llm_response:
+                sql_query = llm_response.split("```sql")[1].split("```")[0].strip()
+            elif "```" in llm_response:
+                sql_query = llm_response.split("```")[1].split("```")[0].strip()
+            else:
+                # Last resort: look for SELECT statements
+                lines = llm_response.strip().split('\n')
+                sql_lines = []
+                for line in lines:
+                    line = line.strip()
+                    if line and (line.upper().startswith(('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')) or sql_lines):
+                        sql_lines.append(line)
+                        if line.endswith(';'):
+                            break
+                if sql_lines:
+                    sql_query = ' '.join(sql_lines).rstrip(';')
+                else:
+                    raise ValueError("No valid SQL found in response")
+
+            return sql_query.strip()
+        except Exception as e:
+            # Print the actual response for debugging
+            print(f"\n===== DEBUG: LLM Response =====")
+            print(repr(llm_response))
+            print("===============================\n")
+            raise ValueError(f"Failed to parse LLM response. Expected YAML or SQL format. Error: {str(e)}")
+
+def sql_validator(db_adapter, db_type):
+    """Cheap checks a small model's SQL must pass before it is used: it parses, and the
+    database compiles it (EXPLAIN / parse / describe, nothing is executed). On Oracle only
+    queries can be compiled that way, so other statements are rejected."""
+    def validate(sql):
+        problem = parse_error(sql, db_type)
+        if problem:
+            return f"parse: {problem}"
+        problem = db_adapter.explain(sql)
+        if problem:
+            return f"explain: {problem}"
+        return None
+    return validate
+
 class GetSchema(Node):
     def prep(self, shared):
-        return shared["db_adapter"]
+        # "schemas" narrows a shared adapter to one tenant's schemas for this run
+        return shared["db_adapter"], shared.get("schemas")
 
-    def exec(self, db_adapter):
-        return db_adapter.get_schema()
+    def exec(self, prep_res):
+        db_adapter, schemas = prep_res
+        # The adapter keeps the parsed model alongside the text, patched per changed table
+        return db_adapter.get_schema(schemas=schemas), db_adapter.get_schema_tables(schemas=schemas)
 
     def post(self, shared, prep_res, exec_res):
-        shared["schema"] = exec_res
+        schema, schema_tables = exec_res
+        shared["schema"] = schema
+        shared["schema_tables"] = schema_tables
         print("\n===== DB SCHEMA =====\n")
-        print(exec_res)
+        print(schema)
         print("\n=====================\n")
 
+class RouteQuestion(Node):
+    """Answers catalog questions (tables, columns, types) from the cached schema model; only
+    data questions continue to SQL generation."""
+    def prep(self, shared):
+        # A canonical query to reuse means the question is already known to be about data
+        if shared.get("canonical_sql"):
+            return None, None
+        return shared["natural_query"], shared.get("schema_tables") or {}
+
+    def exec(self, prep_res):
+        natural_query, tables = prep_res
+        if natural_query is None:
+            return None
+        return route_metadata_question(natural_query, tables)
+
+    def post(self, shared, prep_res, exec_res):
+        if exec_res is None:
+            return  # Data question: on to LinkValues and GenerateSQL
+        intent, column_names, rows = exec_res
+        shared["metadata_intent"] = intent
+        shared["final_result"] = rows
+        shared["result_columns"] = column_names
+        print(f"\n===== ANSWERED FROM THE SCHEMA ({intent}) =====\n")
+        print(" | ".join(column_names))
+        for row in rows[:shared.get("result_print_limit", 50)]:
+            print(" | ".join(map(str, row)))
+        if len(rows) > shared.get("result_print_limit", 50):
+            print(f"... ({len(rows) - shared.get('result_print_limit', 50)} more rows)")
+        print("\n=================================\n")
+        return "answered"
+
+class LinkValues(Node):
+    """Links phrases of the question to exact column values from the on-disk value index."""
+    def prep(self, shared):
+        return shared["db_adapter"].value_index(), shared["natural_query"], shared.get("schema_tables") or {}
+
+    def exec(self, prep_res):
+        index, natural_query, tables = prep_res
+        if index is None:
+            return []
+        return [link for link in index.link(natural_query) if link[1] in tables]
+
+    def post(self, shared, prep_res, exec_res):
+        shared["value_links"] = exec_res
+        for score, table, column, value in exec_res:
+            print(f"Linked value: {table}.{column} = {value!r} (score {score})")
+
+# Concurrent runs of the same question against the same schema share one LLM call
+_generate_flight = SingleFlight()
+
 class GenerateSQL(Node):
     def prep(self, shared):
-        return shared["natural_query"], shared["schema"], shared["db_adapter"].db_type
+        db_adapter = shared["db_adapter"]
+        tables = shared.get("schema_tables") or {}
+        profiles = {t: p for t, p in db_adapter.column_profiles().items() if t in tables}
+        value_links = shared.get("value_links") or []
+        tape = current_tape()
+        if tape is not None:
+            # The background profiler keeps adding profiles; a replay must see the ones used here
+            profiles = tape.input("column_profiles", profiles)
+            value_links = tape.input("value_links", value_links)
+        flight_key = (db_adapter.db_key(), db_adapter.schema_version, tuple(shared.get("schemas") or ()),
+                      normalize_question(shared["natural_query"]))
+        canonical_sql = shared.get("canonical_sql")
+        sql_cache = shared.get("sql_cache")
+        # The same question against the same schema on any backend; a recorded run must hold its own LLM calls
+        if not canonical_sql and sql_cache is not None and tables and current_tape() is None:
+            canonical_sql = sql_cache.get(shared["natural_query"], schema_fingerprint(tables))
+            shared["sql_cache_hit"] = canonical_sql is not None
+        return (shared["natural_query"], shared["schema"], db_adapter.db_type, canonical_sql,
+                profiles, shared.get("profile_prompt_budget", 1500), value_links,
+                shared.get("example_store"), shared.get("few_shot_k", 3), flight_key,
+                sql_validator(db_adapter, db_adapter.db_type), shared.get("cascade_min_confidence", 0.8))
 
     def exec(self, prep_res):
-        natural_query, schema, db_type = prep_res
-        
-        # Check if this is a schema description request
-        if any(keyword in natural_query.lower() for keyword in ['describe', 'show', 'what is', 'explain']):
-            if 'schema' in natural_query.lower():
-                # For schema description requests, just return a special command
-                return "DESCRIBE_SCHEMA"
+        (natural_query, schema, db_type, canonical_sql, profiles, profile_budget, value_links,
+         example_store, few_shot_k, flight_key, validate, min_confidence) = prep_res
 
+        # A canonical query given by the caller or cached (from any backend) only needs transpiling,
+        # not a new LLM call
+        if canonical_sql:
+            return from_canonical(canonical_sql, db_type), None
+        generate = lambda: self._generate(natural_query, schema, db_type, profiles, profile_budget,
+                                          value_links, example_store, few_shot_k, validate, min_confidence)
+        if current_tape() is not None:
+            return generate()  # A recorded run must hold its own LLM calls to be replayable
+        return _generate_flight.do(flight_key, generate)
+
+    def _generate(self, natural_query, schema, db_type, profiles, profile_budget, value_links,
+                  example_store, few_shot_k, validate, min_confidence):
         # Determine SQL dialect based on database type
-        sql_dialect = "SQLite" if db_type == "sqlite" else "Oracle"
+        sql_dialect = dialect_name(db_type)
+
+        # Sampled column values help the LLM spell literals the way the data does
+        hints = format_profile_hints(profiles, natural_query, profile_budget)
+        if hints:
+            schema = f"{schema}\n\nSample column values:\n{hints}"
+        if value_links:
+            links = "\n".join(f"  - {table}.{column} = '{value}'" for _, table, column, value in value_links)
+            schema = f"{schema}\n\nValues mentioned in the question (use these exact literals):\n{links}"
+
+        # Verified question/SQL pairs most similar to this question, as few-shot examples
+        examples = ""
+        if example_store is not None:
+            examples = format_examples(example_store.search(natural_query, few_shot_k, db_type), db_type,
+                                       transpile=from_canonical)
+        if examples:
+            examples = f"\nExamples of answered questions:\n{examples}\n"
 
         # For normal SQL queries, proceed with the original logic
         prompt = f"""
 Given {sql_dialect} database schema:
 {schema}
-
+{examples}
 Question: "{natural_query}"
 
 Generate a {sql_dialect} query to answer this question. 
@@ -51,85 +213,100 @@ sql: |
 
 Do not include any explanations or other text."""
 
-        llm_response = call_llm(prompt)
-        
-        # Try to extract SQL from YAML format first
-        try:
-            yaml_str = llm_response.split("```yaml")[1].split("```")[0].strip()
-            structured_result = yaml.safe_load(yaml_str)
-            sql_query = structured_result["sql"].strip().rstrip(';')
-            return sql_query
-        except (IndexError, KeyError, yaml.YAMLError):
-            # Fallback: try to extract SQL from code blocks
-            try:
-                if "```sql" in llm_response:
-                    sql_query = llm_response.split("```sql")[1].split("```")[0].strip()
-                elif "```" in llm_response:
-                    sql_query = llm_response.split("```")[1].split("```")[0].strip()
-                else:
-                    # Last resort: look for SELECT statements
-                    lines = llm_response.strip().split('\n')
-                    sql_lines = []
-                    for line in lines:
-                        line = line.strip()
-                        if line and (line.upper().startswith(('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')) or sql_lines):
-                            sql_lines.append(line)
-                            if line.endswith(';'):
-                                break
-                    if sql_lines:
-                        sql_query = ' '.join(sql_lines).rstrip(';')
-                    else:
-                        raise ValueError("No valid SQL found in response")
-                
-                return sql_query.strip()
-            except Exception as e:
-                # Print the actual response for debugging
-                print(f"\n===== DEBUG: LLM Response =====")
-                print(repr(llm_response))
-                print("===============================\n")
-                raise ValueError(f"Failed to parse LLM response. Expected YAML or SQL format. Error: {str(e)}")
+        return generate_with_cascade(prompt, parse_sql_response, validate, priority="interactive",
+                                     min_confidence=min_confidence)
 
     def post(self, shared, prep_res, exec_res):
-        if exec_res == "DESCRIBE_SCHEMA":
-            print("\nThe schema is shown above. This is a description of your database structure.")
-            print("You can use this schema information to formulate SQL queries.\n")
-            return
-            
-        # For normal SQL queries, proceed with original logic
+        exec_res, tier = exec_res
         shared["generated_sql"] = exec_res
+        shared["sql_tier"] = tier  # Model tier that wrote the SQL; None when transpiled
+        log_event(shared, "generated", sql=exec_res, detail=tier or ("cached" if shared.get("sql_cache_hit") else None))
         shared["debug_attempts"] = 0
+        shared["local_repair_passes"] = 0
         print(f"\n===== GENERATED SQL (Attempt {shared.get('debug_attempts', 0) + 1}) =====\n")
         print(exec_res)
         print("\n====================================\n")
 
 class ExecuteSQL(Node):
     def prep(self, shared):
-        return shared["db_adapter"], shared["generated_sql"]
+        preview = None
+        # Sampled previews aren't recorded on cassettes: a replay would diverge from the recording
+        if shared.get("preview_mode") and current_tape() is None:
+            preview = {
+                "sample_rows": shared.get("preview_sample_rows", 100000),
+                "latency_target": shared.get("preview_latency_target", 2.0),
+            }
+        return shared["db_adapter"], shared["generated_sql"], preview
 
     def exec(self, prep_res):
-        db_adapter, sql_query = prep_res
-        return db_adapter.execute_query(sql_query)
+        db_adapter, sql_query, preview = prep_res
+        start_time = time.time()
+        if preview is not None:
+            # Approximate answer from a sample of the table; None falls through to the exact query
+            estimate = run_preview(db_adapter, sql_query, **preview)
+            if estimate is not None:
+                return True, estimate["rows"], estimate["columns"], time.time() - start_time, estimate
+        success, result_or_error, column_names = db_adapter.execute_query(sql_query)
+        return success, result_or_error, column_names, time.time() - start_time, None
 
     def post(self, shared, prep_res, exec_res):
-        success, result_or_error, column_names = exec_res
+        success, result_or_error, column_names, duration, estimate = exec_res
+        # Still failing after the adapter's own retries, but not because of the SQL
+        transient = not success and is_transient(result_or_error, prep_res[0].db_type)
+        log_event(shared, "executed", sql=prep_res[1], duration=duration,
+                  detail="preview" if estimate is not None else shared.get("sql_tier"),
+                  error=None if success else result_or_error,
+                  row_count=len(result_or_error) if success and isinstance(result_or_error, list)
+                  and estimate is None else None)
+        if shared.get("sql_tier") and not transient:
+            cascade_stats.record_execution(shared["sql_tier"], success)
 
         if success:
+            db_adapter, sql_query, _ = prep_res
             shared["final_result"] = result_or_error
             shared["result_columns"] = column_names
-            print("\n===== SQL EXECUTION SUCCESS =====\n")
+            # Dialect-neutral form of the working query, reusable on any other backend
+            shared["canonical_sql"] = to_canonical(sql_query, db_adapter.db_type)
+            if estimate is not None:
+                self._start_preview(shared, db_adapter, sql_query, estimate)
+            else:
+                print("\n===== SQL EXECUTION SUCCESS =====\n")
             # (Same result printing logic as before)
             if isinstance(result_or_error, list):
                  if column_names: print(" | ".join(column_names)); print("-" * (sum(len(str(c)) for c in column_names) + 3 * (len(column_names) -1)))
                  if not result_or_error: print("(No results found)")
                  else:
-                     for row in result_or_error: print(" | ".join(map(str, row)))
+                     print_limit = shared.get("result_print_limit", 50)
+                     for row in result_or_error[:print_limit]: print(" | ".join(map(str, row)))
+                     if len(result_or_error) > print_limit: print(f"... ({len(result_or_error) - print_limit} more rows)")
             else: print(result_or_error)
+            if estimate is not None:
+                for row_bounds in estimate["bounds"][:5]:
+                    if row_bounds:
+                        print("95% error bounds: " + ", ".join(f"{c} ±{b:,.4g}" for c, b in row_bounds.items()))
             print("\n=================================\n")
+            if isinstance(result_or_error, list) and estimate is None:
+                return "success" # Summarize the rows before anything downstream sees them
+            # A sampled estimate isn't summarized or stored as an example; the exact result is
+            # summarized when it replaces the estimate (see _start_preview)
+            # Otherwise don't return anything - let the flow end naturally
+        elif transient:
+            # Rewriting the SQL can't fix a lock timeout or a dropped connection: no debug attempt
+            shared["execution_error"] = result_or_error
+            shared["final_error"] = f"Database unavailable, the query was not debugged: {result_or_error}"
+            print("\n===== DATABASE UNAVAILABLE =====\n")
+            print(f"Error: {result_or_error}")
+            print("================================\n")
             # Don't return anything - let the flow end naturally
         else:
             # Execution failed (SQLite error caught in exec)
             shared["execution_error"] = result_or_error # Store the error message
-            shared["debug_attempts"] = shared.get("debug_attempts", 0) + 1
+            if shared.pop("sql_cache_hit", False) and shared.get("schema_tables"):
+                # The cached query doesn't work here; the debugged one replaces it if it succeeds
+                shared["sql_cache"].remove(shared["natural_query"], schema_fingerprint(shared["schema_tables"]))
+            # A failed local repair doesn't consume a debug attempt, the LLM never saw that SQL
+            if not shared.pop("sql_locally_repaired", False):
+                shared["debug_attempts"] = shared.get("debug_attempts", 0) + 1
             max_attempts = shared.get("max_debug_attempts", 3) # Get max attempts from shared
 
             print(f"\n===== SQL EXECUTION FAILED (Attempt {shared['debug_attempts']}) =====\n")
@@ -142,7 +319,106 @@ class ExecuteSQL(Node):
                 # Don't return anything - let the flow end naturally
             else:
                 print("Attempting to debug the SQL...")
-                return "error_retry" # Signal to go to DebugSQL
+                return "error_retry" # Signal to go to RepairSQL, then DebugSQL if needed
+
+    @staticmethod
+    def _start_preview(shared, db_adapter, sql_query, estimate):
+        """Publish a sampled estimate as the result; with preview_exact (the default) the
+        exact query runs in the background and replaces it in the shared store when done."""
+        preview = {key: estimate[key] for key in ("table", "fraction", "sql", "bounds")}
+        preview.update(approximate=True, replaced=False, exact=None)
+        shared["preview"] = preview
+        print(f"\n===== SQL PREVIEW (approximate: {estimate['fraction']:.2%} sample of "
+              f"{estimate['table']}, {estimate['duration']:.3f}s) =====\n")
+        if not shared.get("preview_exact", True):
+            return
+
+        def replace(success, result, columns):
+            if success:
+                shared["final_result"] = result
+                shared["result_columns"] = columns
+                if isinstance(result, list):
+                    shared["result_summary"] = summarize_rows(columns or [], result,
+                                                              sample_size=shared.get("summary_sample_size", 10),
+                                                              top_k=shared.get("summary_top_k", 5))
+                preview.update(approximate=False, replaced=True)
+            else:
+                preview["exact_error"] = result
+        preview["exact"] = run_exact(db_adapter, sql_query, replace)
+
+class SummarizeResult(Node):
+    """Bounded-size summary of the result (column stats + sample rows) for downstream consumers."""
+    def prep(self, shared):
+        return (
+            shared.get("result_columns") or [],
+            shared.get("final_result") or [],
+            shared.get("summary_sample_size", 10),
+            shared.get("summary_top_k", 5)
+        )
+
+    def exec(self, prep_res):
+        columns, rows, sample_size, top_k = prep_res
+        return summarize_rows(columns, rows, sample_size=sample_size, top_k=top_k)
+
+    def post(self, shared, prep_res, exec_res):
+        shared["result_summary"] = exec_res
+        if exec_res["row_count"] > shared.get("result_print_limit", 50):
+            print("\n===== RESULT SUMMARY =====\n")
+            print(f"Rows: {exec_res['row_count']}")
+            for col in exec_res["columns"]:
+                top = ", ".join(f"{t['value']} ({t['count']})" for t in col["top_values"][:3])
+                print(f"  - {col['name']}: distinct={col['distinct']} nulls={col['nulls']} "
+                      f"min={col['min']} max={col['max']} top=[{top}]")
+            print("\n==========================\n")
+
+class StoreExample(Node):
+    """Keeps the question and its working SQL as a few-shot example for similar questions, and
+    its canonical SQL in the NL->SQL cache for the same question on any backend."""
+    def prep(self, shared):
+        return (shared.get("example_store"), shared["natural_query"], shared.get("generated_sql"),
+                shared.get("canonical_sql"), shared["db_adapter"].db_type, shared.get("final_result"),
+                shared.get("sql_cache"), shared.get("schema_tables") or {})
+
+    def post(self, shared, prep_res, exec_res):
+        example_store, natural_query, sql, canonical_sql, db_type, rows, sql_cache, tables = prep_res
+        # Only queries that ran and returned rows count as verified
+        if example_store is not None and sql and rows:
+            example_store.add(natural_query, sql, db_type, canonical_sql)
+        if sql_cache is not None and canonical_sql and rows and tables and current_tape() is None:
+            sql_cache.put(natural_query, schema_fingerprint(tables), canonical_sql)
+
+class RepairSQL(Node):
+    """Rule-based repair of mechanical SQL errors, tried before paying for an LLM debug call."""
+    def prep(self, shared):
+        return (
+            shared["generated_sql"],
+            shared.get("execution_error"),
+            shared["db_adapter"].db_type,
+            shared.get("schema_tables") or {},
+            shared.get("local_repair_passes", 0),
+            shared.get("max_local_repair_passes", 3)
+        )
+
+    def exec(self, prep_res):
+        sql_query, error_message, db_type, schema_tables, passes, max_passes = prep_res
+        if passes >= max_passes:
+            return None, []
+        return repair_sql(sql_query, error_message, db_type, schema_tables)
+
+    def post(self, shared, prep_res, exec_res):
+        repaired_sql, fixes = exec_res
+        if not repaired_sql:
+            print("No local repair applies. Asking the LLM to debug the SQL...")
+            return "llm_debug"
+
+        shared["generated_sql"] = repaired_sql
+        log_event(shared, "repaired", sql=repaired_sql, detail=", ".join(fixes))
+        shared["local_repair_passes"] = shared.get("local_repair_passes", 0) + 1
+        shared["sql_locally_repaired"] = True
+        print(f"\n===== LOCALLY REPAIRED SQL ({', '.join(fixes)}) =====\n")
+        print(repaired_sql)
+        print("\n====================================\n")
+        return "repaired"
 
 class DebugSQL(Node):
     def prep(self, shared):
@@ -151,14 +427,18 @@ class DebugSQL(Node):
             shared.get("schema"),
             shared.get("generated_sql"),
             shared.get("execution_error"),
-            shared["db_adapter"].db_type
+            shared["db_adapter"].db_type,
+            shared.get("sql_tier"),
+            sql_validator(shared["db_adapter"], shared["db_adapter"].db_type),
+            shared.get("cascade_min_confidence", 0.8)
         )
 
     def exec(self, prep_res):
-        natural_query, schema, failed_sql, error_message, db_type = prep_res
+        (natural_query, schema, failed_sql, error_message, db_type, failed_tier, validate,
+         min_confidence) = prep_res
         
         # Determine SQL dialect based on database type
-        sql_dialect = "SQLite" if db_type == "sqlite" else "Oracle"
+        sql_dialect = dialect_name(db_type)
         
         prompt = f"""
 The following {sql_dialect} SQL query failed:
@@ -180,48 +460,18 @@ sql: |
 
 Do not include any explanations or other text."""
 
-        llm_response = call_llm(prompt)
-
-        # Try to extract SQL from YAML format first
-        try:
-            yaml_str = llm_response.split("```yaml")[1].split("```")[0].strip()
-            structured_result = yaml.safe_load(yaml_str)
-            corrected_sql = structured_result["sql"].strip().rstrip(';')
-            return corrected_sql
-        except (IndexError, KeyError, yaml.YAMLError):
-            # Fallback: try to extract SQL from code blocks
-            try:
-                if "```sql" in llm_response:
-                    corrected_sql = llm_response.split("```sql")[1].split("```")[0].strip()
-                elif "```" in llm_response:
-                    corrected_sql = llm_response.split("```")[1].split("```")[0].strip()
-                else:
-                    # Last resort: look for SELECT statements
-                    lines = llm_response.strip().split('\n')
-                    sql_lines = []
-                    for line in lines:
-                        line = line.strip()
-                        if line and (line.upper().startswith(('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')) or sql_lines):
-                            sql_lines.append(line)
-                            if line.endswith(';'):
-                                break
-                    if sql_lines:
-                        corrected_sql = ' '.join(sql_lines).rstrip(';')
-                    else:
-                        raise ValueError("No valid SQL found in response")
-                
-                return corrected_sql.strip()
-            except Exception as e:
-                # Print the actual response for debugging
-                print(f"\n===== DEBUG: LLM Response =====")
-                print(repr(llm_response))
-                print("===============================\n")
-                raise ValueError(f"Failed to parse LLM response. Expected YAML or SQL format. Error: {str(e)}")
+        # SQL from the small model that failed to run escalates straight to the large model
+        return generate_with_cascade(prompt, parse_sql_response, validate, priority="retry",
+                                     min_confidence=min_confidence, skip_small=failed_tier == "small")
 
     def post(self, shared, prep_res, exec_res):
-        # exec_res is the corrected SQL string
+        # exec_res is the corrected SQL string and the model tier that wrote it
+        exec_res, tier = exec_res
         shared["generated_sql"] = exec_res # Overwrite with the new attempt
+        shared["sql_tier"] = tier
+        log_event(shared, "debugged", sql=exec_res, detail=tier)
         shared.pop("execution_error", None) # Clear the previous error for the next ExecuteSQL attempt
+        shared["local_repair_passes"] = 0
 
         print(f"\n===== REVISED SQL (Attempt {shared.get('debug_attempts', 0) + 1}) =====\n")
         print(exec_res)
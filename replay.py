@@ -0,0 +1,101 @@
+import argparse
+import contextlib
+import io
+import sys
+import time
+import warnings
+
+from flow import create_text_to_sql_flow
+from utils.cassette import Cassette, Tape, replay_shared, use_tape
+from utils.run_log import run_outcome
+
+# Suppress the specific PocketFlow warning about flow endings
+warnings.filterwarnings("ignore", message="Flow ends:*", category=UserWarning)
+
+def replay_run(run, strict=False, fallback=None, verbose=False):
+    """Re-drive one recorded run through the current flow and compare it with the recording."""
+    tape = Tape(run, strict)
+    shared = replay_shared(run, tape, fallback)
+    flow = create_text_to_sql_flow()
+    error = None
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    started = time.perf_counter()
+    with output, use_tape(tape):
+        try:
+            flow.run(shared)
+        except Exception as e:  # ReplayMiss or a failure the recording didn't have
+            error = f"{type(e).__name__}: {e}"
+    duration = time.perf_counter() - started
+
+    rows = shared.get("final_result")
+    outcome = run_outcome(shared, error)
+    differences = list(tape.drift)
+    if error:
+        differences.append(error)
+    if shared.get("generated_sql") != run.get("final_sql"):
+        differences.append("final SQL differs")
+    if outcome != run.get("outcome"):
+        differences.append(f"outcome {outcome} (recorded {run.get('outcome')})")
+    row_count = len(rows) if isinstance(rows, list) else None
+    if outcome == run.get("outcome") and row_count != run.get("row_count"):
+        differences.append(f"{row_count} rows (recorded {run.get('row_count')})")
+    return {
+        "question": run["question"],
+        "duration": duration,
+        "recorded_duration": run.get("duration") or 0.0,
+        # Time the recording spent waiting on the model and the database, which replay skips
+        "recorded_wait": (sum(c.get("duration") or 0.0 for c in run["llm_calls"])
+                          + sum(q.get("duration") or 0.0 for q in run["queries"])),
+        "final_sql": shared.get("generated_sql"),
+        "differences": differences,
+    }
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))]
+
+def replay_cassette(path, strict=False, repeat=1, fallback=None, verbose=False):
+    """Replay every run of a cassette `repeat` times; prints a report and returns the results
+    of the last pass."""
+    runs = Cassette(path).runs()
+    if not runs:
+        print(f"No runs recorded in {path}.")
+        return []
+    durations = []
+    for _ in range(repeat):
+        results = [replay_run(run, strict, fallback, verbose) for run in runs]
+        durations.extend(r["duration"] for r in results)
+
+    diverged = [r for r in results if r["differences"]]
+    for r in diverged:
+        print(f"DIVERGED: {r['question']}")
+        for difference in r["differences"]:
+            print(f"    {difference}")
+    recorded = sum(r["recorded_duration"] for r in results)
+    waited = sum(r["recorded_wait"] for r in results)
+    print(f"Runs: {len(results)} x {repeat}, matched {len(results) - len(diverged)}, diverged {len(diverged)}")
+    print(f"Replay time per run (ms): mean={1000 * sum(durations) / len(durations):.2f} "
+          f"p50={1000 * _percentile(durations, 50):.2f} p95={1000 * _percentile(durations, 95):.2f}")
+    print(f"Recorded time per run (ms): mean={1000 * recorded / len(results):.2f} "
+          f"(of which LLM/database {1000 * waited / len(results):.2f})")
+    return results
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Replay recorded text-to-SQL runs offline')
+    parser.add_argument('cassette', help='Cassette file written with main.py --record')
+    parser.add_argument('--strict', action='store_true',
+                        help='Treat a changed LLM prompt as a failure instead of replaying the recorded completion')
+    parser.add_argument('--repeat', type=int, default=1, help='Replay the cassette N times (benchmarking)')
+    parser.add_argument('--db-path', default=None,
+                        help='SQLite database that runs SQL missing from the cassette (default: fail the run)')
+    parser.add_argument('--verbose', action='store_true', help='Show the flow output of each run')
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    fallback = None
+    if args.db_path:
+        from db_adapter import DatabaseAdapter
+        fallback = DatabaseAdapter({"type": "sqlite", "path": args.db_path, "read_only": True})
+    results = replay_cassette(args.cassette, args.strict, max(1, args.repeat), fallback, args.verbose)
+    sys.exit(1 if any(r["differences"] for r in results) else 0)
@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Optional
+
+from utils.sql_sample import plan_sample, sample_table, scale_rows
+
+# Sample queries. One that misses its latency target keeps running here until the database
+# finishes it (its result is discarded), so exact runs get executors of their own
+_sample_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="preview-sample")
+_exact_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="preview-exact")
+
+def run_preview(db_adapter, sql: str, sample_rows: int = 100000, latency_target: float = 2.0,
+                min_table_factor: float = 10.0) -> Optional[Dict[str, Any]]:
+    """Approximate answer to `sql` from a sample of about `sample_rows` rows of its table.
+
+    Returns None, so the exact query runs instead, when the query shape can't be sampled
+    (see utils.sql_sample) or has no aggregate to estimate (a sample of plain rows is just a
+    partial result), the table has no row estimate or fewer than
+    `min_table_factor` * sample_rows rows, or the sample query fails or takes longer than
+    `latency_target` seconds. Otherwise {"rows", "columns", "bounds", "table", "fraction",
+    "sql", "duration"}: counts and sums scaled up, with a 95% error bound per row and column.
+    """
+    db_type = db_adapter.db_type
+    table = sample_table(sql, db_type)
+    if table is None:
+        return None
+    total = db_adapter.estimate_rows(table)
+    if not total or total < min_table_factor * sample_rows:
+        return None
+    plan = plan_sample(sql, db_type, sample_rows / total, max_rowid=total if db_type == "sqlite" else None)
+    if plan is None or not plan.aggregate:
+        return None
+
+    started = time.time()
+    future = _sample_executor.submit(db_adapter.execute_query, plan.sql)
+    try:
+        success, result, columns = future.result(timeout=latency_target)
+    except FutureTimeout:
+        future.cancel()  # Still queued behind other late samples: never start it
+        print(f"Sampled preview missed its {latency_target:.1f}s target, running the exact query.")
+        return None
+    if not success or not isinstance(result, list):
+        print("Sampled preview failed, running the exact query.")
+        return None
+    columns, rows, bounds = scale_rows(plan, columns, result)
+    return {"rows": rows, "columns": columns, "bounds": bounds, "table": table,
+            "fraction": plan.fraction, "sql": plan.sql, "duration": time.time() - started}
+
+def run_exact(db_adapter, sql: str, on_done: Callable[[bool, Any, list], None]) -> Future:
+    """Run the exact query in the background; `on_done(success, result, columns)` gets its
+    result. The returned future resolves after on_done has run."""
+    def run():
+        success, result, columns = db_adapter.execute_query(sql)
+        on_done(success, result, columns)
+        return success, result, columns
+    return _exact_executor.submit(run)
@@ -0,0 +1,72 @@
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# (column name, type, extra) as read from the catalog; extra is e.g. "NOT NULL" or ""
+ColumnInfo = Tuple[str, str, str]
+
+class SchemaCache:
+    """Per-table schema model that is patched incrementally instead of rebuilt.
+
+    Every table carries a DDL version from the catalog (LAST_DDL_TIME on Oracle, modify_date
+    on SQL Server, a hash of the CREATE statement on SQLite). A refresh lists the versions,
+    re-reads columns only for new or changed tables and drops the removed ones. The model
+    (`tables`, shaped like utils.schema_model.parse_schema output) and the prompt text are
+    replaced, never mutated, so readers holding the old ones are unaffected.
+
+    One cache covers one schema (Oracle owner, SQL Server schema, attached SQLite database);
+    None is the connection's default and keeps table names unqualified.
+    """
+
+    def __init__(self, schema: Optional[str] = None):
+        self.schema = schema
+        self.prefix = f"{schema}." if schema else ""
+        self.lock = threading.Lock()
+        self.stale = False
+        self.loaded_at = 0.0
+        self.versions: Dict[str, Any] = {}
+        self.tables: Dict[str, List[Tuple[str, str]]] = {}
+        self.text: Optional[str] = None
+        self.version = 0  # Bumped on every change; usable as a cache key
+        self._blocks: Dict[str, str] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self.text is not None
+
+    def diff(self, versions: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+        """(tables to (re-)read, tables to drop) for the catalog's current versions."""
+        changed = [t for t, v in versions.items() if t not in self.versions or self.versions[t] != v]
+        removed = [t for t in self.versions if t not in versions]
+        return changed, removed
+
+    def apply(self, versions: Dict[str, Any], columns: Dict[str, Sequence[ColumnInfo]]) -> bool:
+        """Patch in the re-read tables; returns whether anything changed.
+
+        `versions` is the full, ordered catalog listing; `columns` only needs the changed tables.
+        """
+        changed, removed = self.diff(versions)
+        if not changed and not removed and self.loaded:
+            return False
+        tables, blocks = {}, {}
+        for name in versions:
+            table = self.prefix + name
+            if name in columns:
+                cols = columns[name]
+                tables[table] = [(col, col_type) for col, col_type, _ in cols]
+                blocks[table] = "\n".join(
+                    [f"Table: {table}"]
+                    + [f"  - {col} ({col_type}) {extra}" if extra else f"  - {col} ({col_type})"
+                       for col, col_type, extra in cols]
+                )
+            else:
+                tables[table] = self.tables.get(table, [])
+                blocks[table] = self._blocks.get(table, f"Table: {table}")
+        self.versions = dict(versions)
+        self.tables = tables
+        self._blocks = blocks
+        self.text = "\n\n".join(blocks.values())
+        self.version += 1
+        if self.version > 1:
+            print(f"Schema {self.schema or '(default)'} refreshed: {len(changed)} table(s) re-read, {len(removed)} dropped.")
+        return True
+
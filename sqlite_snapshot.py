@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import quote
+
+def _file_uri(path: str, **params) -> str:
+    query = "&".join(f"{k}={v}" for k, v in params.items())
+    return f"file:{quote(os.path.abspath(path))}?{query}"
+
+class SnapshotConnection(sqlite3.Connection):
+    """A connection over an in-memory copy; remembers which snapshot generation it holds."""
+    snapshot: "SQLiteSnapshot" = None
+    generation = 0
+
+class SQLiteSnapshot:
+    """A SQLite database (and its attached databases) held in memory.
+
+    The files are copied once with the backup API and kept as serialized images; every new
+    connection deserializes its own private copy, so readers on different threads share no
+    locks and never go back to the file for pages. The files' size and mtime (and those of
+    their -wal files) are checked at most every `check_interval` seconds; after a change the
+    images are reloaded, the generation goes up and `is_current` turns false for older
+    connections so the pool replaces them. `on_reload` runs after each reload.
+
+    Memory use is one image plus one copy per open connection.
+    """
+
+    def __init__(self, path: str, attach: Optional[Dict[str, str]] = None, check_interval: float = 1.0,
+                 on_reload: Optional[Callable[[], None]] = None):
+        self.path = path
+        self.attach = dict(attach or {})
+        self.check_interval = check_interval
+        self.on_reload = on_reload
+        self.generation = 0
+        self.loaded_at = 0.0
+        self._images: Dict[Optional[str], bytes] = {}
+        self._signature: Optional[Tuple] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _files(self) -> Dict[Optional[str], str]:
+        return {None: self.path, **self.attach}
+
+    def _current_signature(self) -> Tuple:
+        signature = []
+        for path in self._files().values():
+            for name in (path, path + "-wal"):
+                try:
+                    st = os.stat(name)
+                    signature.append((name, st.st_mtime_ns, st.st_size))
+                except FileNotFoundError:
+                    signature.append((name, None, None))
+        return tuple(signature)
+
+    @staticmethod
+    def _read_image(path: str) -> bytes:
+        source = sqlite3.connect(_file_uri(path, mode="ro"), uri=True)
+        memory = sqlite3.connect(":memory:")
+        try:
+            source.backup(memory)
+            image = bytearray(memory.serialize())
+        finally:
+            source.close()
+            memory.close()
+        # A WAL database's header (read/write version 2 at offsets 18-19) is copied verbatim, and
+        # an in-memory database can't be opened in WAL mode: mark the image as rollback-journal
+        if image[18:20] == b"\x02\x02":
+            image[18:20] = b"\x01\x01"
+        return bytes(image)
+
+    def _load(self):
+        # Signature first: a write landing during the copy triggers another reload
+        signature = self._current_signature()
+        self._images = {alias: self._read_image(path) for alias, path in self._files().items()}
+        self._signature = signature
+        self.generation += 1
+        self.loaded_at = time.time()
+        print(f"Loaded in-memory snapshot of {self.path} "
+              f"({sum(len(i) for i in self._images.values()) / 1e6:.1f} MB, generation {self.generation})")
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload if the files changed (checked at most every check_interval seconds);
+        returns True when a new generation was loaded."""
+        now = time.monotonic()
+        with self._lock:
+            if self._images and not force:
+                if now - self._checked_at < self.check_interval:
+                    return False
+                self._checked_at = now
+                if self._current_signature() == self._signature:
+                    return False
+            self._load()
+            self._checked_at = now
+        if self.on_reload is not None:
+            self.on_reload()
+        return True
+
+    def is_current(self, conn) -> bool:
+        self.refresh()
+        return getattr(conn, "generation", None) == self.generation
+
+    def connect(self, cached_statements: int = 128) -> SnapshotConnection:
+        self.refresh()
+        with self._lock:
+            images, generation = self._images, self.generation
+        conn = sqlite3.connect(":memory:", check_same_thread=False, cached_statements=cached_statements,
+                               factory=SnapshotConnection)
+        conn.deserialize(images[None])
+        for alias, image in images.items():
+            if alias is not None:
+                conn.execute("ATTACH DATABASE ':memory:' AS \"" + alias.replace('"', '""') + "\"")
+                conn.deserialize(image, name=alias)
+        conn.snapshot = self
+        conn.generation = generation
+        # The copy is discarded with the connection; writes would be silently lost
+        conn.execute("PRAGMA query_only = ON")
+        return conn
@@ -0,0 +1,59 @@
+import json
+
+from column_profiler import format_profile_hints
+from nodes import GenerateSQL
+from utils.cassette import Cassette, Tape, replay_shared, use_tape
+
+TABLES = {"customers": [("id", "INTEGER"), ("city", "TEXT")], "orders": [("status", "TEXT")]}
+CITY = {"city": {"distinct": 2, "top_values": ["Chicago", "New York"], "min": "Chicago", "max": "New York"}}
+STATUS = {"status": {"distinct": 2, "top_values": ["shipped", "pending"], "min": "pending", "max": "shipped"}}
+
+class _ProfilingAdapter:
+    """Live adapter whose background profiler finishes more tables while the run goes on."""
+    db_type = "sqlite"
+    schema_version = 1
+
+    def __init__(self):
+        self.profiles = {"customers": CITY}
+
+    def column_profiles(self):
+        return dict(self.profiles)
+
+    def db_key(self):
+        return "sqlite:test"
+
+    def explain(self, sql):
+        return None
+
+def _prompt_inputs(prep_res):
+    profiles, budget, value_links = prep_res[4], prep_res[5], prep_res[6]
+    return format_profile_hints(profiles, "orders in chicago", budget), [tuple(link) for link in value_links]
+
+def test_replay_sees_the_profiles_and_links_generate_sql_used(tmp_path):
+    adapter = _ProfilingAdapter()
+    shared = {"db_adapter": adapter, "natural_query": "orders in chicago", "schema": "customers(id, city)",
+              "schema_tables": TABLES, "value_links": [(1.0, "customers", "city", "Chicago")]}
+    tape = Tape()
+    with use_tape(tape):
+        recorded = _prompt_inputs(GenerateSQL().prep(shared))
+    adapter.profiles["orders"] = STATUS  # Profiled after GenerateSQL built its prompt
+    shared["value_links"] = []
+    cassette = Cassette(str(tmp_path / "runs.jsonl"))
+    cassette._append(cassette._run_record(shared, tape, 0.1, None))
+
+    (run,) = cassette.runs()
+    assert run["column_profiles"] == json.loads(json.dumps({"customers": CITY}))
+    replay_tape = Tape(run, strict=True)
+    replayed = replay_shared(run, replay_tape)
+    replayed.update(schema=run["schema"], schema_tables=replayed["db_adapter"].get_schema_tables())
+    with use_tape(replay_tape):
+        assert _prompt_inputs(GenerateSQL().prep(replayed)) == recorded
+
+def test_input_is_recorded_once_and_replayed():
+    tape = Tape()
+    assert tape.input("value_links", [(1.0, "t", "c", "v")]) == [(1.0, "t", "c", "v")]
+    tape.input("value_links", [])
+    assert tape.inputs["value_links"] == [[1.0, "t", "c", "v"]]
+    replay = Tape({"llm_calls": [], "queries": [], "value_links": tape.inputs["value_links"]})
+    assert replay.input("value_links", []) == [[1.0, "t", "c", "v"]]
+    assert replay.input("column_profiles", {"live": {}}) == {"live": {}}  # Not on the tape
@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+
+from db_adapter import DatabaseAdapter
+from nodes import ExecuteSQL
+from utils.db_errors import classify_error, is_transient
+
+@pytest.mark.parametrize("error, db_type, kind", [
+    (sqlite3.OperationalError("database is locked"), "sqlite", "contention"),
+    ("ORA-00060: deadlock detected while waiting for resource", "oracle", "contention"),
+    ("Transaction (Process ID 53) was deadlocked ... chosen as the deadlock victim. (1205)", "mssql", "contention"),
+    ("ORA-03113: end-of-file on communication channel", "oracle", "connection"),
+    ("[08S01] [Microsoft][ODBC Driver 18 for SQL Server]Communication link failure", "mssql", "connection"),
+    (ConnectionError("connection reset by peer"), "duckdb", "connection"),
+    (sqlite3.OperationalError("no such column: nmae"), "sqlite", "semantic"),
+    ("ORA-00942: table or view does not exist", "oracle", "semantic"),
+])
+def test_classify_error(error, db_type, kind):
+    assert classify_error(error, db_type) == kind
+    assert is_transient(error, db_type) == (kind != "semantic")
+
+@pytest.fixture
+def adapter(tmp_path):
+    path = str(tmp_path / "t.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (a INTEGER)")
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.commit()
+    conn.close()
+    adapter = DatabaseAdapter({"type": "sqlite", "path": path, "retry_base_delay": 0.001})
+    yield adapter
+    adapter.close()
+
+def _failing_first(adapter, error):
+    calls = []
+    routed = adapter._execute_routed
+
+    def execute_routed(*args):
+        calls.append(args[2])
+        if len(calls) == 1:
+            raise error
+        return routed(*args)
+    adapter._execute_routed = execute_routed
+    return calls
+
+def test_locked_read_is_retried(adapter):
+    calls = _failing_first(adapter, sqlite3.OperationalError("database is locked"))
+    assert adapter.execute_query("SELECT a FROM t") == (True, [(1,)], ["a"])
+    assert calls == ["read", "read"] and adapter.transient_retry_count == 1
+
+def test_write_is_not_retried_after_a_connection_error(adapter):
+    calls = _failing_first(adapter, ConnectionError("connection reset by peer"))
+    success, error, _ = adapter.execute_query("INSERT INTO t VALUES (2)")
+    assert not success and "connection reset" in error
+    assert calls == ["write"] and adapter.transient_retry_count == 0
+
+def test_unavailable_database_skips_the_debug_loop(adapter):
+    shared = {"db_adapter": adapter, "generated_sql": "SELECT a FROM t", "debug_attempts": 0}
+    node = ExecuteSQL()
+    action = node.post(shared, node.prep(shared), (False, "database is locked", [], 0.1, None))
+    assert action is None
+    assert shared["final_error"].startswith("Database unavailable")
+    assert shared["debug_attempts"] == 0
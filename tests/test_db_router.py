@@ -0,0 +1,62 @@
+import sqlite3
+import time
+
+import pytest
+
+from connection_pool import ConnectionPool
+from db_adapter import DatabaseAdapter
+from db_router import Endpoint, EndpointRouter
+
+def _endpoint(name, is_primary=False):
+    return Endpoint(name, {}, ConnectionPool(lambda: None), is_primary, read_only=not is_primary)
+
+def test_writes_go_to_the_primary_reads_to_the_fastest_replica():
+    primary, fast, slow = _endpoint("primary", True), _endpoint("fast"), _endpoint("slow")
+    router = EndpointRouter(primary, [slow, fast])
+    for endpoint, latency in ((fast, 0.01), (slow, 0.5)):
+        router.begin(endpoint)
+        router.end(endpoint, latency)
+    assert router.candidates(read=False) == [primary]
+    assert router.candidates(read=True) == [fast, slow, primary]
+
+def test_failed_endpoint_is_tried_last_until_its_cooldown_ends():
+    primary, a, b = _endpoint("primary", True), _endpoint("a"), _endpoint("b")
+    router = EndpointRouter(primary, [a, b], cooldown=60)
+    router.begin(a)
+    router.end(a, None)
+    assert router.candidates(read=True) == [b, primary, a]
+    a.down_until = 0.0
+    assert a in router.candidates(read=True)[:2]
+
+def test_round_robin_rotates():
+    primary, a, b = _endpoint("primary", True), _endpoint("a"), _endpoint("b")
+    router = EndpointRouter(primary, [a, b], policy="round_robin")
+    assert {router.candidates(read=True)[0].name for _ in range(4)} == {"a", "b"}
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        EndpointRouter(_endpoint("primary", True), [], policy="random")
+
+def test_dead_session_fails_over_and_marks_the_endpoint_down(tmp_path):
+    paths = [str(tmp_path / "primary.db"), str(tmp_path / "replica.db")]
+    for path in paths:
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE t (a INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+        conn.commit()
+        conn.close()
+    adapter = DatabaseAdapter({"type": "sqlite", "path": paths[0], "replicas": [{"path": paths[1]}]})
+    replica = adapter.router.replicas[0]
+    run_on = adapter._run_on
+
+    def dying_replica(pooled, endpoint, *args):
+        if endpoint is replica:
+            raise ConnectionError("connection reset by peer")
+        return run_on(pooled, endpoint, *args)
+    adapter._run_on = dying_replica
+    try:
+        assert adapter.execute_query("SELECT a FROM t") == (True, [(1,)], ["a"])
+        assert not replica.healthy(time.time())
+        assert adapter.router.candidates(read=True)[0] is adapter.router.primary
+    finally:
+        adapter.close()
@@ -0,0 +1,43 @@
+import pytest
+
+duckdb = pytest.importorskip("duckdb")
+
+from db_adapter import DatabaseAdapter
+
+@pytest.fixture
+def adapter(tmp_path):
+    path = str(tmp_path / "shop.duckdb")
+    events = str(tmp_path / "events.parquet")
+    conn = duckdb.connect(path)
+    conn.execute("CREATE TABLE orders (order_id INTEGER, status VARCHAR)")
+    conn.execute("INSERT INTO orders VALUES (1, 'shipped'), (2, 'pending'), (3, 'shipped')")
+    conn.execute(f"COPY (SELECT range AS order_id, 'view' AS kind FROM range(1, 4)) TO '{events}' (FORMAT parquet)")
+    conn.close()
+    adapter = DatabaseAdapter({"type": "duckdb", "path": path, "files": {"events": events}})
+    yield adapter
+    adapter.close()
+
+def test_reads_the_database_file_and_data_file_views(adapter):
+    assert set(adapter.get_schema_tables()) >= {"orders", "events"}
+    assert adapter.execute_query("SELECT status, COUNT(*) AS n FROM orders GROUP BY status ORDER BY status") == \
+        (True, [("pending", 1), ("shipped", 2)], ["status", "n"])
+    success, rows, _ = adapter.execute_query(
+        "SELECT COUNT(*) FROM orders o JOIN events e ON e.order_id = o.order_id WHERE e.kind = 'view'")
+    assert success and rows == [(3,)]
+
+def test_writes_report_rows_affected(adapter):
+    assert adapter.execute_query("INSERT INTO orders VALUES (4, 'pending')") == \
+        (True, "Query OK. Rows affected: 1", [])
+    assert adapter.execute_query("CREATE TABLE archived AS SELECT * FROM orders WHERE status = 'shipped'") == \
+        (True, "Query OK. Rows affected: 2", [])
+    assert adapter.execute_query("DROP TABLE archived") == (True, "Query OK. Rows affected: 0", [])
+    assert adapter.execute_query("INSERT INTO orders VALUES (5, 'new') RETURNING order_id") == \
+        (True, [(5,)], ["order_id"])
+
+def test_missing_sqlite_extension_is_reported():
+    class _Offline:
+        def execute(self, sql):
+            raise duckdb.IOException('Failed to download extension "sqlite_scanner"')
+
+    with pytest.raises(ImportError, match="INSTALL sqlite"):
+        DatabaseAdapter._load_duckdb_sqlite(_Offline())
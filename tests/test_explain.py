@@ -0,0 +1,52 @@
+import sqlite3
+
+from connection_pool import ConnectionPool
+from db_adapter import DatabaseAdapter
+from nodes import sql_validator
+
+class _OracleCursor:
+    def __init__(self, parsed):
+        self.parsed = parsed
+
+    def parse(self, sql):
+        self.parsed.append(sql)
+
+    def close(self):
+        pass
+
+class _OracleConnection:
+    def __init__(self, parsed):
+        self.parsed = parsed
+
+    def cursor(self):
+        return _OracleCursor(self.parsed)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def _oracle_adapter(tmp_path, parsed):
+    path = str(tmp_path / "t.db")
+    sqlite3.connect(path).close()
+    adapter = DatabaseAdapter({"type": "sqlite", "path": path})
+    adapter.db_type = "oracle"
+    adapter.router.primary.pool = ConnectionPool(lambda: _OracleConnection(parsed))
+    return adapter
+
+def test_oracle_never_parses_ddl_or_dml(tmp_path):
+    parsed = []
+    adapter = _oracle_adapter(tmp_path, parsed)
+    for sql in ("DROP TABLE orders", "TRUNCATE TABLE orders", "DELETE FROM orders",
+                "CREATE TABLE x (a NUMBER)", "SELECT 1 FROM dual; DROP TABLE orders"):
+        assert adapter.explain(sql) is not None
+    assert parsed == []
+    assert adapter.explain("SELECT * FROM orders") is None
+    assert parsed == ["SELECT * FROM orders"]
+
+def test_validator_rejects_ddl_on_oracle(tmp_path):
+    parsed = []
+    validate = sql_validator(_oracle_adapter(tmp_path, parsed), "oracle")
+    assert validate("DROP TABLE orders").startswith("explain:")
+    assert parsed == []
@@ -0,0 +1,73 @@
+import datetime
+import struct
+from decimal import Decimal
+
+import pytest
+
+from utils.fetch_types import number_conversion, odbc_datetimeoffset, odbc_decimal, row_limit_hint
+
+@pytest.mark.parametrize("precision, scale, mode, expected", [
+    (10, 0, "auto", "int"),
+    (38, 0, "float", "int"),
+    (10, 2, "auto", None),
+    (20, 4, "auto", "decimal"),
+    (10, 2, "float", "float"),
+    (10, 2, "exact", "decimal"),
+    (0, -127, "auto", None),  # Oracle NUMBER without precision
+    (0, -127, "exact", "decimal"),
+])
+def test_number_conversion(precision, scale, mode, expected):
+    assert number_conversion(precision, scale, mode) == expected
+
+def test_odbc_decimal():
+    auto, as_float = odbc_decimal("auto"), odbc_decimal("float")
+    assert auto(None) is None
+    assert auto(b"42.000") == 42 and isinstance(auto(b"42.000"), int)
+    assert auto(b"-0.5") == -0.5
+    assert auto(b"12345678901234567.25") == Decimal("12345678901234567.25")
+    assert isinstance(as_float(b"12345678901234567.25"), float)
+
+def test_odbc_datetimeoffset():
+    raw = struct.pack("<6hI2h", 2024, 3, 1, 13, 45, 30, 123456000, -5, 0)
+    assert odbc_datetimeoffset(raw) == datetime.datetime(
+        2024, 3, 1, 13, 45, 30, 123456, tzinfo=datetime.timezone(datetime.timedelta(hours=-5)))
+    assert odbc_datetimeoffset(None) is None
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT * FROM orders LIMIT 10", 10),
+    ("SELECT * FROM orders FETCH FIRST 5 ROWS ONLY", 5),
+    ("SELECT COUNT(*) FROM orders", 1),
+    ("select sum(total_amount) from orders where status = 'shipped'", 1),
+    ("SELECT * FROM orders", None),
+    ("SELECT COUNT(*) FROM orders GROUP BY status", None),
+    ("SELECT COUNT(*) OVER (PARTITION BY status) FROM orders", None),
+    ("SELECT MAX(price) OVER () FROM products", None),
+    ("SELECT COUNT(*) FROM orders UNION ALL SELECT COUNT(*) FROM customers", None),
+    ("SELECT status, COUNT(*) FROM orders GROUP BY status LIMIT 3", None),
+])
+def test_row_limit_hint(sql, expected):
+    assert row_limit_hint(sql) == expected
+
+class _Cursor:
+    arraysize = prefetchrows = None
+
+def _tuned(tmp_path, history, sql):
+    import sqlite3
+    from db_adapter import DatabaseAdapter
+    path = str(tmp_path / "t.db")
+    sqlite3.connect(path).close()
+    adapter = DatabaseAdapter({"type": "sqlite", "path": path, "fetch_arraysize": 100})
+    try:
+        for past_sql, rows in history:
+            adapter.query_stats.record(past_sql, 0.01, True, rows=rows)
+        cursor = _Cursor()
+        adapter._tune_fetch(cursor, sql)
+        return cursor.arraysize, cursor.prefetchrows
+    finally:
+        adapter.close()
+
+def test_row_history_only_grows_the_fetch_size(tmp_path):
+    sql = "SELECT * FROM orders WHERE customer_id = 2"
+    assert _tuned(tmp_path, [("SELECT * FROM orders WHERE customer_id = 1", 0)], sql) == (100, 101)
+    assert _tuned(tmp_path, [("SELECT * FROM orders WHERE customer_id = 1", 5000)], sql) == (5000, 5001)
+    assert _tuned(tmp_path, [], "SELECT * FROM orders FETCH FIRST 5 ROWS ONLY") == (5, 6)
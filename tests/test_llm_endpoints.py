@@ -0,0 +1,65 @@
+import threading
+
+from utils.llm_endpoints import LLMEndpoint, LLMPool
+from utils.llm_scheduler import LLMScheduler
+
+class _Endpoint(LLMEndpoint):
+    """Answers after `release` is set (immediately if it is None)."""
+
+    def __init__(self, name, release=None):
+        super().__init__(name, "http://localhost:1/v1", "model", max_retries=0)
+        self.release = release
+        self.calls = 0
+
+    def complete(self, prompt):
+        self.calls += 1
+        if self.release is not None:
+            self.release.wait(5)
+        return f"{self.name}: {prompt}"
+
+def _pool(slow_release):
+    slow, fast = _Endpoint("slow", slow_release), _Endpoint("fast")
+    pool = LLMPool([slow, fast], hedge_min_samples=1, min_hedge_delay=0.01)
+    slow.latencies.append(0.001)  # Anything slower than this gets hedged
+    slow.ewma_latency, fast.ewma_latency = 0.001, 1.0
+    return pool, slow, fast
+
+def test_hedge_takes_its_own_scheduler_slot():
+    scheduler = LLMScheduler(max_in_flight=2)
+    release = threading.Event()
+    pool, slow, fast = _pool(release)
+    seen = []
+
+    def hedge_slot():
+        ticket = scheduler.try_acquire("q")
+        seen.append(scheduler.snapshot()["in_flight"])
+        return ticket
+
+    with scheduler.slot("q"):
+        response, endpoint = pool.complete("q", hedge_slot=hedge_slot)
+    release.set()
+    assert (response, endpoint) == ("fast: q", fast)
+    assert seen == [2] and pool.hedges == 1 and pool.hedge_wins == 1
+    pool._executor.shutdown(wait=True)
+    assert scheduler.snapshot()["in_flight"] == 0
+
+def test_no_hedge_without_free_capacity():
+    scheduler = LLMScheduler(max_in_flight=1)
+    release = threading.Event()
+    pool, slow, fast = _pool(release)
+    threading.Timer(0.1, release.set).start()
+    with scheduler.slot("q"):
+        response, endpoint = pool.complete("q", hedge_slot=lambda: scheduler.try_acquire("q"))
+    assert endpoint is slow and fast.calls == 0 and pool.hedges == 0
+
+def test_try_acquire_charges_tokens():
+    scheduler = LLMScheduler(max_in_flight=2, tokens_per_minute=1000, completion_tokens=100)
+    ticket = scheduler.try_acquire("q")
+    assert scheduler.snapshot()["tokens_available"] == 1000 - ticket.tokens
+    ticket.release()
+    ticket.release()  # Idempotent
+    assert scheduler.snapshot()["in_flight"] == 0
+    assert LLMScheduler(tokens_per_minute=50, completion_tokens=100).try_acquire("q") is not None
+    drained = LLMScheduler(tokens_per_minute=1000, completion_tokens=600)
+    drained.try_acquire("q")
+    assert drained.try_acquire("q") is None
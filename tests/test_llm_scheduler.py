@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from utils.llm_scheduler import LLMScheduler, estimate_tokens
+
+def _wait_queued(scheduler, priority, n=1):
+    while scheduler.snapshot()["classes"][priority]["queued"] < n:
+        time.sleep(0.001)
+
+def test_in_flight_limit():
+    scheduler = LLMScheduler(max_in_flight=1)
+    order = []
+
+    def second():
+        with scheduler.slot("second"):
+            order.append("second")
+
+    with scheduler.slot("first"):
+        waiter = threading.Thread(target=second)
+        waiter.start()
+        _wait_queued(scheduler, "interactive")
+        assert scheduler.snapshot()["in_flight"] == 1
+        order.append("first")
+    waiter.join(5)
+    assert order == ["first", "second"]
+
+def test_interactive_overtakes_queued_batch_and_retry():
+    scheduler = LLMScheduler(max_in_flight=1)
+    granted = []
+
+    def run(priority):
+        with scheduler.slot("prompt", priority):
+            granted.append(priority)
+
+    with scheduler.slot("busy"):
+        threads = []
+        for priority in ("batch", "retry", "interactive"):
+            threads.append(threading.Thread(target=run, args=(priority,)))
+            threads[-1].start()
+            _wait_queued(scheduler, priority)
+    for t in threads:
+        t.join(5)
+    assert granted == ["interactive", "retry", "batch"]
+
+def test_token_budget_is_charged_and_settled():
+    scheduler = LLMScheduler(tokens_per_minute=6000, completion_tokens=100)
+    prompt = "x" * 400
+    with scheduler.slot(prompt) as ticket:
+        assert ticket.tokens == estimate_tokens(prompt) + 100
+        assert scheduler.snapshot()["tokens_available"] == 6000 - ticket.tokens
+        ticket.settle(50)
+    assert scheduler.snapshot()["tokens_available"] >= 5950
+
+def test_request_larger_than_the_budget_is_capped():
+    scheduler = LLMScheduler(tokens_per_minute=100, completion_tokens=1000)
+    with scheduler.slot("prompt") as ticket:
+        assert ticket.tokens == 100
+
+def test_unknown_priority():
+    with pytest.raises(ValueError):
+        with LLMScheduler().slot("prompt", "urgent"):
+            pass
+
+def test_snapshot_counts_grants_per_class():
+    scheduler = LLMScheduler()
+    with scheduler.slot("a", "retry"):
+        pass
+    classes = scheduler.snapshot()["classes"]
+    assert classes["retry"]["granted"] == 1 and classes["interactive"]["granted"] == 0
+    assert scheduler.snapshot()["in_flight"] == 0
@@ -0,0 +1,47 @@
+import pytest
+
+from utils.metadata_router import route_metadata_question
+
+TABLES = {
+    "customers": [("customer_id", "INTEGER"), ("city", "TEXT"), ("email", "TEXT")],
+    "orders": [("order_id", "INTEGER"), ("customer_id", "INTEGER"), ("status", "TEXT")],
+    "order_items": [("order_id", "INTEGER"), ("quantity", "INTEGER")],
+}
+
+def _intent(question):
+    answer = route_metadata_question(question, TABLES)
+    return answer[0] if answer else None
+
+@pytest.mark.parametrize("question, intent", [
+    ("How many tables are there?", "count_tables"),
+    ("What tables are in the database?", "list_tables"),
+    ("Describe the database schema", "describe_schema"),
+    ("What columns does the orders table have?", "columns_of"),
+    ("Show the fields of order items", "columns_of"),
+    ("describe orders", "columns_of"),
+    ("Describe the customers table", "columns_of"),
+    ("How many columns are in customers?", "count_columns"),
+    ("What is the data type of email?", "column_type"),
+    ("Which tables have a customer_id column?", "tables_with_column"),
+])
+def test_catalog_questions(question, intent):
+    assert _intent(question) == intent
+
+@pytest.mark.parametrize("question", [
+    "describe the orders from Chicago",
+    "describe customers in new york",
+    "How many orders per customer?",
+    "Show the rows in orders",
+    "What is the average quantity of order items?",
+    "Show me customers from New York",
+])
+def test_data_questions_go_to_sql(question):
+    assert route_metadata_question(question, TABLES) is None
+
+def test_answers_come_from_the_schema_model():
+    intent, columns, rows = route_metadata_question("describe orders", TABLES)
+    assert columns == ["table", "column", "type"]
+    assert rows == [("orders", "order_id", "INTEGER"), ("orders", "customer_id", "INTEGER"), ("orders", "status", "TEXT")]
+    assert route_metadata_question("Which tables have a customer_id column?", TABLES)[2] == [
+        ("customers", "customer_id", "INTEGER"), ("orders", "customer_id", "INTEGER")]
+    assert route_metadata_question("How many tables are there", TABLES)[2] == [(3,)]
@@ -0,0 +1,31 @@
+from utils.result_summary import summarize_rows
+
+def test_column_stats():
+    summary = summarize_rows(["a", "b"], [(1, "x"), (2, "x"), (None, "y"), (4, "x")], sample_size=2, top_k=1)
+    a, b = summary["columns"]
+    assert summary["row_count"] == 4
+    assert (a["count"], a["nulls"], a["distinct"], a["min"], a["max"]) == (4, 1, 3, 1, 4)
+    assert a["mean"] == 7 / 3
+    assert b["mean"] is None and b["top_values"] == [{"value": "x", "count": 3}]
+    assert len(summary["sample_rows"]) == 2
+    assert all(tuple(row) in [(1, "x"), (2, "x"), (None, "y"), (4, "x")] for row in summary["sample_rows"])
+
+def test_bounded_on_many_rows():
+    rows = [(i, i % 3) for i in range(50000)]
+    summary = summarize_rows(["id", "bucket"], rows, batch_size=1000, sample_size=5, top_k=3, distinct_cap=1000)
+    ids, buckets = summary["columns"]
+    assert summary["row_count"] == 50000 and len(summary["sample_rows"]) == 5
+    assert ids["distinct"] == ">1000"
+    assert buckets["distinct"] == 3
+    assert sorted(t["count"] for t in buckets["top_values"]) == [16666, 16667, 16667]
+
+def test_heavy_hitter_survives_high_cardinality():
+    rows = [("hot",)] * 5000 + [(f"v{i}",) for i in range(20000)]
+    (column,) = summarize_rows(["v"], rows, batch_size=500, top_k=1)["columns"]
+    assert column["top_values"][0]["value"] == "hot"
+    assert column["top_values"][0]["count"] >= 5000 - 1  # Guaranteed lower bound
+
+def test_mixed_types_and_empty_result():
+    (column,) = summarize_rows(["v"], [(1,), ("a",)])["columns"]
+    assert column["distinct"] == 2
+    assert summarize_rows(["v"], [])["row_count"] == 0
@@ -0,0 +1,46 @@
+import time
+
+from sample_preview import run_preview
+
+class _Adapter:
+    db_type = "oracle"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.queries = []
+
+    def estimate_rows(self, table):
+        return 10_000_000
+
+    def execute_query(self, sql):
+        self.queries.append(sql)
+        time.sleep(self.delay)
+        return True, [(42,)], ["COUNT(*)"]
+
+def test_aggregate_is_estimated_from_a_sample():
+    adapter = _Adapter()
+    preview = run_preview(adapter, "SELECT COUNT(*) FROM orders", sample_rows=100000)
+    assert preview["rows"] == [(4200,)] and preview["table"] == "orders"
+    assert "SAMPLE BLOCK" in adapter.queries[0]
+
+def test_plain_rows_are_not_previewed():
+    adapter = _Adapter()
+    assert run_preview(adapter, "SELECT order_id, status FROM orders", sample_rows=100000) is None
+    assert adapter.queries == []
+
+def test_small_table_and_late_sample_run_exactly():
+    assert run_preview(_Adapter(), "SELECT COUNT(*) FROM orders", sample_rows=2_000_000) is None
+    assert run_preview(_Adapter(delay=0.5), "SELECT COUNT(*) FROM orders", latency_target=0.05) is None
+
+def test_preview_ends_the_flow_and_the_exact_result_is_summarized():
+    from nodes import ExecuteSQL
+
+    adapter = _Adapter()
+    shared = {"db_adapter": adapter, "generated_sql": "SELECT COUNT(*) FROM orders", "preview_mode": True}
+    node = ExecuteSQL()
+    prep_res = node.prep(shared)
+    action = node.post(shared, prep_res, node.exec(prep_res))
+    assert action is None  # No SummarizeResult / StoreExample for sampled rows
+    shared["preview"]["exact"].result(5)
+    assert shared["final_result"] == [(42,)] and shared["preview"]["replaced"]
+    assert shared["result_summary"]["row_count"] == 1
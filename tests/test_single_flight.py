@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def slow():
+        runs.append(1)
+        release.wait(5)
+        return "rows"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("q", slow))) for _ in range(4)]
+    threads[0].start()
+    while flight.in_flight() == 0:
+        pass
+    for t in threads[1:]:
+        t.start()
+    while flight.coalesced < 3:
+        pass
+    release.set()
+    for t in threads:
+        t.join()
+    assert results == ["rows"] * 4
+    assert runs == [1]
+    assert (flight.calls, flight.coalesced, flight.in_flight()) == (1, 3, 0)
+
+def test_nothing_is_cached_after_the_call():
+    flight = SingleFlight()
+    assert flight.do("q", lambda: 1) == 1
+    assert flight.do("q", lambda: 2) == 2
+    assert flight.calls == 2
+
+def test_waiters_get_the_leaders_exception():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    def follower():
+        try:
+            flight.do("q", failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=follower)
+    leader.start()
+    started.wait(5)
+    waiter = threading.Thread(target=follower)
+    waiter.start()
+    while flight.coalesced < 1:
+        pass
+    release.set()
+    leader.join()
+    waiter.join()
+    assert errors == ["boom", "boom"]
+    assert flight.in_flight() == 0
+
+def test_different_keys_do_not_wait_on_each_other():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: flight.do("b", lambda: "inner")) == "inner"
+    with pytest.raises(KeyError):
+        flight.do("c", lambda: {}["missing"])
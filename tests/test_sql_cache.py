@@ -0,0 +1,74 @@
+import sqlite3
+
+from db_adapter import DatabaseAdapter
+from nodes import GenerateSQL
+from utils.sql_cache import SQLCache, normalize_question, schema_fingerprint
+from utils.sql_dialect import to_canonical, transpile
+
+SQLITE_TABLES = {"customers": [("customer_id", "INTEGER"), ("city", "TEXT")]}
+ORACLE_TABLES = {"SHOP.CUSTOMERS": [("CITY", "VARCHAR2(50)"), ("CUSTOMER_ID", "NUMBER(10)")]}
+
+def test_fingerprint_ignores_owner_case_types_and_order():
+    assert schema_fingerprint(SQLITE_TABLES) == schema_fingerprint(ORACLE_TABLES)
+    assert schema_fingerprint(SQLITE_TABLES) != schema_fingerprint({"customers": [("customer_id", "INTEGER")]})
+
+def test_get_normalizes_the_question():
+    cache = SQLCache()
+    fingerprint = schema_fingerprint(SQLITE_TABLES)
+    cache.put("How many customers?", fingerprint, "SELECT COUNT(*) FROM customers")
+    assert cache.get("  how many   CUSTOMERS ", fingerprint) == "SELECT COUNT(*) FROM customers"
+    assert cache.get("How many customers?", "other") is None
+    cache.remove("how many customers", fingerprint)
+    assert cache.get("How many customers?", fingerprint) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_lru_eviction():
+    cache = SQLCache(capacity=2)
+    for q in ("a", "b"):
+        cache.put(q, "f", q)
+    cache.get("a", "f")
+    cache.put("c", "f", "c")
+    assert cache.get("b", "f") is None and cache.get("a", "f") == "a"
+
+def test_persists_across_instances(tmp_path):
+    path = str(tmp_path / "sql_cache.db")
+    SQLCache(path=path).put("q", "f", "SELECT 1")
+    assert SQLCache(path=path).get("q", "f") == "SELECT 1"
+    # Written by another process after this one loaded
+    other = SQLCache(path=path)
+    SQLCache(path=path).put("q2", "f", "SELECT 2")
+    assert other.get("q2", "f") == "SELECT 2"
+
+def test_transpile_row_limits_and_functions():
+    assert transpile("SELECT name FROM t ORDER BY x LIMIT 5", "sqlite", "mssql") == "SELECT TOP 5 name FROM t ORDER BY x"
+    assert transpile("SELECT SUBSTR(name, 1, 2), IFNULL(a, 0) FROM t", "sqlite", "mssql") == \
+        "SELECT SUBSTRING(name, 1, 2), COALESCE(a, 0) FROM t"
+    assert "FETCH FIRST 5 ROWS ONLY" in transpile("SELECT name FROM t LIMIT 5", "sqlite", "oracle")
+
+def test_generate_sql_uses_the_cache_without_an_llm_call(tmp_path):
+    path = str(tmp_path / "shop.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE customers (customer_id INTEGER, city TEXT)")
+    conn.close()
+    adapter = DatabaseAdapter({"type": "sqlite", "path": path})
+    cache = SQLCache()
+    # Answered on Oracle earlier
+    cache.put("Top 5 cities", schema_fingerprint(ORACLE_TABLES),
+              to_canonical("SELECT CITY FROM CUSTOMERS FETCH FIRST 5 ROWS ONLY", "oracle"))
+    shared = {"db_adapter": adapter, "natural_query": "top 5 cities?", "schema": "customers(customer_id, city)",
+              "schema_tables": SQLITE_TABLES, "sql_cache": cache}
+    try:
+        GenerateSQL().run(shared)
+    finally:
+        adapter.close()
+    assert shared["generated_sql"] == "SELECT CITY FROM CUSTOMERS LIMIT 5"
+    assert shared["sql_cache_hit"] and shared["sql_tier"] is None
+
+def test_quoted_values_keep_their_case():
+    assert normalize_question("Orders with status 'SHIPPED'?") == "orders with status 'SHIPPED'"
+    assert normalize_question("Orders with status 'SHIPPED'") != normalize_question("orders with status 'shipped'")
+    assert normalize_question('Customers in "New York"') == 'customers in "New York"'
+    assert normalize_question("What's the customer's TOTAL?") == "what's the customer's total"
+    cache = SQLCache()
+    cache.put("orders with status 'shipped'", "f", "SELECT 1")
+    assert cache.get("orders with status 'SHIPPED'", "f") is None
@@ -0,0 +1,50 @@
+from utils.query_stats import QueryStats, percentile
+from utils.sql_fingerprint import dedupe_queries, fingerprint, normalize_sql
+
+def test_literals_case_comments_and_in_lists():
+    assert normalize_sql("select * from t where id in (1,2,3) and name = 'x' -- note\n;") == \
+        "SELECT * FROM t WHERE id IN (?+) AND name = ?"
+    assert normalize_sql("SELECT a FROM t WHERE b = -5 AND c = x - 1") == "SELECT a FROM t WHERE b = ? AND c = x - ?"
+
+def test_table_and_column_aliases():
+    assert fingerprint("SELECT o.id AS k FROM orders o") == fingerprint("select x.id as z from orders AS x")
+    assert fingerprint("SELECT id FROM orders") != fingerprint("SELECT id FROM customers")
+
+def test_subquery_aliases():
+    a = "SELECT t.x FROM (SELECT o.x FROM orders o WHERE o.y = 1) t"
+    b = "select q.x from (select z.x from orders AS z where z.y = 7) AS q"
+    assert normalize_sql(a) == "SELECT t1.x FROM (SELECT t2.x FROM orders t2 WHERE t2.y = ?) t1"
+    assert fingerprint(a) == fingerprint(b)
+    c = "SELECT a.id FROM users a JOIN (SELECT user_id FROM orders GROUP BY user_id) s ON s.user_id = a.id"
+    d = "SELECT u.id FROM users u JOIN (SELECT user_id FROM orders GROUP BY user_id) AS agg ON agg.user_id = u.id"
+    assert fingerprint(c) == fingerprint(d)
+
+def test_dedupe_keeps_first_of_each_shape():
+    assert dedupe_queries(["SELECT a FROM t WHERE b=1", "select a from t where b = 2", "SELECT a FROM u"]) == \
+        ["SELECT a FROM t WHERE b=1", "SELECT a FROM u"]
+
+def test_query_stats_per_shape():
+    stats = QueryStats(max_shapes=2)
+    stats.record("SELECT a FROM t WHERE b = 1", 0.1, True, rows=10)
+    stats.record("SELECT a FROM t WHERE b = 2", 0.3, False)
+    stats.record("SELECT a FROM t WHERE b = 3", 0.2, True, rows=30)
+    (shape,) = stats.summary()
+    assert shape["count"] == 3 and shape["error_rate"] == 1 / 3 and shape["rows_p95"] == 30
+    assert stats.expected_rows("SELECT a FROM t WHERE b = 99") == 30
+    stats.record("SELECT 1", 0.1, True)
+    stats.record("SELECT 2 FROM u", 0.1, True)
+    assert len(stats.summary()) == 2  # Least recently seen shape evicted
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([4, 1, 3, 2], 50) == 2  # Nearest rank
+    assert percentile([4, 1, 3, 2], 100) == 4
+
+def test_alias_named_like_its_source_column_is_kept():
+    assert normalize_sql("SELECT city AS city FROM customers") == "SELECT city AS city FROM customers"
+    assert fingerprint("SELECT city AS city FROM customers") != fingerprint("SELECT name AS name FROM customers")
+    assert dedupe_queries(["SELECT city AS city FROM customers", "SELECT name AS name FROM customers"]) == \
+        ["SELECT city AS city FROM customers", "SELECT name AS name FROM customers"]
+    # Aliases only referred to as aliases are still renamed
+    assert normalize_sql("SELECT COUNT(*) AS n FROM orders GROUP BY status ORDER BY n") == \
+        "SELECT count(*) AS c1 FROM orders GROUP BY status ORDER BY c1"
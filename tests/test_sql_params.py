@@ -0,0 +1,29 @@
+from decimal import Decimal
+
+from utils.sql_params import parameterize
+
+def test_binds_predicate_literals_only():
+    sql, params = parameterize("SELECT 1, 'x' FROM t WHERE c = N'AB' AND n = -5 ORDER BY 1 LIMIT 10")
+    assert sql == "SELECT 1, 'x' FROM t WHERE c = ? AND n = ? ORDER BY 1 LIMIT 10"
+    assert params == ["AB", -5]
+
+def test_in_lists_between_and_numeric_style():
+    sql, params = parameterize("SELECT a FROM t WHERE d IN (1, 2.5) AND e BETWEEN 1 AND 3", "numeric")
+    assert sql == "SELECT a FROM t WHERE d IN (:1, :2) AND e BETWEEN :3 AND :4"
+    assert params == [1, Decimal("2.5"), 1, 3]
+
+def test_strings_left_inline_without_bind_strings():
+    sql, params = parameterize("SELECT a FROM t WHERE code = 'AB' AND n > 5", "numeric", bind_strings=False)
+    assert sql == "SELECT a FROM t WHERE code = 'AB' AND n > :1"
+    assert params == [5]
+
+def test_existing_binds_are_left_alone():
+    for sql in ("SELECT a FROM t WHERE c = :name AND n = 5", "SELECT a FROM t WHERE c = ? AND n = 5",
+                "SELECT a FROM t WHERE c = @p1 AND n = 5"):
+        assert parameterize(sql) == (sql, [])
+
+def test_casts_are_not_binds():
+    assert parameterize("SELECT a FROM t WHERE c::int = 5") == ("SELECT a FROM t WHERE c::int = ?", [5])
+
+def test_nothing_to_bind():
+    assert parameterize("SELECT a FROM t ORDER BY 2") == ("SELECT a FROM t ORDER BY 2", [])
@@ -0,0 +1,49 @@
+import re
+
+from utils.sql_repair import render_row_limit, repair_sql, split_row_limit, sub_outside_literals
+
+TABLES = {
+    "customers": [("customer_id", "INTEGER"), ("first_name", "TEXT"), ("city", "TEXT")],
+    "orders": [("order_id", "INTEGER"), ("customer_id", "INTEGER")],
+}
+
+def test_top_and_semicolon_on_sqlite():
+    sql, fixes = repair_sql("SELECT TOP 5 first_name FROM customers;", 'near "5": syntax error', "sqlite", TABLES)
+    assert sql == "SELECT first_name FROM customers LIMIT 5"
+    assert fixes == ["removed trailing semicolon", "rewrote row limit syntax for sqlite"]
+
+def test_limit_on_oracle():
+    sql, _ = repair_sql("SELECT * FROM customers LIMIT 3", "ORA-00933: SQL command not properly ended",
+                        "oracle", TABLES)
+    assert sql == "SELECT * FROM customers FETCH FIRST 3 ROWS ONLY"
+
+def test_misspelled_column_and_table():
+    assert repair_sql("SELECT frist_name FROM customers", "no such column: frist_name", "sqlite", TABLES)[0] == \
+        "SELECT first_name FROM customers"
+    assert repair_sql("SELECT * FROM customer", "no such table: customer", "sqlite", TABLES)[0] == \
+        "SELECT * FROM customers"
+
+def test_oracle_missing_table_checks_from_targets():
+    sql, fixes = repair_sql("SELECT * FROM order", "ORA-00942: table or view does not exist", "oracle", TABLES)
+    assert sql == "SELECT * FROM orders"
+    assert fixes == ["table order -> orders"]
+
+def test_ilike_emulated():
+    assert repair_sql("SELECT * FROM customers WHERE city ILIKE '%york'", 'near "ILIKE"', "sqlite", TABLES)[0] == \
+        "SELECT * FROM customers WHERE city LIKE '%york'"
+    assert repair_sql("SELECT * FROM customers WHERE city ILIKE '%york'", "ORA-00933", "oracle", TABLES)[0] == \
+        "SELECT * FROM customers WHERE LOWER(city) LIKE LOWER('%york')"
+
+def test_no_rule_applies():
+    assert repair_sql("SELECT 1", "something else", "sqlite", TABLES) == (None, [])
+
+def test_row_limit_round_trip():
+    assert split_row_limit("SELECT a FROM t LIMIT 10 OFFSET 5") == ("SELECT a FROM t", 10, 5)
+    assert split_row_limit("SELECT TOP (3) a FROM t") == ("SELECT a FROM t", 3, None)
+    assert render_row_limit("SELECT a FROM t ORDER BY a", "mssql", 3) == "SELECT TOP 3 a FROM t ORDER BY a"
+    assert render_row_limit("SELECT a FROM t", "mssql", 3, 6) == \
+        "SELECT a FROM t ORDER BY (SELECT NULL) OFFSET 6 ROWS FETCH NEXT 3 ROWS ONLY"
+
+def test_literals_are_not_rewritten():
+    assert sub_outside_literals(re.compile("ILIKE"), "LIKE", "SELECT 'ILIKE' WHERE a ILIKE b") == \
+        "SELECT 'ILIKE' WHERE a LIKE b"
@@ -0,0 +1,57 @@
+import sqlite3
+
+import pytest
+
+from utils.sql_sample import plan_sample, sample_table, scale_rows
+
+@pytest.mark.parametrize("sql, table", [
+    ("SELECT COUNT(*) FROM orders", "orders"),
+    ("SELECT status, SUM(total_amount) FROM sales.orders o GROUP BY status", "sales.orders"),
+    ("SELECT * FROM orders", "orders"),
+    ("SELECT COUNT(*) FROM orders o JOIN customers c ON o.customer_id = c.customer_id", None),
+    ("SELECT COUNT(*) FROM (SELECT * FROM orders) t", None),
+    ("WITH t AS (SELECT * FROM orders) SELECT COUNT(*) FROM t", None),
+    ("SELECT status, COUNT(*) FROM orders GROUP BY status HAVING COUNT(*) > 5", None),
+    ("SELECT COUNT(*) OVER () FROM orders", None),
+    ("SELECT COUNT(*) FROM orders UNION SELECT COUNT(*) FROM customers", None),
+])
+def test_sample_table(sql, table):
+    assert sample_table(sql, "sqlite") == table
+
+def test_plan_kinds():
+    plan = plan_sample("SELECT status, COUNT(*), SUM(total_amount), AVG(total_amount), MAX(order_date) "
+                       "FROM orders GROUP BY status", "oracle", 0.01)
+    assert plan.kinds == ["key", "count", "sum", "avg", "unscaled"]
+    assert plan.aggregate
+    assert "SAMPLE BLOCK (1.000000)" in plan.sql
+    assert set(plan.hidden) == {2, 3}
+    assert not plan_sample("SELECT order_id, status FROM orders", "mssql", 0.01).aggregate
+    assert plan_sample("SELECT COUNT(DISTINCT status) FROM orders", "oracle", 0.01) is None
+    assert plan_sample("SELECT COUNT(*) FROM orders", "oracle", 1.0) is None
+
+def test_sqlite_plan_reads_rowid_ranges(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "big.db"))
+    conn.execute("CREATE TABLE orders (status TEXT, total_amount REAL)")
+    conn.executemany("INSERT INTO orders VALUES (?, ?)",
+                     [("shipped" if i % 2 else "pending", 10.0) for i in range(10000)])
+    plan = plan_sample("SELECT status, COUNT(*), SUM(total_amount) FROM orders o GROUP BY status",
+                       "sqlite", 0.1, max_rowid=10000, seed=1)
+    assert "rowid BETWEEN" in plan.sql and 0.09 < plan.fraction <= 0.1
+    cursor = conn.execute(plan.sql)
+    columns = [d[0] for d in cursor.description]
+    columns, rows, bounds = scale_rows(plan, columns, cursor.fetchall())
+    conn.close()
+    assert columns == ["status", "COUNT(*)", "SUM(total_amount)"]
+    for status, count, total in rows:
+        assert abs(count - 5000) < 100 and abs(total - 50000) < 1000
+    assert all(set(b) == {"COUNT(*)", "SUM(total_amount)"} for b in bounds)
+
+def test_scale_rows():
+    plan = plan_sample("SELECT COUNT(*), SUM(x), AVG(x), MIN(x) FROM t", "duckdb", 0.25)
+    # Sample of x = 1, 2, 3, 4: count, sum, avg, min, then the hidden sum of squares and avg stats
+    row = (4, 10, 2.5, 1, 30, 10, 30, 4)
+    columns, rows, bounds = scale_rows(plan, ["n", "total", "mean", "low", "a", "b", "c", "d"], [row])
+    assert columns == ["n", "total", "mean", "low"]
+    assert rows == [(16, 40.0, 2.5, 1)]
+    assert set(bounds[0]) == {"n", "total", "mean"}
+    assert bounds[0]["mean"] > 0
@@ -0,0 +1,43 @@
+import pytest
+
+from utils.sql_tokens import classify_statement, is_read_only, tokenize
+
+@pytest.mark.parametrize("sql, kind", [
+    ("SELECT * FROM t", "read"),
+    ("  -- note\n(SELECT 1) UNION (SELECT 2)", "read"),
+    ("WITH x AS (SELECT 1) SELECT * FROM x", "read"),
+    ("WITH x AS (SELECT 1) DELETE FROM t WHERE id IN (SELECT * FROM x)", "write"),
+    ("SELECT * INTO backup FROM t", "write"),
+    ("SELECT * FROM t FOR UPDATE", "write"),
+    ("UPDATE t SET a = 1", "write"),
+    ("DROP TABLE t", "ddl"),
+    ("PRAGMA table_info(t)", "read"),
+    ("PRAGMA journal_mode = WAL", "write"),
+    ("BEGIN", "other"),
+    ("SELECT 1; DELETE FROM t", "write"),
+    ("SELECT 'DELETE FROM t'", "read"),
+])
+def test_classify_statement(sql, kind):
+    assert classify_statement(sql) == kind
+
+@pytest.mark.parametrize("sql, kind", [
+    ("EXPLAIN SELECT * FROM t", "read"),
+    ("EXPLAIN QUERY PLAN SELECT * FROM t", "read"),
+    ("EXPLAIN ANALYZE DELETE FROM t", "write"),
+    ("EXPLAIN (ANALYZE, FORMAT JSON) INSERT INTO t VALUES (1)", "write"),
+    ("EXPLAIN PLAN FOR UPDATE t SET a = 1", "write"),
+    ("EXPLAIN PLAN SET STATEMENT_ID = 'x' INTO plans FOR SELECT * FROM t", "read"),
+    ("EXPLAIN WITH x AS (SELECT 1) DELETE FROM t", "write"),
+    ("EXPLAIN DROP TABLE t", "ddl"),
+])
+def test_explain_is_classified_by_the_wrapped_statement(sql, kind):
+    assert classify_statement(sql) == kind
+
+def test_read_only_guard_rejects_explain_analyze_dml():
+    assert not is_read_only("EXPLAIN ANALYZE DELETE FROM t")
+
+def test_tokenize():
+    assert tokenize("SELECT a::int, 'it''s' FROM t WHERE b = :x -- c") == [
+        ("word", "SELECT"), ("word", "a"), ("op", "::"), ("word", "int"), ("op", ","), ("string", "'it''s'"),
+        ("word", "FROM"), ("word", "t"), ("word", "WHERE"), ("word", "b"), ("op", "="), ("bind", ":x"),
+    ]
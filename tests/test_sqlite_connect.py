@@ -0,0 +1,37 @@
+import sqlite3
+
+from db_adapter import DatabaseAdapter
+
+def _db(tmp_path):
+    path = str(tmp_path / "shop.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (a INTEGER)")
+    conn.commit()
+    conn.close()
+    return path
+
+def _journal_mode(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA journal_mode").fetchone()[0]
+    finally:
+        conn.close()
+
+def test_file_mode_leaves_the_journal_mode_alone(tmp_path):
+    path = _db(tmp_path)
+    for config in ({}, {"read_only": True, "sqlite_wal": True}, {"sqlite_mode": "immutable", "sqlite_wal": True}):
+        adapter = DatabaseAdapter({"type": "sqlite", "path": path, **config})
+        try:
+            assert adapter.execute_query("SELECT count(*) FROM t") == (True, [(0,)], ["count(*)"])
+        finally:
+            adapter.close()
+        assert _journal_mode(path) == "delete"
+
+def test_wal_is_opt_in(tmp_path):
+    path = _db(tmp_path)
+    adapter = DatabaseAdapter({"type": "sqlite", "path": path, "sqlite_wal": True})
+    try:
+        adapter.execute_query("SELECT count(*) FROM t")
+    finally:
+        adapter.close()
+    assert _journal_mode(path) == "wal"
@@ -0,0 +1,35 @@
+from utils.value_index import ValueIndex, normalize_value, open_value_index, write_value_index
+
+ENTRIES = [
+    ("customers", "city", "New York"),
+    ("customers", "city", "York"),
+    ("customers", "city", "Chicago"),
+    ("orders", "status", "shipped"),
+    ("products", "name", "Laptop Pro 15"),
+]
+
+def _index(tmp_path):
+    path = str(tmp_path / "values.idx")
+    write_value_index(path, ENTRIES)
+    return ValueIndex(path)
+
+def test_round_trip(tmp_path):
+    index = _index(tmp_path)
+    try:
+        assert list(index.entries()) == ENTRIES
+    finally:
+        index.close()
+
+def test_links_values_named_in_the_question(tmp_path):
+    index = _index(tmp_path)
+    try:
+        assert index.link("customers in new york city") == [(1.0, "customers", "city", "New York")]
+        assert sorted(v for _, _, _, v in index.link("orders SHIPPED to CHICAGO!")) == ["Chicago", "shipped"]
+        assert index.link("laptop-pro 15 sales")[0][3] == "Laptop Pro 15"
+        assert index.link("revenue by month") == []
+    finally:
+        index.close()
+
+def test_normalize_and_missing_file(tmp_path):
+    assert normalize_value("  New_York, NY ") == "new york ny"
+    assert open_value_index(str(tmp_path / "missing.idx")) is None
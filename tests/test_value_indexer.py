@@ -0,0 +1,80 @@
+import json
+import sqlite3
+import threading
+
+from db_adapter import DatabaseAdapter
+from value_indexer import ValueIndexer
+
+def _adapter(tmp_path):
+    path = str(tmp_path / "shop.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE customers (id INTEGER, city TEXT)")
+    conn.execute("INSERT INTO customers VALUES (1, 'Chicago')")
+    conn.commit()
+    conn.close()
+    return DatabaseAdapter({"type": "sqlite", "path": path}), path
+
+def _add_city(path, city):
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO customers VALUES (2, ?)", (city,))
+    conn.commit()
+    conn.close()
+
+def _values(indexer):
+    return sorted(value for _, _, value in indexer.index.entries())
+
+def test_unchanged_schema_is_not_reread_until_max_age(tmp_path):
+    adapter, path = _adapter(tmp_path)
+    try:
+        indexer = ValueIndexer(adapter, str(tmp_path / "values.idx"))
+        assert indexer.refresh()
+        _add_city(path, "Boston")
+        assert not indexer.refresh()
+        assert _values(indexer) == ["Chicago"]
+        indexer.max_age = 0.0
+        assert indexer.refresh()
+        assert _values(indexer) == ["Boston", "Chicago"]
+    finally:
+        adapter.close()
+
+def test_stale_index_is_refreshed_on_lookup(tmp_path):
+    adapter, path = _adapter(tmp_path)
+    try:
+        index_path = str(tmp_path / "values.idx")
+        ValueIndexer(adapter, index_path).refresh()
+        with open(f"{index_path}.json", encoding="utf-8") as f:
+            manifest = json.load(f)
+        manifest["indexed_at"] = {"customers": 0.0}  # Read long ago
+        with open(f"{index_path}.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        _add_city(path, "Boston")
+        indexer = ValueIndexer(adapter, index_path)
+        assert _values(indexer) == ["Chicago"]
+        indexer.refresh_if_stale()
+        indexer._thread.join()
+        assert _values(indexer) == ["Boston", "Chicago"]
+        indexer.refresh_if_stale()  # Fresh again: no new refresh
+        assert not indexer._thread.is_alive()
+    finally:
+        adapter.close()
+
+def test_concurrent_starts_run_one_refresh(tmp_path):
+    adapter, _ = _adapter(tmp_path)
+    try:
+        indexer = ValueIndexer(adapter, str(tmp_path / "values.idx"))
+        release, runs = threading.Event(), []
+
+        def slow_refresh():
+            runs.append(threading.current_thread().name)
+            release.wait(5)
+        indexer.refresh = slow_refresh
+        starters = [threading.Thread(target=indexer.refresh_if_stale) for _ in range(8)]
+        for t in starters:
+            t.start()
+        for t in starters:
+            t.join()
+        release.set()
+        indexer._thread.join()
+        assert len(runs) == 1
+    finally:
+        adapter.close()
@@ -1,54 +1,144 @@
-
-import sys
+import contextlib
 import os
+import threading
+import time
+import warnings
 from flow import create_text_to_sql_flow
 from populate_db import populate_database, DB_FILE
+from db_adapter import DatabaseAdapter
+from config import (DEFAULT_MAX_RETRIES, DEFAULT_MAX_LOCAL_REPAIR_PASSES, AGENT_MAX_ROWS, AGENT_MAX_CELL_CHARS,
+                    EXAMPLE_STORE_CAPACITY, FEW_SHOT_K, SQL_CACHE_CAPACITY, RUN_LOG_PATH)
+from utils.call_llm import get_client
+from utils.example_store import ExampleStore
+from utils.sql_cache import SQLCache
+from utils.run_log import RunLog, log_run
+from utils.cassette import Cassette
 from google.adk.agents import Agent
 from google.adk.models.lite_llm import LiteLlm
-import subprocess
-from google.adk.tools import FunctionTool
-import sys
-import os
 
+# Suppress the specific PocketFlow warning about flow endings
+warnings.filterwarnings("ignore", message="Flow ends:*", category=UserWarning)
+
+def _compact_value(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = str(value)
+    if len(text) > AGENT_MAX_CELL_CHARS:
+        text = text[:AGENT_MAX_CELL_CHARS] + "..."
+    return text
+
+class TextToSQLService:
+    """Long-lived text-to-SQL backend for the agent tool.
 
-def text_to_sql(query):
-    db_path=DB_FILE
-    max_debug_retries=3
-    if not os.path.exists(db_path) or os.path.getsize(db_path) == 0:
-        print(f"Database at {db_path} missing or empty. Populating...")
-        populate_database(db_path)
+    The database adapter (and its connection pools and schema cache), the LLM client and the
+    flow are built once; every call only gets its own shared store, so concurrent tool calls
+    are safe.
+    """
 
-    shared = {
-        "db_path": db_path,
-        "natural_query": query,
-        "max_debug_attempts": max_debug_retries,
-        "debug_attempts": 0,
-        "final_result": None,
-        "final_error": None
-    }
+    def __init__(self, db_config, max_debug_retries=DEFAULT_MAX_RETRIES,
+                 max_local_repair_passes=DEFAULT_MAX_LOCAL_REPAIR_PASSES, max_rows=AGENT_MAX_ROWS):
+        if db_config["type"] == "sqlite":
+            db_path = db_config["path"]
+            if not os.path.exists(db_path) or os.path.getsize(db_path) == 0:
+                print(f"Database at {db_path} missing or empty. Populating...")
+                populate_database(db_path)
+        self.db_adapter = DatabaseAdapter(db_config)
+        self.db_adapter.get_schema()  # Warm the schema cache
+        get_client()
+        self.flow = create_text_to_sql_flow()
+        self.max_debug_retries = max_debug_retries
+        self.max_local_repair_passes = max_local_repair_passes
+        self.max_rows = max_rows
+        # Shared by all calls, so every answered question helps the next similar one
+        self.example_store = ExampleStore(EXAMPLE_STORE_CAPACITY, os.environ.get("TXT2SQL_EXAMPLE_STORE"))
+        # Point every backend's service at one file to reuse answers across the fleet
+        self.sql_cache = SQLCache(SQL_CACHE_CAPACITY, os.environ.get("TXT2SQL_SQL_CACHE"))
+        run_log_path = os.environ.get("TXT2SQL_RUN_LOG", RUN_LOG_PATH)
+        self.run_log = RunLog(run_log_path) if run_log_path else None
+        # Production traffic recorded for offline replay (replay.py)
+        record_path = os.environ.get("TXT2SQL_RECORD")
+        self.cassette = Cassette(record_path) if record_path else None
 
-    print(f"\n=== Starting Text-to-SQL Workflow ===")
-    print(f"Query: '{natural_query}'")
-    print(f"Database: {db_path}")
-    print(f"Max Debug Retries on SQL Error: {max_debug_retries}")
-    print("=" * 45)
+    def run(self, query, schemas=None):
+        shared = {
+            "db_adapter": self.db_adapter,
+            "natural_query": query,
+            "schemas": schemas,  # Per-tenant scope; None uses the adapter's configured schemas
+            "max_debug_attempts": self.max_debug_retries,
+            "max_local_repair_passes": self.max_local_repair_passes,
+            "example_store": self.example_store,
+            "sql_cache": self.sql_cache,
+            "few_shot_k": FEW_SHOT_K,
+            "run_log": self.run_log,
+            "run_id": RunLog.new_run_id(),
+            "debug_attempts": 0,
+            "final_result": None,
+            "final_error": None
+        }
+        started_at = time.time()
+        recording = self.cassette.recording(shared) if self.cassette is not None else contextlib.nullcontext()
+        try:
+            with recording:
+                self.flow.run(shared)
+        except Exception as e:
+            log_run(shared, started_at, error=str(e))
+            raise
+        log_run(shared, started_at)
+        return self.compact_result(shared)
 
-    flow = create_text_to_sql_flow()
-    flow.run(shared) # Let errors inside the loop be handled by the flow logic
+    def compact_result(self, shared):
+        """Columns plus the first max_rows rows, instead of the full Python result list."""
+        result = {"sql": shared.get("generated_sql")}
+        rows = shared.get("final_result")
+        if shared.get("final_error"):
+            result.update(status="error", error=shared["final_error"])
+        elif isinstance(rows, list):
+            result.update(
+                status="ok",
+                columns=list(shared.get("result_columns") or []),
+                rows=[[_compact_value(v) for v in row] for row in rows[:self.max_rows]],
+                row_count=len(rows),
+                truncated=len(rows) > self.max_rows
+            )
+            summary = shared.get("result_summary")
+            if result["truncated"] and summary:
+                # Column stats describe the rows the agent doesn't get to see
+                result["column_stats"] = [
+                    {k: ([{"value": _compact_value(t["value"]), "count": t["count"]} for t in v]
+                         if k == "top_values" else _compact_value(v))
+                     for k, v in col.items()}
+                    for col in summary["columns"]
+                ]
+        elif rows is not None:
+            result.update(status="ok", message=str(rows))
+        else:
+            result.update(status="ok", message="No query was run.", schema=shared.get("schema"))
+        return result
 
-    # Check final state based on shared data
-    if shared.get("final_error"):
-            print("\n=== Workflow Completed with Error ===")
-            print(f"Error: {shared['final_error']}")
-    elif shared.get("final_result") is not None:
-            print("\n=== Workflow Completed Successfully ===")
-            # Result already printed by ExecuteSQL node
-    else:
-            # Should not happen if flow logic is correct and covers all end states
-            print("\n=== Workflow Completed (Unknown State) ===")
+_service = None
+_service_lock = threading.Lock()
 
-    print("=" * 36)
-    return shared.get("final_result")
+def get_service():
+    """The module-level service, created on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                db_path = os.environ.get("TXT2SQL_DB_PATH", DB_FILE)
+                _service = TextToSQLService({"type": "sqlite", "path": db_path, "read_only": True})
+    return _service
+
+def text_to_sql(query: str) -> dict:
+    """Answer a natural language question about the database by generating and running SQL.
+
+    Args:
+        query: The question in natural language.
+
+    Returns:
+        dict with status, the executed sql, columns, the first rows, row_count and whether
+        rows were truncated (or an error message).
+    """
+    return get_service().run(query)
 
 sqlagent = Agent(
     model=LiteLlm(model="gpt-3.5-turbo", base_url="http://localhost:1234/v1", api_key="sdsd", provider="openai"),
@@ -65,4 +155,3 @@ root_agent = Agent(
     description = """As a natural language to SQL agent I want to processing incoming valid natuaral language text which is eligible to be converted  shouldb e passed by tool sqlagent""",
     sub_agents=[sqlagent]
 )
-
@@ -1,21 +1,104 @@
+import json
+import math
 import os
-from openai import OpenAI
-
-def call_llm(prompt):    
-    client_kwargs = {
-        "api_key": os.environ.get("OPENAI_API_KEY", "your-api-key"),
-        "base_url": os.environ.get("OPENAI_URL", "http://localhost:1234/v1")
-    }
-        
-        # Create client with only the supported parameters
-    client = OpenAI(**client_kwargs)  
-    r = client.chat.completions.create(
-        model="meta-llama-3.1-8b-instruct",
-        messages=[{"role": "user", "content": prompt}],
-        reasoning_effort="medium",
-        store=False
-    )
-    return r.choices[0].message.content
+import threading
+from utils.cassette import current_tape
+from utils.llm_endpoints import LLMEndpoint, LLMPool
+from utils.llm_scheduler import LLMScheduler
+
+_pools = {}
+_client_lock = threading.Lock()
+_scheduler = None
+
+# Model tiers: "large" is the main model; "small" (optional) is a fast model tried first
+TIER_ENDPOINT_VARS = {"large": "LLM_ENDPOINTS", "small": "LLM_SMALL_ENDPOINTS"}
+
+def _endpoint_configs(tier):
+    """LLM_ENDPOINTS (LLM_SMALL_ENDPOINTS for the small tier): JSON list of {"base_url",
+    "model", "api_key", "name", "timeout", "params"}; by default the single server at OPENAI_URL
+    for the large tier and none for the small one."""
+    raw = os.environ.get(TIER_ENDPOINT_VARS[tier])
+    if raw:
+        return json.loads(raw)
+    if tier != "large":
+        return []
+    return [{
+        "base_url": os.environ.get("OPENAI_URL", "http://localhost:1234/v1"),
+        "model": os.environ.get("LLM_MODEL", "meta-llama-3.1-8b-instruct"),
+        "params": {"reasoning_effort": "medium"}
+    }]
+
+def get_llm_pool(tier="large"):
+    """The endpoints a tier's calls are routed over, each with one client (and HTTP connection
+    pool); None for a tier without endpoints."""
+    if tier not in _pools:
+        with _client_lock:
+            if tier not in _pools:
+                configs = _endpoint_configs(tier)
+                # With several endpoints a failing one is left for the next rather than retried
+                max_retries = 2 if len(configs) == 1 else 0
+                api_key = os.environ.get("OPENAI_API_KEY", "your-api-key")
+                _pools[tier] = LLMPool([
+                    LLMEndpoint.from_config({"api_key": api_key, **config}, i, max_retries)
+                    for i, config in enumerate(configs, 1)
+                ]) if configs else None
+    return _pools[tier]
+
+def has_tier(tier):
+    return get_llm_pool(tier) is not None
+
+def get_client():
+    """The OpenAI client of the first configured large-tier endpoint."""
+    return get_llm_pool().endpoints[0].client
+
+def get_scheduler():
+    """The scheduler every LLM call waits in, sized by LLM_MAX_IN_FLIGHT (default 4) and
+    LLM_TOKENS_PER_MINUTE (default: no token budget)."""
+    global _scheduler
+    if _scheduler is None:
+        with _client_lock:
+            if _scheduler is None:
+                tpm = os.environ.get("LLM_TOKENS_PER_MINUTE")
+                _scheduler = LLMScheduler(
+                    max_in_flight=int(os.environ.get("LLM_MAX_IN_FLIGHT", "4")),
+                    tokens_per_minute=int(tpm) if tpm else None
+                )
+    return _scheduler
+
+def set_scheduler(scheduler):
+    global _scheduler
+    _scheduler = scheduler
+
+def call_llm(prompt, priority="interactive", tier="large"):
+    """priority: "interactive" (SQL generation), "retry" (debugging) or "batch"."""
+    return call_llm_scored(prompt, priority, tier)[0]
+
+def call_llm_scored(prompt, priority="interactive", tier="large"):
+    """(completion, confidence): confidence is the geometric mean token probability when the
+    endpoint returns logprobs (set "params": {"logprobs": true}), otherwise None."""
+    # A recorded run keeps the completion; a replayed one gets it back without calling the model
+    tape = current_tape()
+    if tape is not None:
+        completion = tape.llm(prompt, lambda p: _complete(p, priority, tier))
+        # Cassettes recorded before confidences were kept hold bare completions
+        return (completion, None) if isinstance(completion, str) else tuple(completion)
+    return _complete(prompt, priority, tier)
+
+def _complete(prompt, priority="interactive", tier="large"):
+    pool = get_llm_pool(tier)
+    scheduler = get_scheduler()
+    with scheduler.slot(prompt, priority) as ticket:
+        # A hedged duplicate is a request of its own: it needs a free slot and its token charge
+        r, _ = pool.complete(prompt, hedge_slot=lambda: scheduler.try_acquire(prompt, priority))
+        usage = getattr(r, "usage", None)
+        if usage is not None and usage.total_tokens:
+            ticket.settle(usage.total_tokens)
+    choice = r.choices[0]
+    confidence = None
+    logprobs = getattr(choice, "logprobs", None)
+    if logprobs is not None and logprobs.content:
+        confidence = math.exp(sum(t.logprob for t in logprobs.content) / len(logprobs.content))
+    return choice.message.content, confidence
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,289 @@
+import contextlib
+import contextvars
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.example_store import Example
+from utils.run_log import run_outcome
+
+_current_tape: contextvars.ContextVar = contextvars.ContextVar("cassette_tape", default=None)
+
+class ReplayMiss(LookupError):
+    """The replayed flow asked for an LLM completion or query result that wasn't recorded."""
+
+def current_tape() -> Optional["Tape"]:
+    """The tape of the flow run in this context, if it is being recorded or replayed."""
+    return _current_tape.get()
+
+@contextlib.contextmanager
+def use_tape(tape: "Tape"):
+    token = _current_tape.set(tape)
+    try:
+        yield tape
+    finally:
+        _current_tape.reset(token)
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).hexdigest()
+
+def _sql_key(sql: str) -> str:
+    return " ".join(sql.split())
+
+# Inputs GenerateSQL builds its prompt from that change while a run goes on (background profiling)
+_INPUTS = ("column_profiles", "value_links")
+
+class Tape:
+    """LLM completions and query results of one flow run.
+
+    Recording (`run=None`), `llm` and `query` call through and keep what came back. Replaying,
+    they hand back the recorded values instantly: completions in call order, query results by
+    SQL text. Divergences (a changed prompt, SQL that was never run) are collected in `drift`;
+    with `strict` a changed prompt raises ReplayMiss. SQL missing from the tape goes to the
+    `execute` fallback when there is one, otherwise it raises ReplayMiss.
+    """
+
+    def __init__(self, run: Optional[Dict[str, Any]] = None, strict: bool = False):
+        self.replaying = run is not None
+        self.strict = strict
+        self.llm_calls: List[Dict[str, Any]] = list(run["llm_calls"]) if run else []
+        self.queries: List[Dict[str, Any]] = list(run["queries"]) if run else []
+        self.examples: List[List[Dict[str, Any]]] = list(run.get("examples") or []) if run else []
+        self.checks: List[Dict[str, Any]] = list(run.get("checks") or []) if run else []
+        # Prompt inputs read outside the tape, as the flow saw them when it read them
+        self.inputs: Dict[str, Any] = {name: run[name] for name in _INPUTS if run.get(name) is not None} if run else {}
+        self.drift: List[str] = []
+        self._llm_pos = 0
+        self._by_sql: Dict[str, List[Dict[str, Any]]] = {}
+        for recorded in self.queries:
+            self._by_sql.setdefault(_sql_key(recorded["sql"]), []).append(recorded)
+        self._checks: Dict[Tuple[str, str], Any] = {
+            (c["kind"], _sql_key(c["sql"])): c["result"] for c in self.checks
+        }
+
+    def llm(self, prompt: str, complete: Callable[[str], str]) -> str:
+        if not self.replaying:
+            started = time.time()
+            completion = complete(prompt)
+            self.llm_calls.append({"prompt_hash": prompt_hash(prompt), "prompt": prompt,
+                                   "completion": completion, "duration": time.time() - started})
+            return completion
+        n = self._llm_pos
+        if n >= len(self.llm_calls):
+            raise ReplayMiss(f"LLM call {n + 1} was not recorded")
+        self._llm_pos += 1
+        call = self.llm_calls[n]
+        if call["prompt_hash"] != prompt_hash(prompt):
+            if self.strict:
+                raise ReplayMiss(f"Prompt of LLM call {n + 1} changed")
+            self.drift.append(f"prompt of LLM call {n + 1} changed")
+        return call["completion"]
+
+    def query(self, sql: str, execute: Optional[Callable[[str], Tuple[bool, Any, List[str]]]]):
+        if not self.replaying:
+            started = time.time()
+            success, result, columns = execute(sql)
+            rows = [list(row) for row in result] if isinstance(result, list) else result
+            self.queries.append({"sql": sql, "success": success, "result": rows, "columns": columns,
+                                 "duration": time.time() - started})
+            return success, result, columns
+        recorded = self._by_sql.get(_sql_key(sql))
+        if not recorded:
+            self.drift.append(f"SQL not on the tape: {_sql_key(sql)[:200]}")
+            if execute is None:
+                raise ReplayMiss(f"SQL was not recorded: {_sql_key(sql)[:200]}")
+            return execute(sql)
+        # The same SQL can run more than once (e.g. after a failed repair); replay in order
+        entry = recorded.pop(0) if len(recorded) > 1 else recorded[0]
+        result = entry["result"]
+        if isinstance(result, list):
+            result = [tuple(row) for row in result]
+        return entry["success"], result, entry["columns"]
+
+    def check(self, kind: str, sql: str, run: Optional[Callable[[str], Any]]):
+        """A validation of `sql` (e.g. "explain"); replayed from the tape, None if not on it."""
+        if not self.replaying:
+            result = run(sql)
+            self.checks.append({"kind": kind, "sql": sql, "result": result})
+            return result
+        key = (kind, _sql_key(sql))
+        if key not in self._checks:
+            self.drift.append(f"{kind} not on the tape: {_sql_key(sql)[:200]}")
+            return run(sql) if run is not None else None
+        return self._checks[key]
+
+    def input(self, name: str, value: Any) -> Any:
+        """A flow input read from outside the tape (column profiles, value links). The value
+        seen first is recorded, as it will come back from JSON; replaying returns that value."""
+        if not self.replaying:
+            self.inputs.setdefault(name, json.loads(json.dumps(value, default=str)))
+            return value
+        return self.inputs.get(name, value)
+
+    def search_examples(self, store, question: str, k: int, db_type: Optional[str]):
+        if not self.replaying:
+            results = store.search(question, k, db_type)
+            self.examples.append([{"score": score, "question": e.question, "sql": e.sql,
+                                   "canonical_sql": e.canonical_sql, "db_type": e.db_type}
+                                  for score, e in results])
+            return results
+        if not self.examples:
+            return []
+        return [(e["score"], Example(None, e["question"], e["sql"], e["canonical_sql"], e["db_type"]))
+                for e in self.examples.pop(0)]
+
+class _TapedExamples:
+    """Example store seen by a recorded or replayed run: searches go through the tape, so a
+    replay sees the same few-shot examples; nothing is added during replay."""
+
+    def __init__(self, tape: Tape, store=None):
+        self._tape = tape
+        self._store = store
+
+    def search(self, question: str, k: int = 3, db_type: Optional[str] = None, min_score: float = 0.2):
+        return self._tape.search_examples(self._store, question, k, db_type)
+
+    def add(self, *args, **kwargs):
+        if self._store is not None and not self._tape.replaying:
+            return self._store.add(*args, **kwargs)
+
+class _RecordedLinks:
+    def __init__(self, links: List[List[Any]]):
+        self._links = [tuple(link) for link in links]
+
+    def link(self, question: str, *args, **kwargs):
+        return list(self._links)
+
+class ReplayAdapter:
+    """Stands in for DatabaseAdapter during a replay: the recorded schema, column profiles and
+    value links, and query results from the tape. `fallback` (a live DatabaseAdapter) runs
+    SQL that isn't on the tape."""
+
+    read_only = True
+
+    def __init__(self, run: Dict[str, Any], fallback=None):
+        self.run = run
+        self.db_type = run["db_type"]
+        self.schema_version = run.get("schema_version") or 0
+        self.fallback = fallback
+        self._tables = {t: [tuple(c) for c in cols] for t, cols in (run.get("schema_tables") or {}).items()}
+
+    def get_schema(self, refresh: bool = False, schemas=None) -> str:
+        return self.run["schema"]
+
+    def get_schema_tables(self, refresh: bool = False, schemas=None):
+        return self._tables
+
+    def column_profiles(self):
+        return self.run.get("column_profiles") or {}
+
+    def value_index(self):
+        return _RecordedLinks(self.run.get("value_links") or [])
+
+    def get_db_info(self) -> str:
+        return f"Replay of a {self.db_type} run"
+
+    def db_key(self) -> str:
+        return f"replay:{self.db_type}"
+
+    def explain(self, sql_query: str):
+        execute = self.fallback._explain if self.fallback is not None else None
+        return current_tape().check("explain", sql_query, execute)
+
+    def execute_query(self, sql_query: str):
+        execute = self.fallback._execute_query if self.fallback is not None else None
+        return current_tape().query(sql_query, execute)
+
+class Cassette:
+    """Flow runs recorded to a JSON Lines file, one run per line.
+
+    A run holds the question and flow settings, what the flow read from the database adapter
+    (schema text and model, column profiles, value links), the few-shot examples it was shown,
+    every LLM prompt/completion and every query with its result and timing. Results are
+    stored as JSON, so dates and decimals come back as strings on replay.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def recording(self, shared: Dict[str, Any]) -> Iterator[Tape]:
+        """Record the flow run driven with `shared` inside this block."""
+        tape = Tape()
+        # Both are replaced while the flow runs
+        canonical_sql = shared.get("canonical_sql")
+        example_store = shared.get("example_store")
+        if example_store is not None:
+            shared["example_store"] = _TapedExamples(tape, example_store)
+        started = time.time()
+        error = None
+        try:
+            with use_tape(tape):
+                yield tape
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            if example_store is not None:
+                shared["example_store"] = example_store
+            run = self._run_record(shared, tape, time.time() - started, error)
+            run["canonical_sql"] = canonical_sql
+            run["examples"] = tape.examples if example_store is not None else None
+            self._append(run)
+
+    def _run_record(self, shared: Dict[str, Any], tape: Tape, duration: float,
+                    error: Optional[str]) -> Dict[str, Any]:
+        adapter = shared["db_adapter"]
+        tables = shared.get("schema_tables") or {}
+        rows = shared.get("final_result")
+        return {
+            "recorded_at": time.time(),
+            "question": shared["natural_query"],
+            "db_type": adapter.db_type,
+            "schema_version": adapter.schema_version,
+            "schemas": shared.get("schemas"),
+            "max_debug_attempts": shared.get("max_debug_attempts", 3),
+            "max_local_repair_passes": shared.get("max_local_repair_passes", 3),
+            "few_shot_k": shared.get("few_shot_k", 3),
+            "schema": shared.get("schema"),
+            "schema_tables": tables,
+            # As GenerateSQL used them; profiles gathered later in the run would change the prompt
+            "column_profiles": tape.inputs.get("column_profiles",
+                                               {t: p for t, p in adapter.column_profiles().items() if t in tables}),
+            "value_links": tape.inputs.get("value_links", shared.get("value_links") or []),
+            "llm_calls": tape.llm_calls,
+            "queries": tape.queries,
+            "checks": tape.checks,
+            "final_sql": shared.get("generated_sql"),
+            "outcome": run_outcome(shared, error),
+            "row_count": len(rows) if isinstance(rows, list) else None,
+            "duration": duration,
+        }
+
+    def _append(self, run: Dict[str, Any]):
+        line = json.dumps(run, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def runs(self) -> List[Dict[str, Any]]:
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+def replay_shared(run: Dict[str, Any], tape: Tape, fallback=None) -> Dict[str, Any]:
+    """A shared store that re-drives a recorded run against the tape."""
+    return {
+        "db_adapter": ReplayAdapter(run, fallback),
+        "natural_query": run["question"],
+        "schemas": run.get("schemas"),
+        "max_debug_attempts": run.get("max_debug_attempts", 3),
+        "max_local_repair_passes": run.get("max_local_repair_passes", 3),
+        "debug_attempts": 0,
+        "canonical_sql": run.get("canonical_sql"),
+        "example_store": _TapedExamples(tape) if run.get("examples") is not None else None,
+        "few_shot_k": run.get("few_shot_k", 3),
+        "final_result": None,
+        "final_error": None,
+    }
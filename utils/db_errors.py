@@ -0,0 +1,47 @@
+import re
+from typing import Union
+
+# Error classes:
+#   "contention": the statement lost a lock/deadlock/busy race and was rolled back; safe to retry,
+#                 reads and writes alike
+#   "connection": the session or server went away, or no session could be had; a read can simply
+#                 be retried, a write may or may not have been applied
+#   "semantic":   anything else, i.e. a problem with the SQL itself
+_CONTENTION = {
+    "oracle": re.compile(r"\b(ORA-00060|ORA-00054|ORA-30006|ORA-08177|ORA-04068|ORA-04061|ORA-04065)\b"),
+    "mssql": re.compile(r"(\(1205\)|\(1222\)|\(40001\)|\[40001\]|deadlock victim|lock request time ?out)", re.I),
+    "sqlite": re.compile(r"(database is locked|database table is locked|database schema has changed|"
+                         r"database is busy)", re.I),
+    "duckdb": re.compile(r"(Conflicting lock is held|write-write conflict|Conflict on tuple|"
+                         r"Conflict on update)", re.I),
+}
+_CONNECTION = {
+    "oracle": re.compile(
+        r"\b(ORA-03113|ORA-03114|ORA-03135|ORA-03156|ORA-01012|ORA-02396|ORA-01033|ORA-01034|ORA-01089|"
+        r"ORA-01090|ORA-00018|ORA-00020|ORA-12514|ORA-12516|ORA-12518|ORA-12519|ORA-12520|ORA-12528|"
+        r"ORA-12537|ORA-12541|ORA-12543|ORA-12170|ORA-25408|DPI-1010|DPI-1080|DPY-1001|DPY-4011|"
+        r"DPY-6005)\b"
+    ),
+    "mssql": re.compile(
+        r"(\[08S01\]|\[08001\]|\[08003\]|\[HYT00\]|\[HYT01\]|\(10053\)|\(10054\)|\(10060\)|\(233\)|"
+        r"\(40197\)|\(40501\)|\(40613\)|\(49918\)|\(49919\)|\(49920\)|communication link failure|"
+        r"connection is busy|query timeout expired|login timeout expired)", re.I
+    ),
+    "sqlite": re.compile(r"(unable to open database file|disk i/o error)", re.I),
+}
+_CONNECTION_TYPES = (ConnectionError, TimeoutError)
+
+def classify_error(error: Union[BaseException, str], db_type: str) -> str:
+    """"contention", "connection" or "semantic" for a driver error (or its message)."""
+    if isinstance(error, _CONNECTION_TYPES):
+        return "connection"
+    message = str(error)
+    if _CONTENTION.get(db_type) and _CONTENTION[db_type].search(message):
+        return "contention"
+    if _CONNECTION.get(db_type) and _CONNECTION[db_type].search(message):
+        return "connection"
+    return "semantic"
+
+def is_transient(error: Union[BaseException, str], db_type: str) -> bool:
+    """Whether the error would likely not recur on a retry; rewriting the SQL can't fix it."""
+    return classify_error(error, db_type) != "semantic"
@@ -0,0 +1,262 @@
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+_STOPWORDS = frozenset("a an the of in on at for to and or by with is are was were be been me my our".split())
+
+def _terms(text: str) -> List[str]:
+    words = [w for w in re.findall(r"[a-z0-9_]+", text.lower()) if w not in _STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def hashed_tf(text: str, dim: int) -> Dict[int, float]:
+    """Sublinear term frequencies of words and word bigrams, hashed into `dim` buckets."""
+    counts: Dict[int, int] = {}
+    for term in _terms(text):
+        bucket = zlib.crc32(term.encode("utf-8")) % dim
+        counts[bucket] = counts.get(bucket, 0) + 1
+    return {b: 1.0 + math.log(c) for b, c in counts.items()}
+
+class Example:
+    __slots__ = ("id", "question", "sql", "canonical_sql", "db_type", "uses", "last_used", "slot", "tf")
+
+    def __init__(self, id, question, sql, canonical_sql, db_type, uses=0, last_used=0.0):
+        self.id = id
+        self.question = question
+        self.sql = sql
+        self.canonical_sql = canonical_sql
+        self.db_type = db_type
+        self.uses = uses
+        self.last_used = last_used
+        self.slot = -1
+        self.tf: Dict[int, float] = {}
+
+class ExampleStore:
+    """Verified question -> SQL pairs with nearest-neighbour retrieval for few-shot prompts.
+
+    Questions are embedded as TF-IDF vectors over hashed word/bigram features. Search is a
+    NumPy brute-force cosine scan (pure Python when NumPy is missing); with hnswlib installed
+    and at least `hnsw_min_size` examples an HNSW graph answers the bulk of the store and only
+    examples added since its last build are scanned. At most `capacity` examples are kept: the
+    least used, then least recently used, is evicted. With `path` the store persists to SQLite.
+    """
+
+    def __init__(self, capacity: int = 1000, path: Optional[str] = None, dim: int = 2048,
+                 hnsw_min_size: int = 5000):
+        self.capacity = capacity
+        self.path = path
+        self.dim = dim
+        self.hnsw_min_size = hnsw_min_size
+        self._lock = threading.RLock()
+        self._examples: Dict[str, Example] = {}
+        self._by_slot: Dict[int, Example] = {}
+        self._free_slots = list(range(capacity - 1, -1, -1))
+        self._df = [0] * dim
+        self._tf = np.zeros((capacity, dim), dtype=np.float32) if NUMPY_AVAILABLE else None
+        self._weighted = None  # Row-normalized TF-IDF matrix; rebuilt lazily after changes
+        self._idf_cache: Optional[List[float]] = None
+        self._hnsw = None
+        self._hnsw_slots: set = set()
+        if path:
+            self._load()
+
+    def __len__(self):
+        return len(self._examples)
+
+    @staticmethod
+    def example_id(question: str, sql: str) -> str:
+        key = " ".join(question.lower().split()) + "\x00" + " ".join(sql.split())
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+    def add(self, question: str, sql: str, db_type: str, canonical_sql: Optional[str] = None) -> str:
+        """Record a verified pair (re-adding one counts as a use); returns its id."""
+        example_id = self.example_id(question, sql)
+        with self._lock:
+            example = self._examples.get(example_id)
+            if example is not None:
+                example.uses += 1
+                example.last_used = time.time()
+                self._persist(example)
+                return example_id
+            if not self._free_slots:
+                self._evict()
+            example = Example(example_id, question, sql, canonical_sql, db_type, last_used=time.time())
+            self._insert(example)
+            self._persist(example)
+            return example_id
+
+    def _insert(self, example: Example):
+        example.slot = self._free_slots.pop()
+        example.tf = hashed_tf(example.question, self.dim)
+        for bucket, value in example.tf.items():
+            self._df[bucket] += 1
+            if self._tf is not None:
+                self._tf[example.slot, bucket] = value
+        self._examples[example.id] = example
+        self._by_slot[example.slot] = example
+        self._weighted = self._idf_cache = None
+
+    def _evict(self):
+        victim = min(self._examples.values(), key=lambda e: (e.uses, e.last_used))
+        self.remove(victim.id)
+
+    def remove(self, example_id: str):
+        with self._lock:
+            example = self._examples.pop(example_id, None)
+            if example is None:
+                return
+            del self._by_slot[example.slot]
+            for bucket in example.tf:
+                self._df[bucket] -= 1
+            if self._tf is not None:
+                self._tf[example.slot] = 0
+            self._hnsw_slots.discard(example.slot)
+            self._free_slots.append(example.slot)
+            self._weighted = self._idf_cache = None
+            if self.path:
+                self._execute("DELETE FROM few_shot_examples WHERE id = ?", (example_id,))
+
+    def _idf(self) -> List[float]:
+        if self._idf_cache is None:
+            n = len(self._examples)
+            self._idf_cache = [math.log((1 + n) / (1 + df)) + 1.0 for df in self._df]
+        return self._idf_cache
+
+    def search(self, question: str, k: int = 3, db_type: Optional[str] = None,
+               min_score: float = 0.2) -> List[Tuple[float, Example]]:
+        """Top-k examples by cosine similarity, best first. Returned examples count as used."""
+        with self._lock:
+            if not self._examples or k <= 0:
+                return []
+            idf = self._idf()
+            query = {b: v * idf[b] for b, v in hashed_tf(question, self.dim).items()}
+            norm = math.sqrt(sum(v * v for v in query.values()))
+            if not norm:
+                return []
+            query = {b: v / norm for b, v in query.items()}
+            if self._tf is not None:
+                scored = self._search_numpy(query, idf, k)
+            else:
+                scored = self._search_python(query, idf)
+            results = []
+            for score, example in sorted(scored, key=lambda s: -s[0]):
+                if score < min_score:
+                    break
+                if db_type and example.db_type != db_type and not example.canonical_sql:
+                    continue  # Can't be shown in another dialect without its canonical form
+                results.append((score, example))
+                if len(results) >= k:
+                    break
+            now = time.time()
+            for _, example in results:
+                example.uses += 1
+                example.last_used = now
+            return results
+
+    def _search_python(self, query: Dict[int, float], idf: List[float]) -> List[Tuple[float, Example]]:
+        scored = []
+        for example in self._examples.values():
+            weighted = {b: v * idf[b] for b, v in example.tf.items()}
+            norm = math.sqrt(sum(v * v for v in weighted.values())) or 1.0
+            scored.append((sum(query.get(b, 0.0) * v for b, v in weighted.items()) / norm, example))
+        return scored
+
+    def _search_numpy(self, query: Dict[int, float], idf: List[float], k: int) -> List[Tuple[float, Example]]:
+        if self._weighted is None:
+            weighted = self._tf * np.asarray(idf, dtype=np.float32)
+            norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self._weighted = weighted / norms
+        q = np.zeros(self.dim, dtype=np.float32)
+        for bucket, value in query.items():
+            q[bucket] = value
+        # Over-fetch so dialect filtering still leaves k
+        wanted = min(len(self._examples), k * 4)
+        if HNSWLIB_AVAILABLE and len(self._examples) >= self.hnsw_min_size:
+            slots = self._hnsw_candidates(q, wanted)
+            scores = self._weighted[slots] @ q
+        else:
+            # One matrix-vector product over all slots (free ones are zero rows)
+            slots = np.fromiter(self._by_slot, dtype=np.int64)
+            scores = (self._weighted @ q)[slots]
+        top = np.argsort(-scores)[:wanted]
+        return [(float(scores[i]), self._by_slot[int(slots[i])]) for i in top]
+
+    def _hnsw_candidates(self, q, wanted: int):
+        """HNSW neighbours plus every example the graph doesn't know yet; rebuilt once a
+        tenth of the store is new, since IDF weights drift as examples are added."""
+        pending = [slot for slot in self._by_slot if slot not in self._hnsw_slots]
+        if self._hnsw is None or len(pending) > 0.1 * len(self._examples):
+            slots = np.fromiter(self._by_slot, dtype=np.int64)
+            index = hnswlib.Index(space="ip", dim=self.dim)
+            index.init_index(max_elements=self.capacity, ef_construction=100, M=16)
+            index.add_items(self._weighted[slots], slots)
+            index.set_ef(max(50, wanted * 2))
+            self._hnsw, self._hnsw_slots, pending = index, set(int(s) for s in slots), []
+        labels, _ = self._hnsw.knn_query(q, k=min(wanted, len(self._hnsw_slots)))
+        found = [int(s) for s in labels[0] if int(s) in self._by_slot]
+        return np.asarray(sorted(set(found) | set(pending)), dtype=np.int64)
+
+    # --- persistence ---
+
+    def _execute(self, sql: str, params=()):
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute(sql, params)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _persist(self, example: Example):
+        if self.path:
+            self._execute(
+                "INSERT OR REPLACE INTO few_shot_examples VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (example.id, example.question, example.sql, example.canonical_sql, example.db_type,
+                 example.uses, example.last_used)
+            )
+
+    def _load(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS few_shot_examples (
+                    id TEXT PRIMARY KEY, question TEXT, sql TEXT, canonical_sql TEXT, db_type TEXT,
+                    uses INTEGER, last_used REAL)
+            """)
+            conn.commit()
+            rows = conn.execute(
+                "SELECT * FROM few_shot_examples ORDER BY uses DESC, last_used DESC LIMIT ?", (self.capacity,)
+            ).fetchall()
+        finally:
+            conn.close()
+        for row in rows:
+            self._insert(Example(*row))
+
+def format_examples(examples: List[Tuple[float, "Example"]], db_type: str, transpile=None) -> str:
+    """Prompt block of question/SQL pairs; examples from another backend go through `transpile`
+    (canonical SQL -> target dialect)."""
+    blocks = []
+    for _, example in examples:
+        sql = example.sql
+        if example.db_type != db_type:
+            if not (transpile and example.canonical_sql):
+                continue
+            sql = transpile(example.canonical_sql, db_type)
+        blocks.append(f'Question: "{example.question}"\n```yaml\nsql: |\n  ' + sql.replace("\n", "\n  ") + "\n```")
+    return "\n\n".join(blocks)
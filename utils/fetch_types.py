@@ -0,0 +1,72 @@
+import datetime
+import re
+import struct
+from decimal import Decimal
+from typing import Optional, Union
+
+from utils.sql_repair import split_row_limit
+
+# How fetched numbers become Python objects:
+#   "auto":  int for integral columns, Decimal only where a float could lose digits, else the
+#            driver's float
+#   "float": int for integral columns, float for everything else (fastest, may round)
+#   "exact": int for integral columns, Decimal for everything else
+NUMBER_MODES = ("auto", "float", "exact")
+
+# Doubles hold 15 significant decimal digits exactly
+_FLOAT_DIGITS = 15
+
+_SINGLE_ROW_AGGREGATE = re.compile(r"^\s*SELECT\s+(COUNT|SUM|AVG|MIN|MAX)\s*\(", re.IGNORECASE)
+# Row counts these make hard to read off the text (a window aggregate returns every row)
+_GROUPING = re.compile(r"\b(GROUP\s+BY|OVER|UNION|INTERSECT|EXCEPT|MINUS)\b", re.IGNORECASE)
+
+def number_conversion(precision: Optional[int], scale: Optional[int], mode: str = "auto") -> Optional[str]:
+    """"int", "float" or "decimal" for a NUMBER/DECIMAL(precision, scale) column, or None to
+    keep the driver's default. Oracle reports an unconstrained NUMBER as precision 0, scale -127."""
+    constrained = bool(precision) and scale is not None and scale >= 0
+    if constrained and scale == 0:
+        return "int"  # Python ints are exact at any precision
+    if mode == "float":
+        return "float"
+    if mode == "exact":
+        return "decimal"
+    if constrained and precision > _FLOAT_DIGITS:
+        return "decimal"
+    return None
+
+def odbc_decimal(mode: str = "auto"):
+    """pyodbc output converter for SQL_DECIMAL/SQL_NUMERIC ("auto" or "float" mode). pyodbc
+    passes the value's text, not the column's precision, so the check is per value: integral
+    values become int and the rest float, or in "auto" mode Decimal when float would lose digits."""
+    def convert(raw: Optional[bytes]) -> Union[int, float, Decimal, None]:
+        if raw is None:
+            return None
+        text = raw.decode("ascii")
+        whole, _, fraction = text.partition(".")
+        if not fraction.strip("0"):
+            return int(whole or "0")
+        if mode == "float":
+            return float(text)
+        digits = len((whole + fraction).lstrip("-+").lstrip("0"))
+        return float(text) if digits <= _FLOAT_DIGITS else Decimal(text)
+    return convert
+
+def odbc_datetimeoffset(raw: Optional[bytes]) -> Optional[datetime.datetime]:
+    """pyodbc output converter for DATETIMEOFFSET (ODBC type -155), which pyodbc can't fetch."""
+    if raw is None:
+        return None
+    year, month, day, hour, minute, second, nanoseconds, tz_hour, tz_minute = struct.unpack("<6hI2h", raw)
+    tz = datetime.timezone(datetime.timedelta(hours=tz_hour, minutes=tz_minute))
+    return datetime.datetime(year, month, day, hour, minute, second, nanoseconds // 1000, tzinfo=tz)
+
+def row_limit_hint(sql: str) -> Optional[int]:
+    """Most rows the query can return, when its text says so: a row limit, or a bare
+    aggregate (one row). None for statements with grouping, windows or set operations."""
+    if _GROUPING.search(sql):
+        return None
+    _, limit, _ = split_row_limit(sql)
+    if limit is not None:
+        return limit
+    if _SINGLE_ROW_AGGREGATE.search(sql):
+        return 1
+    return None
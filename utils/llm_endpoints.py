@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from openai import OpenAI
+
+from utils.query_stats import percentile
+
+class LLMEndpoint:
+    """One OpenAI-compatible server and model, with its own client (and HTTP connection pool)
+    and the latency / health bookkeeping the pool routes on."""
+
+    def __init__(self, name: str, base_url: str, model: str, api_key: str = "your-api-key",
+                 timeout: float = 120.0, max_retries: int = 2, params: Optional[Dict[str, Any]] = None,
+                 window: int = 200):
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        self.params = params or {}
+        self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=max_retries)
+        self.latencies = deque(maxlen=window)
+        self.ewma_latency = 0.0  # seconds; 0 until the first sample so new endpoints get tried
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], index: int, max_retries: int) -> "LLMEndpoint":
+        """config keys: base_url, model, and optionally name, api_key, timeout and params
+        (extra arguments for chat.completions.create, e.g. reasoning_effort)."""
+        return cls(config.get("name") or f"llm{index}", config["base_url"], config["model"],
+                   api_key=config.get("api_key", "your-api-key"), timeout=config.get("timeout", 120.0),
+                   max_retries=config.get("max_retries", max_retries), params=config.get("params"))
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.down_until
+
+    def complete(self, prompt: str):
+        return self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            store=False,
+            **self.params
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        samples = list(self.latencies)
+        return {
+            "name": self.name,
+            "model": self.model,
+            "outstanding": self.outstanding,
+            "ewma_latency": self.ewma_latency,
+            "p50": percentile(samples, 50),
+            "p95": percentile(samples, 95),
+            "healthy": self.healthy(time.time()),
+        }
+
+class LLMPool:
+    """Sends each completion to the best endpoint, hedging and failing over.
+
+    Endpoints are ranked like database replicas (EWMA latency weighted by in-flight requests,
+    endpoints in cooldown last). Once a request has run longer than the endpoint's observed
+    `hedge_percentile` latency (after `hedge_min_samples` samples), a duplicate goes to the next
+    endpoint and the first answer wins; the loser finishes in the background and still counts
+    towards its endpoint's latency. A caller that rations LLM capacity passes `hedge_slot`, which
+    returns a held slot for the duplicate (released when it finishes) or None to skip hedging.
+    An error or timeout fails over to the next endpoint and puts the failing one in cooldown
+    for `cooldown` seconds, doubling up to `max_cooldown`.
+    """
+
+    def __init__(self, endpoints: List[LLMEndpoint], hedge_percentile: float = 95.0,
+                 hedge_min_samples: int = 20, min_hedge_delay: float = 0.25, alpha: float = 0.3,
+                 cooldown: float = 5.0, max_cooldown: float = 120.0, max_workers: int = 32):
+        if not endpoints:
+            raise ValueError("At least one LLM endpoint is required")
+        self.endpoints = endpoints
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.min_hedge_delay = min_hedge_delay
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+
+    def _ordered(self) -> List[LLMEndpoint]:
+        now = time.time()
+        with self._lock:
+            healthy = [e for e in self.endpoints if e.healthy(now)]
+            down = [e for e in self.endpoints if not e.healthy(now)]
+            healthy.sort(key=lambda e: (e.ewma_latency * (e.outstanding + 1), e.outstanding))
+        return healthy + sorted(down, key=lambda e: e.down_until)
+
+    def _hedge_delay(self, endpoint: LLMEndpoint) -> Optional[float]:
+        with self._lock:
+            samples = list(endpoint.latencies)
+        if len(samples) < self.hedge_min_samples:
+            return None  # Too little history to know what "slow" is
+        return max(self.min_hedge_delay, percentile(samples, self.hedge_percentile))
+
+    def _timed(self, endpoint: LLMEndpoint, prompt: str):
+        started = time.time()
+        try:
+            response = endpoint.complete(prompt)
+        except Exception:
+            self._end(endpoint, None)
+            raise
+        self._end(endpoint, time.time() - started)
+        return response
+
+    def _end(self, endpoint: LLMEndpoint, duration: Optional[float]):
+        """Finish a request; duration is None if the endpoint failed it."""
+        with self._lock:
+            endpoint.outstanding -= 1
+            if duration is None:
+                endpoint.consecutive_failures += 1
+                backoff = self.cooldown * 2 ** (endpoint.consecutive_failures - 1)
+                endpoint.down_until = time.time() + min(backoff, self.max_cooldown)
+                return
+            endpoint.consecutive_failures = 0
+            endpoint.down_until = 0.0
+            endpoint.latencies.append(duration)
+            if endpoint.ewma_latency == 0.0:
+                endpoint.ewma_latency = duration
+            else:
+                endpoint.ewma_latency += self.alpha * (duration - endpoint.ewma_latency)
+
+    def complete(self, prompt: str, hedge_slot: Optional[Callable[[], Any]] = None) -> Tuple[Any, LLMEndpoint]:
+        """(chat completion response, endpoint that produced it)."""
+        order = self._ordered()
+        pending = {}
+        errors = []
+        launched = 0
+        hedged = False
+        hedge_due = True  # Until a hedge is launched or skipped
+
+        def launch(slot=None):
+            nonlocal launched
+            endpoint = order[launched]
+            launched += 1
+            with self._lock:
+                endpoint.outstanding += 1
+            future = self._executor.submit(self._timed, endpoint, prompt)
+            if slot is not None:
+                future.add_done_callback(lambda _: slot.release())
+            pending[future] = endpoint
+
+        launch()
+        while pending:
+            delay = None
+            if hedge_due and launched < len(order):
+                delay = self._hedge_delay(order[launched - 1])
+            done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                # Slower than this endpoint's tail latency: race a duplicate on the next one
+                hedge_due = False
+                slot = hedge_slot() if hedge_slot is not None else None
+                if hedge_slot is not None and slot is None:
+                    continue  # No spare capacity; a duplicate would take it from queued requests
+                hedged = True
+                self.hedges += 1
+                launch(slot)
+                continue
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    print(f"LLM endpoint {endpoint.name} failed: {e}")
+                    errors.append(e)
+                    continue
+                if hedged and endpoint is not order[0]:
+                    self.hedge_wins += 1
+                return response, endpoint
+            if not pending and launched < len(order):
+                self.failovers += 1
+                launch()
+        raise errors[-1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = [e.snapshot() for e in self.endpoints]
+        return {"hedges": self.hedges, "hedge_wins": self.hedge_wins, "failovers": self.failovers,
+                "endpoints": endpoints}
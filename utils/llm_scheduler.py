@@ -0,0 +1,156 @@
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from utils.query_stats import percentile
+
+# Lower runs first: interactive SQL generation, then debug retries, then background/batch work
+PRIORITIES = {"interactive": 0, "retry": 1, "batch": 2}
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English and SQL)."""
+    return len(text) // 4 + 1
+
+class Ticket:
+    """A granted LLM slot. `settle` replaces the estimated token charge with the real usage;
+    `release` hands the slot back."""
+
+    def __init__(self, scheduler: "LLMScheduler", tokens: int, queue_time: float):
+        self.scheduler = scheduler
+        self.tokens = tokens
+        self.queue_time = queue_time
+        self.released = False
+
+    def settle(self, actual_tokens: int):
+        self.scheduler._adjust(self.tokens - actual_tokens)
+        self.tokens = actual_tokens
+
+    def release(self):
+        with self.scheduler._cond:
+            if not self.released:
+                self.released = True
+                self.scheduler._in_flight -= 1
+                self.scheduler._cond.notify_all()
+
+class LLMScheduler:
+    """Admission control in front of the LLM server.
+
+    At most `max_in_flight` requests run at once, and with `tokens_per_minute` a token bucket
+    (refilled continuously, one minute's budget deep) is charged each request's estimated
+    prompt + completion tokens. Waiting requests are granted strictly by priority class, then
+    arrival order, so interactive requests overtake queued retries and batch work.
+    """
+
+    def __init__(self, max_in_flight: int = 4, tokens_per_minute: Optional[int] = None,
+                 completion_tokens: int = 256, window: int = 1000):
+        self.max_in_flight = max_in_flight
+        self.tokens_per_minute = tokens_per_minute
+        self.completion_tokens = completion_tokens
+        self._cond = threading.Condition()
+        self._waiting = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._tokens = float(tokens_per_minute or 0)
+        self._refilled_at = time.monotonic()
+        self._queue_times = {name: deque(maxlen=window) for name in PRIORITIES}
+        self._granted = {name: 0 for name in PRIORITIES}
+        self._queued = {name: 0 for name in PRIORITIES}
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.tokens_per_minute:
+            rate = self.tokens_per_minute / 60.0
+            self._tokens = min(float(self.tokens_per_minute), self._tokens + (now - self._refilled_at) * rate)
+        self._refilled_at = now
+
+    def _adjust(self, tokens: float):
+        if self.tokens_per_minute:
+            with self._cond:
+                self._refill()
+                self._tokens = min(float(self.tokens_per_minute), self._tokens + tokens)
+                self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, prompt: str, priority: str = "interactive"):
+        """Wait for a slot (and token budget) for `prompt`; yields a Ticket."""
+        ticket = self._acquire(self._tokens_for(prompt, priority), priority)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def try_acquire(self, prompt: str, priority: str = "interactive") -> Optional[Ticket]:
+        """A slot for `prompt` if one is free right now, else None (e.g. for a hedged duplicate,
+        which isn't worth waiting for). Never overtakes queued requests; `release` the ticket."""
+        tokens = self._tokens_for(prompt, priority)
+        with self._cond:
+            self._refill()
+            if self._waiting or self._in_flight >= self.max_in_flight:
+                return None
+            if self.tokens_per_minute and self._tokens < tokens:
+                return None
+            self._in_flight += 1
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+            self._granted[priority] += 1
+        return Ticket(self, tokens, 0.0)
+
+    def _tokens_for(self, prompt: str, priority: str) -> int:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown LLM priority class: {priority}")
+        tokens = estimate_tokens(prompt) + self.completion_tokens
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)  # Otherwise it could never be granted
+        return tokens
+
+    def _acquire(self, tokens: int, priority: str) -> Ticket:
+        entry = (PRIORITIES[priority], next(self._seq))
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+            self._queued[priority] += 1
+            while True:
+                self._refill()
+                timeout = None
+                if self._waiting[0] == entry and self._in_flight < self.max_in_flight:
+                    if not self.tokens_per_minute or self._tokens >= tokens:
+                        break
+                    # Only the token budget is missing: sleep until the bucket has refilled enough
+                    timeout = (tokens - self._tokens) / (self.tokens_per_minute / 60.0)
+                self._cond.wait(timeout)
+            heapq.heappop(self._waiting)
+            self._queued[priority] -= 1
+            self._in_flight += 1
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+            queue_time = time.monotonic() - started
+            self._queue_times[priority].append(queue_time)
+            self._granted[priority] += 1
+            # The next request in line may be grantable too
+            self._cond.notify_all()
+        return Ticket(self, tokens, queue_time)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """In-flight count, token budget left and per-class queue depth and queue-time percentiles."""
+        with self._cond:
+            self._refill()
+            classes = {}
+            for name in PRIORITIES:
+                samples = list(self._queue_times[name])
+                classes[name] = {
+                    "granted": self._granted[name],
+                    "queued": self._queued[name],
+                    "queue_p50": percentile(samples, 50),
+                    "queue_p95": percentile(samples, 95),
+                    "queue_max": max(samples) if samples else None,
+                }
+            return {
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "tokens_available": round(self._tokens) if self.tokens_per_minute else None,
+                "classes": classes,
+            }
@@ -0,0 +1,84 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# A metadata answer: (intent, column names, rows)
+MetadataAnswer = Tuple[str, List[str], List[tuple]]
+
+# Words that make a question about the data even when it names tables or columns
+# ("average of the total column", "rows in orders", "values of status")
+_DATA_WORDS = re.compile(
+    r"\b(average|avg|sum|maximum|minimum|max|min|highest|lowest|most|least|greater|less|more|fewer|"
+    r"than|between|where|per|each|top|rows?|records?|values?|entries|distinct|unique|null|empty|"
+    r"latest|earliest|oldest|newest)\b"
+)
+_COUNT_TABLES = re.compile(r"\b(how many|number of|count of|count)( the)? tables\b")
+_LIST_TABLES = re.compile(r"\b(what|which|list|show|name|give|display|all)\b.*\btables\b")
+_TABLES_WITH = re.compile(r"\b(which|what) tables?\b.*\b(have|has|contain|contains|with|include|includes)\b")
+_SCHEMA = re.compile(r"\b(describe|show|explain|what is|what's|print|display|give)\b.*"
+                     r"\b(schema|database structure|data model|db structure)\b")
+_COLUMNS = re.compile(r"\b(columns?|fields?|attributes|structure|layout|definition|schema)\b")
+# "describe orders" asks for columns, but "describe the orders from Chicago" asks for data
+_DESCRIBE_TABLE = re.compile(r"(describe|desc)( the)? (?P<name>[\w.$# ]+?)( table)?")
+_COUNT_COLUMNS = re.compile(r"\b(how many|number of)( \w+)? (columns|fields)\b")
+_COLUMN_TYPE = re.compile(r"\b(data ?type|type|datatype)\b")
+
+def _name_forms(name: str) -> List[str]:
+    """Ways a question may refer to a table or column: as is, unqualified, with spaces for
+    underscores, singular or plural."""
+    last = name.split(".")[-1].lower()
+    forms = {name.lower(), last, last.replace("_", " ")}
+    for form in list(forms):
+        forms.add(form[:-1] if form.endswith("s") else form + "s")
+    return sorted((f for f in forms if len(f) > 1), key=len, reverse=True)
+
+def _mentions(question: str, names: List[str]) -> List[str]:
+    """Names referred to in the question, in order of first mention."""
+    found = []
+    for name in names:
+        positions = [m.start() for form in _name_forms(name)
+                     for m in re.finditer(rf"(?<![\w.]){re.escape(form)}(?![\w])", question)]
+        if positions:
+            found.append((min(positions), name))
+    return [name for _, name in sorted(found)]
+
+def route_metadata_question(question: str, tables: Dict[str, List[Tuple[str, str]]]) -> Optional[MetadataAnswer]:
+    """Answer a question about the catalog (tables, columns, types) from the cached schema
+    model, or return None if it is a data question for the SQL path."""
+    q = " ".join(re.sub(r"[^\w\s.$#']", " ", (question or "").lower()).split())
+    if not q or not tables or _DATA_WORDS.search(q):
+        return None
+    all_rows = [(table, column, col_type) for table, columns in tables.items() for column, col_type in columns]
+
+    if _COUNT_TABLES.search(q):
+        return "count_tables", ["table_count"], [(len(tables),)]
+    if _SCHEMA.search(q):
+        return "describe_schema", ["table", "column", "type"], all_rows
+
+    mentioned_tables = _mentions(q, list(tables))
+    column_names = list(dict.fromkeys(column for _, column, _ in all_rows))
+    # A word that names a mentioned table isn't also read as a column of the same name
+    mentioned_columns = [c for c in _mentions(q, column_names)
+                         if not any(c.lower() in _name_forms(t) for t in mentioned_tables)]
+
+    if _TABLES_WITH.search(q) and mentioned_columns:
+        wanted = {c.lower() for c in mentioned_columns}
+        rows = [row for row in all_rows if row[1].lower() in wanted]
+        return "tables_with_column", ["table", "column", "type"], rows
+    if _COLUMN_TYPE.search(q) and mentioned_columns:
+        wanted = {c.lower() for c in mentioned_columns}
+        rows = [row for row in all_rows if row[1].lower() in wanted
+                and (not mentioned_tables or row[0] in mentioned_tables)]
+        if rows:
+            return "column_type", ["table", "column", "type"], rows
+    if mentioned_tables and _COUNT_COLUMNS.search(q):
+        return "count_columns", ["table", "column_count"], [(t, len(tables[t])) for t in mentioned_tables]
+    described = _DESCRIBE_TABLE.fullmatch(q)
+    if described and described.group("name") in {f for t in mentioned_tables for f in _name_forms(t)}:
+        rows = [row for row in all_rows if row[0] in mentioned_tables]
+        return "columns_of", ["table", "column", "type"], rows
+    if mentioned_tables and _COLUMNS.search(q) and not mentioned_columns:
+        rows = [row for row in all_rows if row[0] in mentioned_tables]
+        return "columns_of", ["table", "column", "type"], rows
+    if _LIST_TABLES.search(q) and not mentioned_tables and not mentioned_columns:
+        return "list_tables", ["table", "column_count"], [(t, len(cols)) for t, cols in tables.items()]
+    return None
@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils.call_llm import call_llm_scored, has_tier
+from utils.query_stats import percentile
+
+class CascadeStats:
+    """Per-tier outcomes of the model cascade: how often each tier's SQL was accepted by
+    validation and later ran successfully, why it was rejected, and how long calls took."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self._tiers: Dict[str, Dict[str, Any]] = {}
+
+    def _tier(self, tier: str) -> Dict[str, Any]:
+        if tier not in self._tiers:
+            self._tiers[tier] = {"calls": 0, "accepted": 0, "executed": 0, "execution_ok": 0,
+                                 "rejections": Counter(), "latencies": deque(maxlen=self._window)}
+        return self._tiers[tier]
+
+    def record(self, tier: str, accepted: bool, duration: float, reason: Optional[str] = None):
+        with self._lock:
+            stats = self._tier(tier)
+            stats["calls"] += 1
+            stats["latencies"].append(duration)
+            if accepted:
+                stats["accepted"] += 1
+            else:
+                stats["rejections"][reason or "unknown"] += 1
+
+    def record_execution(self, tier: str, success: bool):
+        with self._lock:
+            stats = self._tier(tier)
+            stats["executed"] += 1
+            stats["execution_ok"] += int(success)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for tier, stats in self._tiers.items():
+                latencies = list(stats["latencies"])
+                result[tier] = {
+                    "calls": stats["calls"],
+                    "accept_rate": stats["accepted"] / stats["calls"] if stats["calls"] else None,
+                    "execution_success_rate": (stats["execution_ok"] / stats["executed"]
+                                               if stats["executed"] else None),
+                    "latency_p50": percentile(latencies, 50),
+                    "latency_p95": percentile(latencies, 95),
+                    "rejections": dict(stats["rejections"].most_common(5)),
+                }
+            return result
+
+cascade_stats = CascadeStats()
+
+def _rejection_kind(problem: str) -> str:
+    return problem.split(":", 1)[0]
+
+def generate_with_cascade(prompt: str, extract: Callable[[str], str],
+                          validate: Callable[[str], Optional[str]], priority: str = "interactive",
+                          min_confidence: float = 0.0, skip_small: bool = False,
+                          stats: CascadeStats = cascade_stats) -> Tuple[str, str]:
+    """SQL for `prompt` as (sql, tier).
+
+    With a small tier configured (and `skip_small` unset) the small model answers first; its
+    SQL is kept if `extract` finds SQL, `validate` returns no problem and the completion's
+    confidence (when the endpoint reports one) is at least `min_confidence`. Otherwise the
+    large model answers. Results and latencies are recorded per tier in `stats`.
+    """
+    if has_tier("small") and not skip_small:
+        started = time.time()
+        try:
+            completion, confidence = call_llm_scored(prompt, priority, tier="small")
+            sql = extract(completion)
+            problem = validate(sql)
+            if problem is None and confidence is not None and confidence < min_confidence:
+                problem = f"low confidence: {confidence:.2f}"
+        except Exception as e:
+            problem = f"{type(e).__name__}: {e}"
+        stats.record("small", problem is None, time.time() - started,
+                     None if problem is None else _rejection_kind(problem))
+        if problem is None:
+            return sql, "small"
+        print(f"Small model answer rejected ({problem}). Escalating to the large model...")
+    started = time.time()
+    completion, _ = call_llm_scored(prompt, priority, tier="large")
+    sql = extract(completion)
+    stats.record("large", True, time.time() - started)
+    return sql, "large"
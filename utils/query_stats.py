@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+from utils.sql_fingerprint import fingerprint, normalize_sql
+
+def percentile(samples, pct: float) -> Optional[float]:
+    """Nearest-rank percentile of samples (0 < pct <= 100); None when there are no samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+class _ShapeStats:
+    __slots__ = ("sql", "count", "errors", "latencies", "rows", "last_seen")
+
+    def __init__(self, sql: str, window: int):
+        self.sql = sql
+        self.count = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=window)
+        self.rows = deque(maxlen=window)
+        self.last_seen = 0.0
+
+class QueryStats:
+    """Thread-safe per-query-shape execution statistics, keyed by SQL fingerprint.
+
+    Keeps the last `window` latencies per shape and at most `max_shapes` shapes,
+    evicting the least recently executed one.
+    """
+
+    def __init__(self, max_shapes: int = 1000, window: int = 1000):
+        self.max_shapes = max_shapes
+        self.window = window
+        self._shapes: "OrderedDict[str, _ShapeStats]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, sql: str, duration: float, success: bool, rows: Optional[int] = None) -> str:
+        key = fingerprint(sql)
+        with self._lock:
+            stats = self._shapes.get(key)
+            if stats is None:
+                stats = self._shapes[key] = _ShapeStats(normalize_sql(sql), self.window)
+                if len(self._shapes) > self.max_shapes:
+                    self._shapes.popitem(last=False)
+            else:
+                self._shapes.move_to_end(key)
+            stats.count += 1
+            stats.errors += 0 if success else 1
+            stats.latencies.append(duration)
+            if rows is not None:
+                stats.rows.append(rows)
+            stats.last_seen = time.time()
+        return key
+
+    def expected_rows(self, sql: str, pct: float = 95.0) -> Optional[int]:
+        """Row count this query shape usually returns (percentile of recent runs), or None
+        if it hasn't returned rows before."""
+        with self._lock:
+            stats = self._shapes.get(fingerprint(sql))
+            rows = list(stats.rows) if stats is not None else []
+        return percentile(rows, pct)
+
+    def summary(self, top: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Per-shape count, error rate, p50/p95 latency and p95 row count, busiest shapes first."""
+        with self._lock:
+            snapshot = [(key, s.sql, s.count, s.errors, list(s.latencies), list(s.rows))
+                        for key, s in self._shapes.items()]
+        rows = [{
+            "fingerprint": key,
+            "sql": sql,
+            "count": count,
+            "error_rate": errors / count if count else 0.0,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "rows_p95": percentile(rows, 95),
+        } for key, sql, count, errors, latencies, rows in snapshot]
+        rows.sort(key=lambda r: r["count"], reverse=True)
+        return rows[:top] if top else rows
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
@@ -0,0 +1,130 @@
+import heapq
+import random
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+class _ColumnSummary:
+    """Streaming per-column statistics.
+
+    Distinct values are counted exactly up to `distinct_cap`, after which the count becomes a
+    lower bound. Top-k keeps `max_counters` space-saving counters merged batch by batch: each
+    counter holds (count, overestimate), so memory stays bounded on high-cardinality columns
+    while heavy hitters are still reported with a guaranteed minimum count.
+    """
+
+    __slots__ = ("name", "count", "nulls", "min", "max", "distinct", "distinct_cap",
+                 "distinct_capped", "counters", "max_counters", "numeric_sum", "numeric_count")
+
+    def __init__(self, name: str, distinct_cap: int, max_counters: int):
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.distinct = set()
+        self.distinct_cap = distinct_cap
+        self.distinct_capped = False
+        self.counters: Dict[Any, List[int]] = {}
+        self.max_counters = max_counters
+        self.numeric_sum = 0.0
+        self.numeric_count = 0
+
+    def update(self, values: Sequence[Any]):
+        self.count += len(values)
+        present = [v for v in values if v is not None]
+        self.nulls += len(values) - len(present)
+        if not present:
+            return
+        try:
+            lo, hi = min(present), max(present)
+            self.min = lo if self.min is None else min(self.min, lo)
+            self.max = hi if self.max is None else max(self.max, hi)
+        except TypeError:
+            pass  # Mixed, non-comparable types (e.g. SQLite's dynamic typing)
+        numbers = [v for v in present if isinstance(v, (int, float)) and not isinstance(v, bool)]
+        if numbers:
+            self.numeric_sum += sum(numbers)
+            self.numeric_count += len(numbers)
+        if not self.distinct_capped:
+            self.distinct.update(present)
+            if len(self.distinct) > self.distinct_cap:
+                self.distinct_capped = True
+                self.distinct = set()
+        counters = self.counters
+        # Values missing from a full summary may have occurred up to `floor` times already
+        floor = min(c for c, _ in counters.values()) if len(counters) >= self.max_counters else 0
+        for value, n in Counter(present).items():
+            if value in counters:
+                counters[value][0] += n
+            else:
+                counters[value] = [n + floor, floor]
+        if len(counters) > self.max_counters:
+            self.counters = dict(heapq.nlargest(self.max_counters, counters.items(), key=lambda kv: kv[1][0]))
+
+    def result(self, top_k: int) -> Dict[str, Any]:
+        # Report guaranteed counts; drop values that may well have been seen only once
+        guaranteed = [(v, c - err) for v, (c, err) in self.counters.items() if err == 0 or c - err > 1]
+        top = sorted(guaranteed, key=lambda kv: kv[1], reverse=True)[:top_k]
+        return {
+            "name": self.name,
+            "count": self.count,
+            "nulls": self.nulls,
+            "distinct": f">{self.distinct_cap}" if self.distinct_capped else len(self.distinct),
+            "min": self.min,
+            "max": self.max,
+            "mean": self.numeric_sum / self.numeric_count if self.numeric_count else None,
+            "top_values": [{"value": v, "count": c} for v, c in top],
+        }
+
+class ResultSummarizer:
+    """One-pass summary of a query result fed in batches of rows.
+
+    Per-column stats (count, nulls, distinct, min/max, mean, top-k values) plus a reservoir
+    sample of `sample_size` rows. Memory and output size are bounded regardless of row count.
+    """
+
+    def __init__(self, columns: Sequence[str], sample_size: int = 10, top_k: int = 5,
+                 distinct_cap: int = 10000, seed: Optional[int] = None):
+        self.columns = list(columns)
+        self.sample_size = sample_size
+        self.top_k = top_k
+        self.row_count = 0
+        self._sample: List[Sequence[Any]] = []
+        self._rng = random.Random(seed)
+        self._stats = [_ColumnSummary(c, distinct_cap, max(top_k * 10, 50)) for c in self.columns]
+
+    def update(self, batch: Sequence[Sequence[Any]]):
+        if not batch:
+            return
+        # Column-wise: transpose once, then each column is summarized in a tight loop
+        for stats, values in zip(self._stats, zip(*batch)):
+            stats.update(values)
+        for row in batch:
+            self.row_count += 1
+            if len(self._sample) < self.sample_size:
+                self._sample.append(row)
+            else:
+                # Reservoir sampling keeps a uniform sample of everything seen so far
+                j = self._rng.randrange(self.row_count)
+                if j < self.sample_size:
+                    self._sample[j] = row
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "row_count": self.row_count,
+            "columns": [s.result(self.top_k) for s in self._stats],
+            "sample_rows": [list(row) for row in self._sample],
+        }
+
+def summarize_rows(columns: Sequence[str], rows: Iterable[Sequence[Any]], batch_size: int = 1000,
+                   **kwargs) -> Dict[str, Any]:
+    """Summarize an iterable of rows, consuming it in batches."""
+    summarizer = ResultSummarizer(columns, **kwargs)
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            summarizer.update(batch)
+            batch = []
+    summarizer.update(batch)
+    return summarizer.summary()
@@ -0,0 +1,268 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+from utils.sql_fingerprint import fingerprint, normalize_sql
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY, started_at REAL, duration REAL, question TEXT, db_type TEXT,
+    schema_version INTEGER, outcome TEXT, final_sql TEXT, error TEXT, row_count INTEGER,
+    debug_attempts INTEGER);
+CREATE TABLE IF NOT EXISTS run_events (
+    run_id TEXT, ts REAL, kind TEXT, sql TEXT, fingerprint TEXT, error TEXT, duration REAL,
+    row_count INTEGER, detail TEXT);
+CREATE INDEX IF NOT EXISTS runs_started_at ON runs (started_at);
+CREATE INDEX IF NOT EXISTS run_events_ts ON run_events (ts);
+CREATE INDEX IF NOT EXISTS run_events_fingerprint ON run_events (fingerprint);
+"""
+
+_EVENT_FIELDS = ("error", "duration", "row_count", "detail")
+
+class RunLog:
+    """Append-only log of flow runs and their steps in a local SQLite file.
+
+    Callers only enqueue records; a writer thread inserts them in batches (every
+    `batch_size` records or `flush_interval` seconds), so logging never waits on disk.
+    When the queue is full records are dropped and counted rather than blocking. Once the
+    file exceeds `max_bytes` it is rotated to `<path>.<timestamp>`.
+    """
+
+    def __init__(self, path: str, batch_size: int = 200, flush_interval: float = 1.0,
+                 max_queue: int = 10000, max_bytes: Optional[int] = None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._conn = self._connect()
+        self._writer = threading.Thread(target=self._write_loop, name="run-log-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    # --- request path: enqueue only ---
+
+    @staticmethod
+    def new_run_id() -> str:
+        return uuid.uuid4().hex
+
+    def _enqueue(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def event(self, run_id: str, kind: str, **fields):
+        """One step of a run: kind is e.g. "generated", "repaired", "debugged", "executed"."""
+        self._enqueue(("event", run_id, time.time(), kind, fields))
+
+    def run(self, run_id: str, **fields):
+        """The run's summary row: question, outcome, timings, row count, ..."""
+        self._enqueue(("run", run_id, fields))
+
+    # --- writer thread ---
+
+    def _write_loop(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.time()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    self._write(batch)
+                except sqlite3.Error as e:
+                    print(f"Run log write failed ({len(batch)} records dropped): {e}")
+                for _ in batch:
+                    self._queue.task_done()
+        self._conn.close()
+
+    def _write(self, batch: List[tuple]):
+        events, runs = [], []
+        for item in batch:
+            if item[0] == "event":
+                _, run_id, ts, kind, fields = item
+                sql = fields.get("sql")
+                # Fingerprinting happens here, off the request path
+                events.append((run_id, ts, kind, sql, fingerprint(sql) if sql else None,
+                               *(fields.get(name) for name in _EVENT_FIELDS)))
+            else:
+                _, run_id, fields = item
+                runs.append((run_id, fields.get("started_at"), fields.get("duration"), fields.get("question"),
+                             fields.get("db_type"), fields.get("schema_version"), fields.get("outcome"),
+                             fields.get("final_sql"), fields.get("error"), fields.get("row_count"),
+                             fields.get("debug_attempts")))
+        with self._conn:
+            if events:
+                self._conn.executemany("INSERT INTO run_events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", events)
+            if runs:
+                self._conn.executemany("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", runs)
+        if self.max_bytes and os.path.getsize(self.path) > self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._conn.close()
+        os.replace(self.path, f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}")
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+        self._conn = self._connect()
+
+    def flush(self):
+        """Wait until everything enqueued so far has been written."""
+        if self._writer.is_alive():
+            self._queue.join()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+
+    # --- queries (separate read connections, safe alongside the writer) ---
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def latency_percentiles(self, pcts: Sequence[float] = (50, 95, 99), kind: str = "run",
+                            since: Optional[float] = None) -> Dict[str, Any]:
+        """Nearest-rank percentiles of run durations (kind="run") or of one event kind's
+        durations (e.g. kind="executed"), optionally only for records newer than `since`."""
+        if kind == "run":
+            where, params, table = "duration IS NOT NULL AND started_at >= ?", [since or 0], "runs"
+        else:
+            where, params, table = "duration IS NOT NULL AND kind = ? AND ts >= ?", [kind, since or 0], "run_events"
+        count = self._query(f"SELECT COUNT(*) FROM {table} WHERE {where}", params)[0][0]
+        result: Dict[str, Any] = {"count": count}
+        for pct in pcts:
+            if not count:
+                result[f"p{pct:g}"] = None
+                continue
+            rank = max(0, min(count - 1, int(round(pct / 100.0 * count)) - 1))
+            rows = self._query(f"SELECT duration FROM {table} WHERE {where} ORDER BY duration LIMIT 1 OFFSET ?",
+                               params + [rank])
+            result[f"p{pct:g}"] = rows[0][0]
+        return result
+
+    def failure_hotspots(self, limit: int = 10, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Query shapes that failed most often, with their failure rate and latest error."""
+        rows = self._query("""
+            SELECT fingerprint, COUNT(*) AS executions, SUM(error IS NOT NULL) AS failures,
+                   MAX(CASE WHEN error IS NOT NULL THEN ts END) AS last_failed, MIN(sql)
+            FROM run_events
+            WHERE kind = 'executed' AND fingerprint IS NOT NULL AND ts >= ?
+            GROUP BY fingerprint
+            HAVING failures > 0
+            ORDER BY failures DESC, executions DESC
+            LIMIT ?
+        """, (since or 0, limit))
+        hotspots = []
+        for fp, executions, failures, last_failed, sql in rows:
+            last_error = self._query(
+                "SELECT error FROM run_events WHERE fingerprint = ? AND error IS NOT NULL ORDER BY ts DESC LIMIT 1",
+                (fp,)
+            )
+            hotspots.append({
+                "fingerprint": fp,
+                "sql": normalize_sql(sql),
+                "executions": executions,
+                "failures": failures,
+                "failure_rate": failures / executions,
+                "last_error": last_error[0][0] if last_error else None,
+                "last_failed": last_failed,
+            })
+        return hotspots
+
+    def outcomes(self, since: Optional[float] = None) -> Dict[str, int]:
+        return dict(self._query("SELECT outcome, COUNT(*) FROM runs WHERE started_at >= ? GROUP BY outcome",
+                                (since or 0,)))
+
+    def tier_outcomes(self, since: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """Executions per model tier (the detail of "executed" events) with their success rate."""
+        rows = self._query("""
+            SELECT detail, COUNT(*), SUM(error IS NULL)
+            FROM run_events
+            WHERE kind = 'executed' AND detail IS NOT NULL AND ts >= ?
+            GROUP BY detail
+        """, (since or 0,))
+        return {tier: {"executions": n, "success_rate": ok / n} for tier, n, ok in rows}
+
+    def compact(self, retain_seconds: float) -> int:
+        """Delete runs and events older than retain_seconds and reclaim the space; returns
+        the number of runs removed."""
+        cutoff = time.time() - retain_seconds
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                removed = conn.execute("DELETE FROM runs WHERE started_at < ?", (cutoff,)).rowcount
+                conn.execute("DELETE FROM run_events WHERE ts < ?", (cutoff,))
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+        return removed
+
+def log_event(shared: Dict[str, Any], kind: str, **fields):
+    """Record a step of the current run, if the shared store carries a run log."""
+    run_log = shared.get("run_log")
+    if run_log is not None:
+        run_log.event(shared.get("run_id"), kind, **fields)
+
+def run_outcome(shared: Dict[str, Any], error: Optional[str] = None) -> str:
+    """"error", "success" (rows), "ok" (statement without rows) or "no_sql" for a finished run."""
+    rows = shared.get("final_result")
+    if error or shared.get("final_error"):
+        return "error"
+    if isinstance(rows, list):
+        return "success"
+    if rows is not None:
+        return "ok"
+    return "no_sql"
+
+def log_run(shared: Dict[str, Any], started_at: float, error: Optional[str] = None):
+    """Record the outcome of a finished flow run from its shared store; `error` is an
+    exception that escaped the flow."""
+    run_log = shared.get("run_log")
+    if run_log is None:
+        return
+    rows = shared.get("final_result")
+    error = error or shared.get("final_error")
+    db_adapter = shared.get("db_adapter")
+    run_log.run(
+        shared.get("run_id"),
+        started_at=started_at,
+        duration=time.time() - started_at,
+        question=shared.get("natural_query"),
+        db_type=db_adapter.db_type if db_adapter else None,
+        schema_version=db_adapter.schema_version if db_adapter else None,
+        outcome=run_outcome(shared, error),
+        final_sql=shared.get("generated_sql"),
+        error=error,
+        # A sampled preview's rows aren't the result's
+        row_count=len(rows) if isinstance(rows, list) and not (shared.get("preview") or {}).get("approximate") else None,
+        debug_attempts=shared.get("debug_attempts", 0),
+    )
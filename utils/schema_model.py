@@ -0,0 +1,31 @@
+from typing import Dict, List, Tuple
+
+def parse_schema(schema: str) -> Dict[str, List[Tuple[str, str]]]:
+    """Parse the "Table: x / - col (type)" text built by DatabaseAdapter.get_schema().
+
+    Returns an ordered mapping of table name -> [(column name, column type), ...].
+    """
+    tables: Dict[str, List[Tuple[str, str]]] = {}
+    current = None
+    for line in (schema or "").splitlines():
+        stripped = line.strip()
+        if stripped.startswith("Table:"):
+            current = stripped[len("Table:"):].strip()
+            tables[current] = []
+        elif stripped.startswith("- ") and current is not None:
+            body = stripped[2:]
+            if " (" in body:
+                name, rest = body.split(" (", 1)
+                col_type = rest.split(")", 1)[0]
+            else:
+                name, col_type = body, ""
+            tables[current].append((name.strip(), col_type.strip()))
+    return tables
+
+def column_names(tables: Dict[str, List[Tuple[str, str]]]) -> List[str]:
+    """All distinct column names in the schema, in first-seen order."""
+    seen = {}
+    for columns in tables.values():
+        for name, _ in columns:
+            seen.setdefault(name, None)
+    return list(seen)
@@ -0,0 +1,46 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one.
+
+    The first caller for a key runs the function; callers arriving while it is in flight wait
+    on its future and get the same result (or exception). Nothing is cached: once the call
+    finishes, the next caller for the key runs it again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result(timeout)
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result
+
+    def _finish(self, key: Hashable):
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
@@ -0,0 +1,121 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# A quoted value in a question ('SHIPPED', "New York"); an apostrophe inside a word isn't a quote
+_QUOTED = re.compile(r"""(?<!\w)(['"])(.+?)\1(?!\w)""")
+
+def normalize_question(natural_query: str) -> str:
+    """Key form of a question: whitespace collapsed, trailing punctuation dropped, lowercased
+    except for quoted values, which the SQL compares case-sensitively."""
+    parts, pos = [], 0
+    for m in _QUOTED.finditer(natural_query):
+        parts.append(natural_query[pos:m.start()].lower())
+        parts.append(m.group(0))
+        pos = m.end()
+    parts.append(natural_query[pos:].lower())
+    return " ".join("".join(parts).split()).rstrip("?.! ")
+
+def schema_fingerprint(tables: Dict[str, List[Tuple[str, str]]]) -> str:
+    """Hash of the table and column names, without owners and types, so the same schema
+    deployed on Oracle, SQL Server or SQLite gets the same fingerprint."""
+    model = sorted(
+        (name.split(".")[-1].lower(), tuple(sorted(column.lower() for column, _ in columns)))
+        for name, columns in tables.items()
+    )
+    return hashlib.blake2b(repr(model).encode("utf-8"), digest_size=8).hexdigest()
+
+class SQLCache:
+    """Canonical (dialect-neutral) SQL of answered questions, keyed by the normalized question
+    and the schema fingerprint. A hit on any backend is transpiled instead of asking the LLM.
+
+    At most `capacity` entries are kept, least recently used first out. With `path` the cache
+    persists to SQLite, so several processes (one per backend) can share it.
+    """
+
+    def __init__(self, capacity: int = 1000, path: Optional[str] = None):
+        self.capacity = capacity
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(natural_query: str, fingerprint: str) -> str:
+        return fingerprint + "\x00" + normalize_question(natural_query)
+
+    def get(self, natural_query: str, fingerprint: str) -> Optional[str]:
+        key = self.key(natural_query, fingerprint)
+        with self._lock:
+            canonical_sql = self._entries.get(key)
+            if canonical_sql is None and self.path:
+                canonical_sql = self._read(key)  # Written by another process
+                if canonical_sql is not None:
+                    self._remember(key, canonical_sql)
+            if canonical_sql is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return canonical_sql
+
+    def put(self, natural_query: str, fingerprint: str, canonical_sql: str):
+        key = self.key(natural_query, fingerprint)
+        with self._lock:
+            self._remember(key, canonical_sql)
+            if self.path:
+                self._execute("INSERT OR REPLACE INTO sql_cache VALUES (?, ?, ?)", (key, canonical_sql, time.time()))
+
+    def remove(self, natural_query: str, fingerprint: str):
+        """Forget a cached query, e.g. after it failed on this backend."""
+        key = self.key(natural_query, fingerprint)
+        with self._lock:
+            self._entries.pop(key, None)
+            if self.path:
+                self._execute("DELETE FROM sql_cache WHERE key = ?", (key,))
+
+    def _remember(self, key: str, canonical_sql: str):
+        self._entries[key] = canonical_sql
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    # --- persistence ---
+
+    def _execute(self, sql: str, params=()):
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute(sql, params)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _read(self, key: str) -> Optional[str]:
+        conn = sqlite3.connect(self.path)
+        try:
+            row = conn.execute("SELECT canonical_sql FROM sql_cache WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def _load(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS sql_cache (key TEXT PRIMARY KEY, canonical_sql TEXT, stored_at REAL)")
+            conn.commit()
+            rows = conn.execute("SELECT key, canonical_sql FROM sql_cache ORDER BY stored_at DESC LIMIT ?",
+                                (self.capacity,)).fetchall()
+        finally:
+            conn.close()
+        for key, canonical_sql in reversed(rows):
+            self._remember(key, canonical_sql)
@@ -0,0 +1,129 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from utils.sql_repair import render_row_limit, split_row_limit, strip_trailing_semicolon, sub_outside_literals
+
+try:
+    import sqlglot
+    from sqlglot.errors import SqlglotError
+    SQLGLOT_AVAILABLE = True
+except ImportError:
+    SQLGLOT_AVAILABLE = False
+
+# db_type -> name used when prompting the LLM
+DIALECT_NAMES = {
+    "sqlite": "SQLite",
+    "oracle": "Oracle",
+    "mssql": "Microsoft SQL Server (T-SQL)",
+    "duckdb": "DuckDB",
+}
+
+# db_type -> sqlglot dialect; the canonical form is sqlglot's default dialect
+SQLGLOT_DIALECTS = {
+    "sqlite": "sqlite",
+    "oracle": "oracle",
+    "mssql": "tsql",
+    "duckdb": "duckdb",
+}
+
+# Regex fallback when sqlglot isn't installed: (pattern, replacement) applied outside literals.
+# The canonical form uses LIMIT, SUBSTRING, LENGTH, COALESCE and CURRENT_DATE/CURRENT_TIMESTAMP.
+_TO_CANONICAL: Dict[str, List[Tuple[str, str]]] = {
+    "sqlite": [
+        (r"\bSUBSTR\s*\(", "SUBSTRING("),
+        (r"\bIFNULL\s*\(", "COALESCE("),
+    ],
+    "oracle": [
+        (r"\bSYSDATE\b", "CURRENT_TIMESTAMP"),
+        (r"\bSYSTIMESTAMP\b", "CURRENT_TIMESTAMP"),
+        (r"\bSUBSTR\s*\(", "SUBSTRING("),
+        (r"\bNVL\s*\(", "COALESCE("),
+    ],
+    "mssql": [
+        (r"\bGETDATE\s*\(\s*\)", "CURRENT_TIMESTAMP"),
+        (r"\bSYSDATETIME\s*\(\s*\)", "CURRENT_TIMESTAMP"),
+        (r"\bLEN\s*\(", "LENGTH("),
+        (r"\bISNULL\s*\(", "COALESCE("),
+    ],
+    "duckdb": [
+        (r"\bIFNULL\s*\(", "COALESCE("),
+    ],
+}
+_FROM_CANONICAL: Dict[str, List[Tuple[str, str]]] = {
+    "sqlite": [
+        (r"\bSUBSTRING\s*\(", "SUBSTR("),
+    ],
+    "oracle": [
+        (r"\bSUBSTRING\s*\(", "SUBSTR("),
+        (r"\bCURRENT_DATE\b", "TRUNC(SYSDATE)"),
+    ],
+    "mssql": [
+        (r"\bLENGTH\s*\(", "LEN("),
+        (r"\bCURRENT_DATE\b", "CAST(GETDATE() AS DATE)"),
+        (r"\|\|", "+"),
+    ],
+}
+
+# SQLite spells "now" as a function over a literal; sqlglot keeps it verbatim, so rewrite it first.
+_SQLITE_NOW = [
+    (re.compile(r"\bDATE\s*\(\s*'now'\s*\)", re.IGNORECASE), "CURRENT_DATE"),
+    (re.compile(r"\bDATETIME\s*\(\s*'now'\s*\)", re.IGNORECASE), "CURRENT_TIMESTAMP"),
+]
+
+def dialect_name(db_type: str) -> str:
+    """Human-readable dialect name for prompts."""
+    return DIALECT_NAMES.get(db_type, db_type)
+
+def quote_identifier(name: str, db_type: str) -> str:
+    """Quote a possibly schema-qualified name ("owner.table") for the given dialect."""
+    parts = name.split(".")
+    if db_type == "mssql":
+        return ".".join("[" + p.replace("]", "]]") + "]" for p in parts)
+    return ".".join('"' + p.replace('"', '""') + '"' for p in parts)
+
+def _rewrite(sql: str, rules: List[Tuple[str, str]]) -> str:
+    for pattern, repl in rules:
+        sql = sub_outside_literals(re.compile(pattern, re.IGNORECASE), repl, sql)
+    return sql
+
+def to_canonical(sql: str, db_type: str) -> str:
+    """Normalize a query written in db_type's dialect into the dialect-neutral canonical form."""
+    sql = strip_trailing_semicolon(sql)
+    if db_type == "sqlite":
+        for pattern, repl in _SQLITE_NOW:
+            sql = pattern.sub(repl, sql)
+    if SQLGLOT_AVAILABLE:
+        try:
+            return sqlglot.parse_one(sql, read=SQLGLOT_DIALECTS.get(db_type)).sql()
+        except SqlglotError:
+            pass
+    base, limit, offset = split_row_limit(_rewrite(sql, _TO_CANONICAL.get(db_type, [])))
+    return render_row_limit(base, "sqlite", limit, offset) if limit is not None else base
+
+def from_canonical(sql: str, db_type: str) -> str:
+    """Render a canonical query in db_type's dialect."""
+    if SQLGLOT_AVAILABLE:
+        try:
+            return sqlglot.parse_one(sql).sql(dialect=SQLGLOT_DIALECTS.get(db_type))
+        except SqlglotError:
+            pass
+    base, limit, offset = split_row_limit(sql)
+    base = _rewrite(base, _FROM_CANONICAL.get(db_type, []))
+    return render_row_limit(base, db_type, limit, offset) if limit is not None else base
+
+def transpile(sql: str, source_db_type: str, target_db_type: str) -> str:
+    """Translate a query between backends, e.g. an Oracle query for an MSSQL replica."""
+    if source_db_type == target_db_type:
+        return strip_trailing_semicolon(sql)
+    return from_canonical(to_canonical(sql, source_db_type), target_db_type)
+
+def parse_error(sql: str, db_type: str) -> Optional[str]:
+    """Syntax error sqlglot finds in `sql` for the backend's dialect, or None (also when
+    sqlglot isn't installed)."""
+    if not SQLGLOT_AVAILABLE:
+        return None
+    try:
+        sqlglot.parse_one(sql, read=SQLGLOT_DIALECTS.get(db_type))
+    except SqlglotError as e:
+        return str(e).splitlines()[0]
+    return None
@@ -0,0 +1,163 @@
+import re
+import hashlib
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+
+from utils.sql_tokens import tokenize, is_keyword
+
+# Keywords that end the FROM clause, so a following word can't be a table alias
+_FROM_CLAUSE_END = frozenset(
+    "WHERE GROUP ORDER HAVING LIMIT FETCH OFFSET UNION INTERSECT EXCEPT MINUS ON USING WINDOW".split()
+)
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_PRECEDES_SIGN = frozenset(("(", ",", "=", "<", ">", "<=", ">=", "<>", "!="))
+# Clauses that may refer to a column alias; a name used anywhere else is a source column
+_ALIAS_CLAUSES = frozenset(("GROUP", "ORDER", "HAVING", "QUALIFY"))
+_CLAUSES = frozenset(("SELECT", "FROM", "JOIN", "WHERE", "ON", "USING", "WINDOW")) | _ALIAS_CLAUSES
+
+def _needs_space(prev: str, piece: str) -> bool:
+    if prev in ("(", ".") or piece in (")", ",", "."):
+        return False
+    # Function call: no space between a non-keyword name and its parenthesis
+    if piece == "(" and prev[-1:].isalnum() and not prev.isupper():
+        return False
+    return True
+
+def _table_alias_index(tokens, j: int):
+    """Index of the alias after the table reference or subquery starting at tokens[j], if any."""
+    if j < len(tokens) and tokens[j][1] == "(":
+        # Skip to the matching parenthesis: FROM (SELECT ...) x / JOIN (SELECT ...) AS x
+        depth = 0
+        while j < len(tokens):
+            if tokens[j][1] == "(":
+                depth += 1
+            elif tokens[j][1] == ")":
+                depth -= 1
+                if depth == 0:
+                    break
+            j += 1
+    else:
+        # Skip the (possibly schema-qualified) table name
+        while j + 2 < len(tokens) and tokens[j + 1][1] == ".":
+            j += 2
+    j += 1
+    if j < len(tokens) and tokens[j][1].upper() == "AS":
+        j += 1
+    if j < len(tokens) and tokens[j][0] == "word" and not is_keyword(tokens[j]):
+        return j
+    return None
+
+def _alias_map(tokens) -> Tuple[Dict[str, str], Set[int]]:
+    """Find table aliases (FROM t x / JOIN t AS x / FROM a x, b y) and column aliases (expr AS x).
+
+    A column alias that is also the name of a source column (SELECT city AS city) is left
+    alone, since references to the two can't be told apart. Also returns the indices of
+    optional AS tokens before table aliases, so both spellings normalize the same way.
+    """
+    aliases: Dict[str, str] = {}
+    optional_as: Set[int] = set()
+    counters = {"t": 0, "c": 0}
+    sources = _source_columns(tokens)
+
+    def add(name: str, prefix: str):
+        name = name.strip('"[]`').lower()
+        if prefix == "c" and name in sources:
+            return
+        if name not in aliases:
+            counters[prefix] += 1
+            aliases[name] = f"{prefix}{counters[prefix]}"
+
+    in_from = False
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        upper = text.upper() if kind == "word" else text
+        if upper in ("FROM", "JOIN") or (in_from and upper == ","):
+            in_from = True
+            j = _table_alias_index(tokens, i + 1)
+            if j is not None:
+                add(tokens[j][1], "t")
+                if tokens[j - 1][1].upper() == "AS":
+                    optional_as.add(j - 1)
+                if tokens[i + 1][1] != "(":
+                    i = j  # A subquery's own FROM and aliases are scanned next
+        elif kind == "word" and upper in _FROM_CLAUSE_END:
+            in_from = False
+        elif upper == "AS" and i + 1 < len(tokens):
+            nxt = tokens[i + 1]
+            if nxt[0] in ("word", "qident") and not is_keyword(nxt):
+                add(nxt[1], "c")
+        i += 1
+    return aliases, optional_as
+
+def _source_columns(tokens) -> Set[str]:
+    """Lower-cased names used outside GROUP BY / ORDER BY / HAVING, other than as the target
+    of AS: these name source columns (or tables), not column aliases."""
+    names: Set[str] = set()
+    clause, stack = "SELECT", []
+    for i, (kind, text) in enumerate(tokens):
+        if text == "(":
+            stack.append(clause)
+        elif text == ")" and stack:
+            clause = stack.pop()
+        elif kind == "word" and text.upper() in _CLAUSES:
+            clause = text.upper()
+        elif kind in ("word", "qident") and not is_keyword((kind, text)) and clause not in _ALIAS_CLAUSES:
+            if not (i and tokens[i - 1][1].upper() == "AS"):
+                names.add(text.strip('"[]`').lower())
+    return names
+
+@lru_cache(maxsize=4096)
+def normalize_sql(sql: str) -> str:
+    """Canonical text of a query's shape.
+
+    Whitespace and comments are dropped, keywords upper-cased and identifiers lower-cased,
+    literals replaced with '?', IN lists collapsed, and table/column aliases renamed to
+    t1, t2, ... / c1, c2, ... in order of appearance. A trailing semicolon is ignored.
+    """
+    tokens = tokenize(sql)
+    while tokens and tokens[-1][1] == ";":
+        tokens.pop()
+    aliases, optional_as = _alias_map(tokens)
+    out: List[str] = []
+    for i, (kind, text) in enumerate(tokens):
+        if i in optional_as:
+            continue
+        if kind in ("string", "number"):
+            # A leading minus belongs to the literal
+            if out and out[-1] == "-" and (len(out) < 2 or out[-2] in _PRECEDES_SIGN):
+                out.pop()
+            piece = "?"
+        elif kind == "word":
+            if is_keyword((kind, text)):
+                piece = text.upper()
+            else:
+                piece = aliases.get(text.lower(), text.lower())
+        elif kind == "qident":
+            name = text.strip('"[]`')
+            piece = aliases.get(name.lower(), f'"{name}"')
+        elif kind == "bind":
+            piece = "?"
+        else:
+            piece = text
+        out.append(piece)
+    normalized = "".join(
+        (" " + piece if i and _needs_space(out[i - 1], piece) else piece) for i, piece in enumerate(out)
+    )
+    return _IN_LIST_RE.sub("(?+)", normalized)
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql: str) -> str:
+    """Stable 16-hex-digit identity of a query shape, usable as a cache or stats key."""
+    return hashlib.blake2b(normalize_sql(sql).encode("utf-8"), digest_size=8).hexdigest()
+
+def dedupe_queries(queries: Iterable[str]) -> List[str]:
+    """Drop candidates that are the same query shape, keeping the first of each."""
+    seen = set()
+    unique = []
+    for sql in queries:
+        key = fingerprint(sql)
+        if key not in seen:
+            seen.add(key)
+            unique.append(sql)
+    return unique
@@ -0,0 +1,101 @@
+from decimal import Decimal
+from typing import Any, List, Tuple
+
+from utils.sql_tokens import tokenize
+
+# Clause keywords that start a predicate context (literals there are safe to bind)
+_PREDICATE_CLAUSES = frozenset(("WHERE", "HAVING", "ON"))
+# Clause keywords where a literal changes the statement's shape (ORDER BY 1, GROUP BY expressions, ...)
+_OTHER_CLAUSES = frozenset((
+    "SELECT", "FROM", "GROUP", "ORDER", "LIMIT", "OFFSET", "FETCH", "TOP", "UNION", "INTERSECT",
+    "EXCEPT", "MINUS", "VALUES", "SET", "INTO", "PARTITION", "OVER", "WINDOW", "RETURNING",
+))
+_COMPARISONS = frozenset(("=", "<>", "!=", "<", ">", "<=", ">=", "LIKE"))
+
+# Above this many literals the statement is left alone (MSSQL allows at most 2100 parameters)
+MAX_BINDS = 1000
+
+PARAMSTYLES = {
+    "sqlite": "qmark",
+    "mssql": "qmark",
+    "oracle": "numeric",
+    "duckdb": "qmark",
+}
+
+def _literal_value(kind: str, text: str, exact_decimals: bool) -> Any:
+    if kind == "string":
+        if text[:1] in "Nn":
+            text = text[1:]
+        return text[1:-1].replace("''", "'")
+    if "." in text or "e" in text.lower():
+        return Decimal(text) if exact_decimals else float(text)
+    return int(text)
+
+def parameterize(sql: str, paramstyle: str = "qmark", exact_decimals: bool = True,
+                 bind_strings: bool = True) -> Tuple[str, List[Any]]:
+    """Replace literals in predicates (WHERE/HAVING/ON comparisons, IN lists, BETWEEN bounds)
+    with bind placeholders, so every variant of a query shape shares one parsed statement.
+
+    paramstyle is "qmark" (?) for sqlite3/pyodbc or "numeric" (:1, :2, ...) for oracledb.
+    Literals elsewhere (select list, GROUP/ORDER BY, row limits, function arguments) are kept,
+    since binding them could change the statement's meaning. So are string literals without
+    `bind_strings`: Oracle compares a CHAR column to a string literal blank-padded, but to a
+    VARCHAR2 bind without padding. SQL that already has bind placeholders is left alone.
+    Returns (sql, params); params is empty when nothing was bound.
+    """
+    tokens = tokenize(sql, keep_whitespace=True)
+    if any(kind == "bind" for kind, _ in tokens):
+        return sql, []  # Numbering new binds around the caller's would break both
+    # One frame per parenthesis depth: [in predicate clause, is IN list, BETWEEN pending]
+    stack = [[False, False, False]]
+    out: List[str] = []
+    params: List[Any] = []
+    prev = prev2 = ("", "")  # previous two significant tokens
+
+    for kind, text in tokens:
+        if kind in ("ws", "comment"):
+            out.append(text)
+            continue
+        upper = text.upper() if kind == "word" else text
+        frame = stack[-1]
+        if kind == "word" and upper in _PREDICATE_CLAUSES:
+            frame[0] = True
+        elif kind == "word" and upper in _OTHER_CLAUSES:
+            frame[0] = False
+        elif upper == "(":
+            is_in_list = prev[0] == "word" and prev[1].upper() == "IN"
+            stack.append([frame[0], is_in_list, False])
+        elif upper == ")" and len(stack) > 1:
+            stack.pop()
+        elif (kind == "number" or (kind == "string" and bind_strings)) and frame[0]:
+            prev_upper = prev[1].upper()
+            signed = kind == "number" and prev_upper in ("-", "+") and prev2[1].upper() in _COMPARISONS
+            if signed:
+                prev_upper = prev2[1].upper()
+            bindable = (
+                prev_upper in _COMPARISONS
+                or prev_upper == "BETWEEN"
+                or (prev_upper == "AND" and frame[2])
+                or (frame[1] and prev_upper in ("(", ","))
+            )
+            if bindable:
+                value = _literal_value(kind, text, exact_decimals)
+                if signed:
+                    while out and out[-1] != prev[1]:
+                        out.pop()  # drop the sign and any whitespace after it
+                    out.pop()
+                    value = -value if prev[1] == "-" else value
+                params.append(value)
+                out.append("?" if paramstyle == "qmark" else f":{len(params)}")
+                if prev_upper == "AND":
+                    frame[2] = False
+                prev2, prev = prev, (kind, text)
+                continue
+        if kind == "word" and upper == "BETWEEN":
+            frame[2] = True
+        out.append(text)
+        prev2, prev = prev, (kind, text)
+
+    if not params or len(params) > MAX_BINDS:
+        return sql, []
+    return "".join(out), params
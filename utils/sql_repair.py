@@ -0,0 +1,183 @@
+import re
+import difflib
+from typing import Dict, List, Optional, Tuple
+
+# Error message patterns that name the offending identifier, per backend.
+_UNKNOWN_COLUMN_PATTERNS = [
+    re.compile(r"no such column:\s*([\w.\"]+)", re.IGNORECASE),               # SQLite
+    re.compile(r"ORA-00904:\s*\"?([\w.\"$#]+?)\"?:\s*invalid identifier", re.IGNORECASE),  # Oracle
+    re.compile(r"Invalid column name '([^']+)'", re.IGNORECASE),               # MSSQL
+    re.compile(r"Referenced column \"([^\"]+)\" not found", re.IGNORECASE),    # DuckDB
+    re.compile(r"does not have a column named \"([^\"]+)\"", re.IGNORECASE),   # DuckDB
+]
+_UNKNOWN_TABLE_PATTERNS = [
+    re.compile(r"no such table:\s*([\w.\"]+)", re.IGNORECASE),                # SQLite
+    re.compile(r"Invalid object name '([^']+)'", re.IGNORECASE),               # MSSQL
+    re.compile(r"Table with name ([\w.\"]+) does not exist", re.IGNORECASE),  # DuckDB
+]
+_ORACLE_MISSING_TABLE = re.compile(r"ORA-00942", re.IGNORECASE)
+
+_LIMIT_RE = re.compile(r"\s+LIMIT\s+(\d+)(?:\s+OFFSET\s+(\d+))?\s*$", re.IGNORECASE)
+_FETCH_RE = re.compile(
+    r"\s+(?:OFFSET\s+(\d+)\s+ROWS?\s+)?FETCH\s+(?:FIRST|NEXT)\s+(\d+)\s+ROWS?\s+ONLY\s*$", re.IGNORECASE
+)
+_TOP_RE = re.compile(r"^(\s*SELECT\s+(?:DISTINCT\s+)?)TOP\s*\(?\s*(\d+)\s*\)?\s+", re.IGNORECASE)
+_ORDER_BY_RE = re.compile(r"\bORDER\s+BY\b", re.IGNORECASE)
+_ILIKE_RE = re.compile(r"([\w.\"]+(?:\([^()]*\))?)\s+(NOT\s+)?ILIKE\s+(\x00\d+\x00|[\w.\"]+)", re.IGNORECASE)
+_TABLE_REF_RE = re.compile(r"\b(?:FROM|JOIN)\s+([\w.\"]+)", re.IGNORECASE)
+_QUOTED_IDENT_RE = re.compile(r"\"([^\"]+)\"")
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+
+def sub_outside_literals(pattern, repl, sql: str) -> str:
+    """Apply a regex substitution only outside string literals.
+
+    Literals are masked as \\x00<n>\\x00 tokens while the pattern runs, so patterns
+    can still match a literal as an operand without ever rewriting its contents.
+    """
+    literals = []
+    def mask(m):
+        literals.append(m.group(0))
+        return f"\x00{len(literals) - 1}\x00"
+    masked = pattern.sub(repl, _LITERAL_RE.sub(mask, sql))
+    return re.sub(r"\x00(\d+)\x00", lambda m: literals[int(m.group(1))], masked)
+
+def strip_trailing_semicolon(sql: str) -> str:
+    return sql.strip().rstrip(";").rstrip()
+
+def split_row_limit(sql: str) -> Tuple[str, Optional[int], Optional[int]]:
+    """Remove a LIMIT / FETCH FIRST / TOP row limit from sql.
+
+    Returns (sql without the limit, limit, offset); limit is None if there was none.
+    """
+    m = _LIMIT_RE.search(sql)
+    if m:
+        return sql[:m.start()], int(m.group(1)), int(m.group(2)) if m.group(2) else None
+    m = _FETCH_RE.search(sql)
+    if m:
+        return sql[:m.start()], int(m.group(2)), int(m.group(1)) if m.group(1) else None
+    m = _TOP_RE.search(sql)
+    if m:
+        return m.group(1) + sql[m.end():], int(m.group(2)), None
+    return sql, None, None
+
+def render_row_limit(sql: str, db_type: str, limit: int, offset: Optional[int] = None) -> str:
+    """Append a row limit to sql using the syntax native to db_type."""
+    if db_type == "oracle":
+        offset_str = f" OFFSET {offset} ROWS" if offset else ""
+        return f"{sql}{offset_str} FETCH FIRST {limit} ROWS ONLY"
+    if db_type == "mssql":
+        if offset:
+            if not _ORDER_BY_RE.search(sql):
+                sql += " ORDER BY (SELECT NULL)"
+            return f"{sql} OFFSET {offset} ROWS FETCH NEXT {limit} ROWS ONLY"
+        return re.sub(r"^(\s*SELECT\s+(?:DISTINCT\s+)?)", lambda m: f"{m.group(1)}TOP {limit} ",
+                      sql, count=1, flags=re.IGNORECASE)
+    offset_str = f" OFFSET {offset}" if offset else ""
+    return f"{sql} LIMIT {limit}{offset_str}"
+
+def rewrite_row_limit(sql: str, db_type: str) -> str:
+    """Rewrite a foreign row-limit construct (LIMIT, FETCH FIRST, TOP) into db_type's syntax."""
+    native = {
+        "sqlite": (_LIMIT_RE,),
+        "duckdb": (_LIMIT_RE,),
+        "oracle": (_FETCH_RE,),
+        "mssql": (_TOP_RE, _FETCH_RE),
+    }.get(db_type, ())
+    if any(p.search(sql) for p in native):
+        return sql
+    base, limit, offset = split_row_limit(sql)
+    if limit is None:
+        return sql
+    return render_row_limit(base, db_type, limit, offset)
+
+def rewrite_ilike(sql: str, db_type: str) -> str:
+    """ILIKE only exists on PostgreSQL-like dialects; emulate it."""
+    if db_type == "duckdb":
+        return sql  # Native
+    if db_type == "oracle":
+        repl = lambda m: f"LOWER({m.group(1)}) {m.group(2) or ''}LIKE LOWER({m.group(3)})"
+    else:
+        # SQLite LIKE is case-insensitive for ASCII, MSSQL LIKE follows the (usually CI) collation.
+        repl = lambda m: f"{m.group(1)} {m.group(2) or ''}LIKE {m.group(3)}"
+    return sub_outside_literals(_ILIKE_RE, repl, sql)
+
+def _closest(name: str, candidates: List[str]) -> Optional[str]:
+    lowered = {c.lower(): c for c in candidates}
+    if name.lower() in lowered:
+        return lowered[name.lower()]
+    match = difflib.get_close_matches(name.lower(), list(lowered), n=1, cutoff=0.75)
+    return lowered[match[0]] if match else None
+
+def _replace_identifier(sql: str, bad: str, good: str) -> str:
+    pattern = re.compile(r"(?<![\w$#])\"?" + re.escape(bad) + r"\"?(?![\w$#])", re.IGNORECASE)
+    return sub_outside_literals(pattern, good, sql)
+
+def _bad_identifiers(error: str, patterns) -> List[str]:
+    names = []
+    for pattern in patterns:
+        for match in pattern.finditer(error or ""):
+            # Drop any table/alias qualifier, only the last part is fuzzy-matched.
+            names.append(match.group(1).replace('"', "").split(".")[-1])
+    return names
+
+def fix_identifiers(sql: str, error: str, db_type: str, tables: Dict[str, List[Tuple[str, str]]]) -> Tuple[str, List[str]]:
+    """Fuzzy-match identifiers named in the error (or unknown to the schema) against the schema."""
+    fixes = []
+    table_names = list(tables)
+    columns = list({name: None for cols in tables.values() for name, _ in cols})
+
+    for bad in _bad_identifiers(error, _UNKNOWN_COLUMN_PATTERNS):
+        good = _closest(bad, columns)
+        if good and good != bad:
+            sql = _replace_identifier(sql, bad, good)
+            fixes.append(f"column {bad} -> {good}")
+
+    bad_tables = _bad_identifiers(error, _UNKNOWN_TABLE_PATTERNS)
+    if db_type == "oracle" and _ORACLE_MISSING_TABLE.search(error or ""):
+        # ORA-00942 does not name the table; check every FROM/JOIN target.
+        known = {t.lower() for t in table_names}
+        refs = [r.replace('"', "").split(".")[-1] for r in _TABLE_REF_RE.findall(sql)]
+        bad_tables.extend(r for r in refs if r.lower() not in known)
+    for bad in bad_tables:
+        good = _closest(bad, table_names)
+        if good and good != bad:
+            sql = _replace_identifier(sql, bad, good)
+            fixes.append(f"table {bad} -> {good}")
+
+    if db_type == "oracle":
+        # Quoted identifiers are case-sensitive on Oracle; "orderId" never matches ORDERID.
+        known = {n.lower(): n for n in table_names + columns}
+        def unquote(m):
+            name = m.group(1)
+            if name not in known.values() and name.lower() in known:
+                fixes.append(f"identifier \"{name}\" -> {known[name.lower()]}")
+                return known[name.lower()]
+            return m.group(0)
+        sql = sub_outside_literals(_QUOTED_IDENT_RE, unquote, sql)
+
+    return sql, fixes
+
+def repair_sql(sql: str, error: str, db_type: str,
+               tables: Dict[str, List[Tuple[str, str]]]) -> Tuple[Optional[str], List[str]]:
+    """Deterministic, rule-based repair of common mechanical SQL failures.
+
+    Returns (repaired_sql, applied_fixes); repaired_sql is None when no rule changed anything,
+    in which case the caller should fall back to the LLM debugger.
+    """
+    fixes = []
+    repaired = strip_trailing_semicolon(sql)
+    if repaired != sql.strip():
+        fixes.append("removed trailing semicolon")
+
+    for rule, label in ((rewrite_row_limit, "row limit syntax"), (rewrite_ilike, "ILIKE")):
+        rewritten = rule(repaired, db_type)
+        if rewritten != repaired:
+            fixes.append(f"rewrote {label} for {db_type}")
+            repaired = rewritten
+
+    repaired, identifier_fixes = fix_identifiers(repaired, error, db_type, tables)
+    fixes.extend(identifier_fixes)
+
+    if repaired == sql or not fixes:
+        return None, []
+    return repaired, fixes
@@ -0,0 +1,182 @@
+import math
+import random
+from typing import Dict, List, Optional, Tuple
+
+from utils.sql_dialect import SQLGLOT_AVAILABLE, SQLGLOT_DIALECTS
+
+if SQLGLOT_AVAILABLE:
+    import sqlglot
+    from sqlglot import exp
+    from sqlglot.errors import SqlglotError
+
+_PLACEHOLDER = "__sample_source__"
+_Z95 = 1.96  # Normal quantile for a 95% interval
+
+class SamplePlan:
+    """A query rewritten to read a sample of its table, and how to scale its result.
+
+    `kinds` has one entry per output column: "count" and "sum" are scaled by 1 / fraction,
+    "avg" is estimated as is, "key" (group keys, plain columns) and "unscaled" (MIN/MAX,
+    which a sample can only under- or overshoot, and expressions over AVG/MIN/MAX) are
+    passed through without an error bound. `hidden` maps a column index to
+    the extra columns appended to the query for its error bound.
+    """
+
+    def __init__(self, sql: str, table: str, fraction: float, kinds: List[str],
+                 hidden: Dict[int, Dict[str, int]], aggregate: bool):
+        self.sql = sql
+        self.table = table
+        self.fraction = fraction
+        self.kinds = kinds
+        self.hidden = hidden
+        self.aggregate = aggregate
+
+def sample_table(sql: str, db_type: str) -> Optional[str]:
+    """The table a query would be sampled on, or None if its shape can't be sampled:
+    one SELECT over one table, no joins, subqueries, CTEs, set operations, HAVING, window
+    functions or DISTINCT aggregates."""
+    select = _parse(sql, db_type)
+    if select is None:
+        return None
+    table = select.args.get("from_", select.args.get("from")).this
+    return ".".join(part.name for part in table.parts)
+
+def plan_sample(sql: str, db_type: str, fraction: float, max_rowid: Optional[int] = None,
+                seed: Optional[int] = None) -> Optional[SamplePlan]:
+    """Rewrite `sql` to read about `fraction` of its table, or None if it can't be.
+
+    The table becomes a derived table with its own name (or alias): `SAMPLE BLOCK` on
+    Oracle, `TABLESAMPLE SYSTEM` on SQL Server and DuckDB, and on SQLite a few rowid ranges
+    spread over 1..max_rowid (range scans, so only the sampled pages are read).
+    """
+    select = _parse(sql, db_type)
+    if select is None or not 0 < fraction < 1:
+        return None
+    dialect = SQLGLOT_DIALECTS.get(db_type)
+    table = select.args.get("from_", select.args.get("from")).this
+    name = ".".join(part.sql(dialect=dialect) for part in table.parts)
+
+    kinds, hidden = [], {}
+    extra = []
+    width = len(select.expressions)
+    for i, projection in enumerate(select.expressions):
+        kind = _projection_kind(projection)
+        if kind is None:
+            return None
+        kinds.append(kind)
+        node = projection.unalias()
+        if kind in ("count", "sum"):
+            arg = node.this
+            if kind == "count" or isinstance(arg, exp.Star):
+                continue  # A count's variance follows from the count itself
+            hidden[i] = {"sq": width + len(extra)}
+            extra.append(exp.Sum(this=exp.Mul(this=exp.Paren(this=arg.copy()), expression=exp.Paren(this=arg.copy()))))
+        elif kind == "avg":
+            arg = node.this
+            hidden[i] = {"sum": width + len(extra), "sq": width + len(extra) + 1, "n": width + len(extra) + 2}
+            extra.append(exp.Sum(this=arg.copy()))
+            extra.append(exp.Sum(this=exp.Mul(this=exp.Paren(this=arg.copy()), expression=exp.Paren(this=arg.copy()))))
+            extra.append(exp.Count(this=arg.copy()))
+    aggregate = any(kind != "key" for kind in kinds)
+    rewritten = select.copy()
+    for j, expression in enumerate(extra):
+        rewritten.append("expressions", exp.alias_(expression, f"__sample_{j}"))
+
+    if db_type == "oracle":
+        percent = min(99.999999, max(0.000001, fraction * 100))
+        source = f"SELECT * FROM {name} SAMPLE BLOCK ({percent:.6f})"
+    elif db_type in ("mssql", "duckdb"):
+        percent = min(99.999999, max(0.000001, fraction * 100))
+        source = f"SELECT * FROM {name} TABLESAMPLE SYSTEM ({percent:.6f} PERCENT)"
+    elif db_type == "sqlite":
+        if not max_rowid:
+            return None
+        ranges, fraction = _rowid_ranges(max_rowid, fraction, random.Random(seed))
+        condition = " OR ".join(f"rowid BETWEEN {low} AND {high}" for low, high in ranges)
+        source = f"SELECT * FROM {name} WHERE {condition}"
+    else:
+        return None
+
+    alias = table.alias or table.name
+    placeholder = exp.to_table(_PLACEHOLDER)
+    placeholder.set("alias", exp.TableAlias(this=exp.to_identifier(alias)))
+    table_node = rewritten.args.get("from_", rewritten.args.get("from")).this
+    table_node.replace(placeholder)
+    text = rewritten.sql(dialect=dialect)
+    return SamplePlan(text.replace(_PLACEHOLDER, f"({source})", 1), name, fraction, kinds, hidden, aggregate)
+
+def scale_rows(plan: SamplePlan, columns: List[str], rows: List[tuple]) -> Tuple[List[str], List[tuple], List[Dict[str, float]]]:
+    """(columns, estimated rows, 95% error bound per row and column) for a sample's result.
+    Bounds assume independent row sampling; block sampling of clustered data is noisier."""
+    f = plan.fraction
+    width = len(plan.kinds)
+    estimates, bounds = [], []
+    for row in rows:
+        values, row_bounds = list(row[:width]), {}
+        for i, kind in enumerate(plan.kinds):
+            value = row[i]
+            if value is None or kind in ("key", "unscaled"):
+                continue
+            if kind == "count":
+                values[i] = int(round(value / f))
+                row_bounds[columns[i]] = _Z95 * math.sqrt(value * (1 - f)) / f
+            elif kind == "sum":
+                values[i] = float(value) / f
+                squares = row[plan.hidden[i]["sq"]] if i in plan.hidden else value
+                row_bounds[columns[i]] = _Z95 * math.sqrt(max(0.0, float(squares)) * (1 - f)) / f
+            elif kind == "avg":
+                h = plan.hidden[i]
+                n, total, squares = row[h["n"]], row[h["sum"]], row[h["sq"]]
+                if n and n > 1:
+                    mean = float(total) / n
+                    variance = max(0.0, (float(squares) - n * mean * mean) / (n - 1))
+                    row_bounds[columns[i]] = _Z95 * math.sqrt(variance / n * (1 - f))
+        estimates.append(tuple(values))
+        bounds.append(row_bounds)
+    return columns[:width], estimates, bounds
+
+def _rowid_ranges(max_rowid: int, fraction: float, rng: random.Random, blocks: int = 16):
+    """About `fraction` of 1..max_rowid as `blocks` ranges, one at a random spot of each
+    stride; returns (ranges, fraction actually covered)."""
+    blocks = max(1, min(blocks, max_rowid))
+    stride = max_rowid / blocks
+    length = max(1, int(stride * fraction))
+    ranges = []
+    for i in range(blocks):
+        start = int(i * stride + rng.uniform(0, max(0.0, stride - length))) + 1
+        ranges.append((start, min(max_rowid, start + length - 1)))
+    covered = sum(high - low + 1 for low, high in ranges)
+    return ranges, min(1.0, covered / max_rowid)
+
+def _parse(sql: str, db_type: str):
+    if not SQLGLOT_AVAILABLE:
+        return None
+    try:
+        select = sqlglot.parse_one(sql, read=SQLGLOT_DIALECTS.get(db_type))
+    except SqlglotError:
+        return None
+    if not isinstance(select, exp.Select) or select.args.get("with") or select.args.get("having"):
+        return None
+    source = select.args.get("from_", select.args.get("from"))
+    if source is None or not isinstance(source.this, exp.Table) or select.args.get("joins"):
+        return None
+    if any(select.find_all(exp.Subquery, exp.Window)) or len(list(select.find_all(exp.Select))) > 1:
+        return None
+    return select
+
+def _projection_kind(projection) -> Optional[str]:
+    node = projection.unalias()
+    aggregates = list(node.find_all(exp.AggFunc))
+    if not aggregates:
+        return "key"
+    if any(isinstance(a.this, exp.Distinct) for a in aggregates):
+        return None  # Distinct counts don't scale with the sample
+    if isinstance(node, exp.Count):
+        return "count"
+    if isinstance(node, exp.Sum):
+        return "sum"
+    if isinstance(node, exp.Avg):
+        return "avg"
+    if all(isinstance(a, (exp.Avg, exp.Min, exp.Max)) for a in aggregates):
+        return "unscaled"  # MIN/MAX, or e.g. ROUND(AVG(x), 2)
+    return None
@@ -0,0 +1,132 @@
+import re
+from typing import List, Tuple
+
+# One pass over the SQL text; group order matters (comments before operators, etc.)
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?(?:\*/|$))
+  | (?P<string>[Nn]?'(?:[^']|'')*'?)
+  | (?P<qident>"[^"]*"?|\[[^\]]*\]?|`[^`]*`?)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<bind>:\w+|\?|@\w+)
+  | (?P<word>[A-Za-z_][\w$#]*)
+  | (?P<op><>|!=|<=|>=|\|\||::|.)
+""", re.VERBOSE | re.DOTALL)
+
+KEYWORDS = frozenset("""
+    ALL AND ANY AS ASC BETWEEN BY CASE CAST CROSS CURRENT_DATE CURRENT_TIMESTAMP DELETE DESC
+    DISTINCT ELSE END ESCAPE EXCEPT EXISTS FETCH FIRST FOR FROM FULL GROUP HAVING IN INNER
+    INSERT INTERSECT INTO IS JOIN LEFT LIKE LIMIT MERGE MINUS NATURAL NEXT NOT NULL NULLS
+    OFFSET ON ONLY OR ORDER OUTER OVER PARTITION RIGHT ROWS ROW SELECT SET THEN TOP UNION
+    UPDATE USING VALUES WHEN WHERE WITH CREATE DROP ALTER TRUNCATE GRANT REVOKE REPLACE
+    RECURSIVE ILIKE EXPLAIN PRAGMA PERCENT TIES APPLY LATERAL
+""".split())
+
+Token = Tuple[str, str]
+
+def tokenize(sql: str, keep_whitespace: bool = False) -> List[Token]:
+    """Split SQL into (kind, text) tokens.
+
+    kind is one of: ws, comment, string, qident, number, bind, word, op.
+    Whitespace and comments are dropped unless keep_whitespace is set.
+    """
+    tokens = []
+    for m in _TOKEN_RE.finditer(sql):
+        kind = m.lastgroup
+        if not keep_whitespace and kind in ("ws", "comment"):
+            continue
+        tokens.append((kind, m.group()))
+    return tokens
+
+def is_keyword(token: Token) -> bool:
+    return token[0] == "word" and token[1].upper() in KEYWORDS
+
+_READ_STATEMENTS = frozenset(("SELECT", "VALUES", "EXPLAIN", "SHOW", "DESCRIBE", "DESC", "TABLE"))
+_WRITE_STATEMENTS = frozenset(("INSERT", "UPDATE", "DELETE", "MERGE", "REPLACE", "UPSERT"))
+_DDL_STATEMENTS = frozenset(("CREATE", "DROP", "ALTER", "TRUNCATE", "GRANT", "REVOKE", "RENAME", "COMMENT"))
+_SEVERITY = {"read": 0, "write": 1, "ddl": 2, "other": 3}
+
+def _split_statements(tokens: List[Token]) -> List[List[Token]]:
+    statements, current = [], []
+    for token in tokens:
+        if token == ("op", ";"):
+            if current:
+                statements.append(current)
+            current = []
+        else:
+            current.append(token)
+    if current:
+        statements.append(current)
+    return statements
+
+def _classify_one(tokens: List[Token]) -> str:
+    depth = 0
+    head = None
+    for i, (kind, text) in enumerate(tokens):
+        if text == "(":
+            depth += 1
+            continue
+        if text == ")":
+            depth -= 1
+            continue
+        if kind != "word" or (depth > 0 and head is not None):
+            continue
+        upper = text.upper()
+        if head is None:
+            # A leading "(" only wraps the statement, e.g. (SELECT ...) UNION (SELECT ...)
+            depth = 0
+            if upper == "WITH":
+                head = "WITH"  # The real statement follows the CTE list
+                continue
+            if upper == "EXPLAIN":
+                return _classify_explained(tokens[i + 1:])
+            if upper == "PRAGMA":
+                # PRAGMA name = value changes the database, PRAGMA name / name(arg) only reads
+                return "write" if any(t == ("op", "=") for t in tokens) else "read"
+            head = upper
+        elif head == "WITH":
+            if upper in _READ_STATEMENTS or upper in _WRITE_STATEMENTS:
+                head = upper
+            continue
+        # SELECT ... INTO creates a table (T-SQL); SELECT ... FOR UPDATE takes row locks
+        if head == "SELECT" and (upper == "INTO" or (upper == "UPDATE" and i and tokens[i - 1][1].upper() == "FOR")):
+            return "write"
+        if head != "SELECT":
+            break
+    if head in _READ_STATEMENTS:
+        return "read"
+    if head in _WRITE_STATEMENTS:
+        return "write"
+    if head in _DDL_STATEMENTS:
+        return "ddl"
+    return "other"
+
+def _classify_explained(tokens: List[Token]) -> str:
+    """Class of the statement an EXPLAIN wraps. EXPLAIN ANALYZE runs it (DuckDB, PostgreSQL)
+    and Oracle's EXPLAIN PLAN writes PLAN_TABLE, so EXPLAIN over DML counts as that DML."""
+    depth = 0
+    for i, (kind, text) in enumerate(tokens):
+        if text == "(":
+            depth += 1  # PostgreSQL-style option list: EXPLAIN (ANALYZE, FORMAT JSON) ...
+        elif text == ")":
+            depth -= 1
+        elif depth == 0 and kind == "word":
+            upper = text.upper()
+            if upper == "WITH" or upper in _READ_STATEMENTS or upper in _WRITE_STATEMENTS or upper in _DDL_STATEMENTS:
+                return _classify_one(tokens[i:])
+    return "other"
+
+def classify_statement(sql: str) -> str:
+    """Classify SQL as "read", "write" (DML, locking reads), "ddl" or "other" (transaction
+    control, procedure calls, session settings, ...).
+
+    Looks past leading comments, parentheses and CTEs; for several ';'-separated statements
+    the most dangerous class wins.
+    """
+    statements = _split_statements(tokenize(sql))
+    if not statements:
+        return "other"
+    return max((_classify_one(s) for s in statements), key=_SEVERITY.__getitem__)
+
+def is_read_only(sql: str) -> bool:
+    return classify_statement(sql) == "read"
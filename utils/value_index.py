@@ -0,0 +1,151 @@
+import mmap
+import os
+import re
+import struct
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# File layout (native byte order, every section 8-byte aligned):
+#   header    magic, value count, trigram count, postings count
+#   offsets   uint32 x (values + 1)   start of each entry in the text blob
+#   sizes     uint16 x values         number of distinct trigrams per value
+#   keys      uint64 x trigrams       sorted trigram keys (three code points packed)
+#   starts    uint32 x (trigrams + 1) start of each key's postings
+#   postings  uint32 x postings       value ids
+#   blob      "table\x1fcolumn\x1fvalue" entries, UTF-8
+_MAGIC = b"TXVIDX01"
+_HEADER = struct.Struct("=8sIII")
+_SEP = "\x1f"
+
+Entry = Tuple[str, str, str]  # (table, column, value)
+
+def normalize_value(text: str) -> str:
+    return " ".join(re.sub(r"[\W_]+", " ", text.lower()).split())
+
+def trigram_keys(text: str) -> set:
+    """Trigrams of the normalized text padded with spaces, packed into ints."""
+    padded = f" {normalize_value(text)} "
+    return {(ord(padded[i]) << 42) | (ord(padded[i + 1]) << 21) | ord(padded[i + 2])
+            for i in range(len(padded) - 2)}
+
+def _pad8(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 8)
+
+def write_value_index(path: str, entries: Iterable[Entry]):
+    """Build the index for `entries` and atomically replace the file at `path`."""
+    values, postings_by_key = [], {}
+    blob = bytearray()
+    offsets, sizes = array("I", [0]), array("H")
+    for table, column, value in entries:
+        keys = trigram_keys(value)
+        if not keys:
+            continue
+        vid = len(values)
+        values.append(value)
+        blob += _SEP.join((table, column, value)).encode("utf-8")
+        offsets.append(len(blob))
+        sizes.append(min(len(keys), 0xFFFF))
+        for key in keys:
+            postings_by_key.setdefault(key, []).append(vid)
+    keys = array("Q", sorted(postings_by_key))
+    starts, postings = array("I", [0]), array("I")
+    for key in keys:
+        postings.extend(postings_by_key[key])
+        starts.append(len(postings))
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_pad8(_HEADER.pack(_MAGIC, len(values), len(keys), len(postings))))
+        for section in (offsets, sizes, keys, starts, postings):
+            f.write(_pad8(section.tobytes()))
+        f.write(bytes(blob))
+    os.replace(tmp, path)
+
+class ValueIndex:
+    """Read-only trigram index over column values, memory-mapped from disk.
+
+    Lookups binary-search the sorted trigram keys and count postings per value, so only the
+    pages touched by a question are read and the index is shared between processes.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = self._view = memoryview(self._mmap)
+        magic, n_values, n_keys, n_postings = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a value index")
+        pos = len(_pad8(b"\0" * _HEADER.size))
+
+        def section(fmt: str, count: int):
+            nonlocal pos
+            size = count * struct.calcsize(fmt)
+            part = view[pos:pos + size].cast(fmt)
+            pos += size + (-size % 8)
+            return part
+
+        self._offsets = section("I", n_values + 1)
+        self._sizes = section("H", n_values)
+        self._keys = section("Q", n_keys)
+        self._starts = section("I", n_keys + 1)
+        self._postings = section("I", n_postings)
+        self._blob = view[pos:]
+        self.size = n_values
+
+    def entry(self, vid: int) -> Entry:
+        raw = bytes(self._blob[self._offsets[vid]:self._offsets[vid + 1]])
+        table, column, value = raw.decode("utf-8").split(_SEP, 2)
+        return table, column, value
+
+    def entries(self) -> Iterator[Entry]:
+        for vid in range(self.size):
+            yield self.entry(vid)
+
+    def _postings_for(self, key: int):
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return self._postings[self._starts[i]:self._starts[i + 1]]
+        return None
+
+    def link(self, question: str, limit: int = 10, min_score: float = 0.7,
+             min_shared: int = 3) -> List[Tuple[float, str, str, str]]:
+        """Values that (nearly) occur in the question, as (score, table, column, value).
+
+        score is the share of the value's trigrams found in the question, so a value spelled
+        with a typo or different case/punctuation still links. Values contained in a longer
+        linked value are dropped ("Laptop" when "Laptop Pro" matched).
+        """
+        counts = Counter()
+        for key in trigram_keys(question):
+            postings = self._postings_for(key)
+            if postings is not None:
+                counts.update(postings)
+        sizes = self._sizes
+        # Most values share a trigram or two with any question; drop them before scoring
+        hits = [(vid, shared) for vid, shared in counts.items() if shared >= min_shared]
+        candidates = [(shared / sizes[vid], vid) for vid, shared in hits if shared >= min_score * sizes[vid]]
+        candidates.sort(key=lambda c: (-c[0], -sizes[c[1]]))
+        linked, accepted = [], []
+        for score, vid in candidates:
+            table, column, value = self.entry(vid)
+            norm = normalize_value(value)
+            if any(norm in longer and norm != longer for longer in accepted):
+                continue
+            accepted.append(norm)
+            linked.append((round(score, 3), table, column, value))
+            if len(linked) >= limit:
+                break
+        return linked
+
+    def close(self):
+        for part in (self._offsets, self._sizes, self._keys, self._starts, self._postings, self._blob,
+                     self._view):
+            part.release()
+        self._mmap.close()
+
+def open_value_index(path: str) -> Optional[ValueIndex]:
+    try:
+        return ValueIndex(path)
+    except (OSError, ValueError, struct.error):
+        return None
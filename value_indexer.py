@@ -0,0 +1,139 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from column_profiler import table_signature
+from utils.sql_dialect import quote_identifier
+from utils.value_index import ValueIndex, open_value_index, write_value_index
+
+# Text types whose values are worth linking, minus the LOB types that can't be DISTINCTed
+_TEXT_TYPE = re.compile(r"CHAR|TEXT|STRING", re.IGNORECASE)
+_LOB_TYPES = {"oracle": {"CLOB", "NCLOB", "LONG"}, "mssql": {"TEXT", "NTEXT"}}
+
+class ValueIndexer:
+    """Keeps an on-disk ValueIndex of the distinct values of low/medium-cardinality text
+    columns in step with the database.
+
+    A JSON manifest next to the index records each table's column signature; a refresh only
+    queries tables that are new or changed and carries the other tables' values over from the
+    current index. Tables read more than `max_age` seconds ago are read again, since rows
+    change without the schema changing; `refresh_if_stale` starts that in the background.
+    Columns with more than `max_distinct` values (per the column profiles, or found while
+    reading) are left out.
+    """
+
+    def __init__(self, adapter, path: str, max_distinct: int = 5000, max_age: float = 86400.0):
+        self.adapter = adapter
+        self.path = path
+        self.manifest_path = f"{path}.json"
+        self.max_distinct = max_distinct
+        self.max_age = max_age
+        manifest = self._load_manifest()
+        self.index: Optional[ValueIndex] = open_value_index(path) if manifest else None
+        self._stale_at = self._oldest(manifest) + max_age if manifest else 0.0
+        self._lock = threading.Lock()
+        # refresh() holds _lock for the whole rebuild; starting the thread has a lock of its own
+        self._start_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        # Concurrent questions may all find the index stale; only one refresh thread may write it
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="value-indexer", daemon=True)
+                self._thread.start()
+
+    def refresh_if_stale(self):
+        """Start a background refresh once the oldest table in the index is past `max_age`."""
+        if time.time() >= self._stale_at:
+            self.start()
+
+    @staticmethod
+    def _oldest(manifest: Dict[str, Any]) -> float:
+        indexed_at = manifest.get("indexed_at") or {}
+        # Manifests written before indexed_at was kept count as stale
+        return min((indexed_at.get(t, 0.0) for t in manifest.get("tables", {})), default=time.time())
+
+    def _run(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Value index refresh failed: {e}")
+            self._stale_at = time.time() + self.max_age  # Not on every lookup; wait for the next round
+
+    def _load_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get("db_key") == self.adapter.db_key() else None
+
+    def refresh(self) -> bool:
+        """Re-read changed and stale tables and rewrite the index; returns whether it changed."""
+        with self._lock:
+            tables = self.adapter.get_schema_tables()
+            manifest = self._load_manifest() or {}
+            old_signatures: Dict[str, str] = manifest.get("tables", {})
+            old_indexed_at: Dict[str, float] = manifest.get("indexed_at") or {}
+            signatures = {table: table_signature(columns) for table, columns in tables.items()}
+            now = time.time()
+            changed = [t for t, sig in signatures.items()
+                       if old_signatures.get(t) != sig or now - old_indexed_at.get(t, 0.0) >= self.max_age]
+            if not changed and set(old_signatures) == set(signatures) and self.index is not None:
+                self._stale_at = self._oldest(manifest) + self.max_age
+                return False
+            entries: List[Tuple[str, str, str]] = []
+            if self.index is not None:
+                entries.extend(e for e in self.index.entries()
+                               if e[0] in signatures and e[0] not in changed)
+            if changed:
+                conn = self.adapter.get_connection(self.adapter.router.candidates(read=True)[0].config, True)
+                try:
+                    cursor = conn.cursor()
+                    for table in changed:
+                        entries.extend(self._read_values(cursor, table, tables[table]))
+                finally:
+                    conn.close()
+            write_value_index(self.path, entries)
+            tmp = f"{self.manifest_path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                indexed_at = {t: now if t in changed else old_indexed_at[t] for t in signatures}
+                json.dump({"db_key": self.adapter.db_key(), "tables": signatures, "indexed_at": indexed_at}, f)
+            os.replace(tmp, self.manifest_path)
+            # Readers still holding the old index keep their mapping of the replaced file
+            self.index = open_value_index(self.path)
+            self._stale_at = min(indexed_at.values(), default=now) + self.max_age
+            print(f"Value index: {len(changed)} table(s) read, {self.index.size if self.index else 0} values.")
+            return True
+
+    def _read_values(self, cursor, table: str, columns: List[Tuple[str, str]]) -> List[Tuple[str, str, str]]:
+        db_type = self.adapter.db_type
+        profiles = self.adapter.column_profiles().get(table, {})
+        entries = []
+        for column, col_type in columns:
+            if not _TEXT_TYPE.search(col_type or "") or (col_type or "").upper() in _LOB_TYPES.get(db_type, ()):
+                continue
+            distinct = profiles.get(column, {}).get("distinct")
+            if isinstance(distinct, str) or (isinstance(distinct, int) and distinct > self.max_distinct):
+                continue  # Known high-cardinality column (names, emails, free text)
+            col, source, n = quote_identifier(column, db_type), quote_identifier(table, db_type), self.max_distinct + 1
+            if db_type == "oracle":
+                query = f"SELECT DISTINCT {col} FROM {source} WHERE {col} IS NOT NULL FETCH FIRST {n} ROWS ONLY"
+            elif db_type == "mssql":
+                query = f"SELECT DISTINCT TOP ({n}) {col} FROM {source} WHERE {col} IS NOT NULL"
+            else:
+                query = f"SELECT DISTINCT {col} FROM {source} WHERE {col} IS NOT NULL LIMIT {n}"
+            try:
+                cursor.execute(query)
+                values = [row[0] for row in cursor.fetchall()]
+            except Exception as e:
+                print(f"Value index: skipping {table}.{column}: {e}")
+                continue
+            if len(values) > self.max_distinct:
+                continue
+            entries.extend((table, column, str(v)) for v in values if str(v).strip())
+        return entries